@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    In-process LRU cache with a per-entry TTL.
+    get_or_load() collapses identical concurrent misses into one load (single-flight).
+    Each entry can carry `meta` (e.g. the date range it covers) for targeted invalidation.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (expires_at, value, meta), least recently used first
+        self._inflight = {} # key -> (asyncio.Task loading the value, meta)
+        self._generation = 0 # Bumped on invalidation so loads that raced with it are not cached
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns (found, value) and counts a hit when found."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.stats["expirations"] += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return True, value
+
+    def set(self, key, value, meta=None):
+        self._entries[key] = (time.monotonic() + self.ttl, value, meta)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get_or_load(self, key, loader, meta=None):
+        """
+        Returns the cached value or awaits `loader()` to produce it.
+        Concurrent callers for the same key share one load. The load runs as its own task,
+        so a cancelled caller does not cancel it for the others. Exceptions are not cached.
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            self.stats["misses"] += 1
+            generation = self._generation
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = (task, meta)
+
+            def _store(done):
+                if self._inflight.get(key, (None,))[0] is done:
+                    del self._inflight[key]
+                if not done.cancelled() and done.exception() is None and generation == self._generation:
+                    self.set(key, done.result(), meta)
+
+            task.add_done_callback(_store)
+        else:
+            task = inflight[0]
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def invalidate(self, predicate):
+        """Drops every entry (and in-flight load) for which predicate(key, meta) is true."""
+        self._generation += 1
+        stale = [key for key, (_, _, meta) in self._entries.items() if predicate(key, meta)]
+        for key in stale:
+            del self._entries[key]
+        for key in [key for key, (_, meta) in self._inflight.items() if predicate(key, meta)]:
+            del self._inflight[key] # Still completes for its waiters, but new callers reload
+        self.stats["invalidations"] += len(stale)
+        return len(stale)
+
+    def clear(self):
+        self._generation += 1
+        self.stats["invalidations"] += len(self._entries)
+        self._entries.clear()
+        self._inflight.clear()
+
+    def get_stats(self):
+        stats = dict(self.stats, size=len(self._entries), maxsize=self.maxsize, ttl_seconds=self.ttl)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = (stats["hits"] + stats["coalesced"]) / lookups if lookups else 0.0
+        return stats
+
+
+def date_range_contains(start_date, end_date, date_str):
+    """True if the YYYY-MM-DD `date_str` falls inside an optional [start_date, end_date] range."""
+    if date_str is None:
+        return True # Unknown publication date: assume it can match anything
+    return (start_date is None or start_date <= date_str) and (end_date is None or date_str <= end_date)
@@ -0,0 +1,172 @@
+import json
+import os
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from observability.metrics import LLM_PROMPT_TOKENS
+
+try:
+    import tiktoken # Optional: exact counts for OpenAI-style tokenizers; otherwise ~4 characters per token
+except ImportError:
+    tiktoken = None
+
+load_dotenv()
+
+# Upper bound on prompt tokens sent to the LLM per request (system prompt + history + tool results)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000))
+# Older tool outputs are compacted to a summary of at most this many characters when over budget
+TOOL_SUMMARY_MAX_CHARS = int(os.getenv("TOOL_SUMMARY_MAX_CHARS", 300))
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4 # Role and separators added by the chat template
+TOKEN_COUNT_CACHE_SIZE = 4096
+COMPACTED_PREFIX = "[Earlier result" # Marks tool outputs that were already compacted
+
+_encoding = tiktoken.get_encoding(TOKENIZER_ENCODING) if tiktoken is not None else None
+
+context_stats = {
+    "requests": 0,
+    "prompt_tokens_total": 0,
+    "prompt_tokens_max": 0,
+    "prompt_tokens_last": 0,
+    "reported_prompt_tokens_total": 0, # As counted by the model server, when it returns usage
+    "reported_requests": 0,
+    "over_budget": 0, # Requests whose mandatory part alone exceeded the budget
+    "tool_messages_compacted": 0,
+    "messages_dropped": 0,
+    "token_cache_hits": 0,
+    "token_cache_misses": 0,
+}
+
+
+def count_text_tokens(text):
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class TokenCounter:
+    """
+    Counts message tokens, caching the count per message object.
+    History messages are never mutated once appended (compaction creates new dicts),
+    so each message is counted once even though the history is re-fitted on every request.
+    """
+
+    def __init__(self, maxsize=TOKEN_COUNT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._counts = OrderedDict() # id(message) -> (message, tokens); the reference keeps the id valid
+
+    def count(self, message):
+        entry = self._counts.get(id(message))
+        if entry is not None and entry[0] is message:
+            self._counts.move_to_end(id(message))
+            context_stats["token_cache_hits"] += 1
+            return entry[1]
+        context_stats["token_cache_misses"] += 1
+        tokens = MESSAGE_OVERHEAD_TOKENS + count_text_tokens(message.get("content") or "")
+        for tool_call in message.get("tool_calls") or []:
+            function = tool_call.get("function", {})
+            tokens += count_text_tokens(function.get("name", "")) + count_text_tokens(function.get("arguments", ""))
+        self._counts[id(message)] = (message, tokens)
+        while len(self._counts) > self.maxsize:
+            self._counts.popitem(last=False)
+        return tokens
+
+
+token_counter = TokenCounter()
+
+
+def summarize_tool_output(content, max_chars=TOOL_SUMMARY_MAX_CHARS):
+    """Short stand-in for an old tool result: titles and dates of the documents it returned."""
+    try:
+        documents = json.loads(content)
+    except (TypeError, ValueError):
+        documents = None
+    if isinstance(documents, list) and all(isinstance(doc, dict) for doc in documents):
+        items = [f"{doc.get('title')} ({doc.get('publication_date')})" for doc in documents]
+        summary = f"{COMPACTED_PREFIX}, {len(documents)} documents: " + "; ".join(items) + "]"
+    else:
+        summary = f"{COMPACTED_PREFIX}: {content}]"
+    if len(summary) > max_chars:
+        summary = summary[:max_chars - 4] + "...]"
+    return summary
+
+
+def _compacted(message):
+    return dict(message, content=summarize_tool_output(message.get("content")))
+
+
+def _current_turn_start(messages):
+    """Index of the latest user message; it and everything after it (tool calls, tool results) are kept."""
+    for index in range(len(messages) - 1, 0, -1):
+        if messages[index].get("role") == "user":
+            return index
+    return 1
+
+
+def fit_history(messages, budget=None):
+    """
+    Fits a history into `budget` prompt tokens. Returns (messages, prompt_tokens).
+    The system prompt and the current turn (latest user message plus the tool calls and
+    results that follow it) are always kept. Over budget, older tool outputs are first
+    compacted to summaries, oldest first, then the oldest whole turns are dropped so no
+    tool result is left without the assistant message that requested it.
+    """
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    if not messages:
+        return messages, 0
+
+    system, history = messages[:1], list(messages[1:])
+    total = sum(token_counter.count(message) for message in messages)
+    if total <= budget:
+        return messages, total
+
+    protected_from = _current_turn_start(messages) - 1 # Index into `history`
+
+    for index in range(protected_from):
+        if total <= budget:
+            break
+        message = history[index]
+        if message.get("role") == "tool" and not str(message.get("content")).startswith(COMPACTED_PREFIX):
+            history[index] = _compacted(message)
+            total += token_counter.count(history[index]) - token_counter.count(message)
+            context_stats["tool_messages_compacted"] += 1
+
+    dropped = 0
+    while total > budget and dropped < protected_from:
+        # Drop the oldest turn: one message, plus anything up to the next user message
+        total -= token_counter.count(history[dropped])
+        dropped += 1
+        while dropped < protected_from and history[dropped].get("role") != "user":
+            total -= token_counter.count(history[dropped])
+            dropped += 1
+    context_stats["messages_dropped"] += dropped
+
+    return system + history[dropped:], total
+
+
+def record_prompt_tokens(prompt_tokens, budget=None):
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    context_stats["requests"] += 1
+    LLM_PROMPT_TOKENS.observe(prompt_tokens)
+    context_stats["prompt_tokens_total"] += prompt_tokens
+    context_stats["prompt_tokens_last"] = prompt_tokens
+    context_stats["prompt_tokens_max"] = max(context_stats["prompt_tokens_max"], prompt_tokens)
+    if prompt_tokens > budget:
+        context_stats["over_budget"] += 1
+
+
+def record_reported_prompt_tokens(prompt_tokens):
+    if prompt_tokens:
+        context_stats["reported_requests"] += 1
+        context_stats["reported_prompt_tokens_total"] += prompt_tokens
+
+
+def get_context_stats():
+    stats = dict(context_stats, budget=CONTEXT_TOKEN_BUDGET, tokenizer=TOKENIZER_ENCODING if _encoding else "chars/4")
+    if stats["requests"]:
+        stats["prompt_tokens_avg"] = stats["prompt_tokens_total"] / stats["requests"]
+    return stats
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+
+import aiomysql
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Application-wide connection pool settings (configurable via .env)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", 5))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 3600))
+# Connections idle for longer than this are pinged before being handed out
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", 30))
+
+_pool = None
+_pool_lock = asyncio.Lock()
+_last_used = weakref.WeakKeyDictionary() # { connection: time.monotonic() of last release }
+
+pool_stats = {
+    "acquires": 0,
+    "acquire_timeouts": 0,
+    "health_checks": 0,
+    "health_check_failures": 0,
+    "acquire_wait_seconds_total": 0.0,
+    "acquire_wait_seconds_max": 0.0,
+}
+
+
+async def init_pool():
+    """Creates the shared pool. Called once from the FastAPI lifespan; safe to call again."""
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await aiomysql.create_pool(
+                host=os.getenv("MYSQL_HOST"),
+                port=int(os.getenv("MYSQL_PORT", 3306)),
+                user=os.getenv("MYSQL_USER"),
+                password=os.getenv("MYSQL_PASSWORD"),
+                db=os.getenv("MYSQL_DB"),
+                minsize=DB_POOL_MIN_SIZE,
+                maxsize=DB_POOL_MAX_SIZE,
+                pool_recycle=DB_POOL_RECYCLE_SECONDS,
+                autocommit=True, # Simpler for read queries
+                cursorclass=aiomysql.cursors.DictCursor # Get results as dictionaries
+            )
+            print(f"Database pool created (minsize={DB_POOL_MIN_SIZE}, maxsize={DB_POOL_MAX_SIZE}).")
+    return _pool
+
+
+async def close_pool():
+    """Closes the shared pool. Called from the FastAPI lifespan on shutdown."""
+    global _pool
+    async with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            await _pool.wait_closed()
+            _pool = None
+            print("Database pool closed.")
+
+
+async def get_pool():
+    """Returns the shared pool, creating it lazily (e.g. when tools are used outside the API)."""
+    if _pool is None:
+        return await init_pool()
+    return _pool
+
+
+async def _health_check(conn):
+    """Pings connections that have sat idle for a while; reconnects if the server dropped them."""
+    last_used = _last_used.get(conn)
+    if last_used is not None and time.monotonic() - last_used < DB_POOL_HEALTH_CHECK_INTERVAL:
+        return
+    pool_stats["health_checks"] += 1
+    try:
+        await conn.ping(reconnect=True)
+    except aiomysql.MySQLError:
+        pool_stats["health_check_failures"] += 1
+        raise
+
+
+@asynccontextmanager
+async def acquire_connection(timeout: float = None):
+    """
+    Acquires a healthy connection from the shared pool.
+    Raises asyncio.TimeoutError if no connection becomes available within `timeout` seconds.
+    """
+    pool = await get_pool()
+    timeout = DB_POOL_ACQUIRE_TIMEOUT if timeout is None else timeout
+
+    started = time.monotonic()
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pool_stats["acquire_timeouts"] += 1
+        raise
+    waited = time.monotonic() - started
+    pool_stats["acquires"] += 1
+    pool_stats["acquire_wait_seconds_total"] += waited
+    pool_stats["acquire_wait_seconds_max"] = max(pool_stats["acquire_wait_seconds_max"], waited)
+
+    try:
+        await _health_check(conn)
+        yield conn
+    finally:
+        _last_used[conn] = time.monotonic()
+        pool.release(conn)
+
+
+async def warm_pool():
+    """Round-trips a query on a pooled connection so the first request does not pay for connecting."""
+    async with acquire_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT 1")
+            await cur.fetchone()
+
+
+def get_pool_metrics() -> dict:
+    """Snapshot of pool usage, suitable for returning from an API endpoint."""
+    metrics = dict(pool_stats)
+    if _pool is not None:
+        metrics.update({
+            "minsize": _pool.minsize,
+            "maxsize": _pool.maxsize,
+            "size": _pool.size,
+            "free": _pool.freesize,
+            "in_use": _pool.size - _pool.freesize,
+        })
+    else:
+        metrics.update({"minsize": DB_POOL_MIN_SIZE, "maxsize": DB_POOL_MAX_SIZE, "size": 0, "free": 0, "in_use": 0})
+    if metrics["acquires"]:
+        metrics["acquire_wait_seconds_avg"] = metrics["acquire_wait_seconds_total"] / metrics["acquires"]
+    return metrics
@@ -1,164 +1,387 @@
 import os
 import json
+import time
 import asyncio
+import logging
 from openai import AsyncOpenAI # Official OpenAI client, works with Ollama
 from dotenv import load_dotenv
 from agent.tools import AVAILABLE_TOOLS, TOOL_DEFINITIONS # Import from our tools module
+from agent.session_store import create_session_store
+from agent.context import fit_history, record_prompt_tokens, record_reported_prompt_tokens, CONTEXT_TOKEN_BUDGET
+from agent.llm_cache import cached_completion, cached_stream
+from observability.logs import get_logger
+from observability.metrics import LLM_REQUEST_SECONDS, TOOL_CALL_SECONDS
+from observability.tracing import span
 
 load_dotenv()
 
+logger = get_logger("agent")
+
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL")
 
-if not OLLAMA_BASE_URL or not OLLAMA_MODEL:
-    raise ValueError("OLLAMA_BASE_URL and OLLAMA_MODEL must be set in .env")
-
-# Initialize the AsyncOpenAI client for Ollama
-# Note: Ollama might not use an API key, but the client might expect something.
-# For Ollama, the key is often a placeholder like "ollama" or can be omitted
-# if the client handles it gracefully. Let's try omitting it first.
-# If issues, try api_key="ollama".
-client = AsyncOpenAI(
-    base_url=OLLAMA_BASE_URL,
-    api_key='ollama' # Required by the openai package, even if Ollama doesn't use it
+# Startup warmup (see api/main.py): a one-token request with the chat prompt prefix loads the model,
+# then a keep-alive request is re-sent whenever the model sat idle this long. Ollama unloads idle
+# models after 5 minutes by default. 0 disables the keep-alive.
+LLM_WARMUP_PROMPT = os.getenv("LLM_WARMUP_PROMPT", "Hello")
+LLM_KEEPALIVE_INTERVAL = float(os.getenv("LLM_KEEPALIVE_INTERVAL", 240))
+
+_client = None
+_last_llm_call = 0.0 # time.monotonic() of the last request sent to the model
+
+
+def get_client():
+    """The AsyncOpenAI client for Ollama, created on first use so importing this module needs no configuration."""
+    global _client
+    if _client is None:
+        if not OLLAMA_BASE_URL or not OLLAMA_MODEL:
+            raise RuntimeError("OLLAMA_BASE_URL and OLLAMA_MODEL must be set in .env")
+        _client = AsyncOpenAI(
+            base_url=OLLAMA_BASE_URL,
+            api_key='ollama' # Required by the openai package, even if Ollama doesn't use it
+        )
+    return _client
+
+
+def _mark_llm_call():
+    global _last_llm_call
+    _last_llm_call = time.monotonic()
+
+# Chat histories per session: bounded in-memory LRU, or MySQL when SESSION_STORE=mysql
+session_store = create_session_store() # { "session_id": [{"role": "user", "content": "..."}, ...], ... }
+# History is trimmed to a prompt token budget (CONTEXT_TOKEN_BUDGET, see agent/context.py)
+
+# Tool calls requested in one LLM turn run concurrently, each with its own timeout (seconds)
+TOOL_CALL_CONCURRENCY = int(os.getenv("TOOL_CALL_CONCURRENCY", 4))
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", 20))
+# How many rounds of tool calls the model may chain before it has to answer
+MAX_TOOL_ROUNDS = int(os.getenv("MAX_TOOL_ROUNDS", 3))
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that can query a database of US Federal Register documents. "
+    "When asked about documents, use the 'search_federal_documents_in_db' tool. "
+    "To restrict a search to an agency, a topic or a CFR part, use its agency, topic or cfr_reference filter "
+    "rather than adding those words to search_term. "
+    "For questions about how many documents were published, or how that changed over time, "
+    "use the 'count_federal_documents' tool. "
+    "Provide concise summaries based on the tool's output. "
+    "Always inform the user if no documents are found or if there's an issue. "
+    "If asked for current date, you can state you don't have direct access but can search recent documents."
+    "Be polite and helpful."
 )
+ERROR_MESSAGE_FOR_USER = "Sorry, I encountered an error while processing your request. Please try again."
 
-# In-memory store for chat histories (for demo purposes)
-# In a real app, this would be a database.
-chat_histories = {} # { "session_id": [{"role": "user", "content": "..."}, ...], ... }
-MAX_HISTORY_LEN = 10 # Keep last 10 messages (user + assistant + tool)
 
-async def get_agent_response(session_id: str, user_query: str) -> str:
-    if session_id not in chat_histories:
-        chat_histories[session_id] = [{
-            "role": "system", 
-            "content": (
-                "You are a helpful assistant that can query a database of US Federal Register documents. "
-                "When asked about documents, use the 'search_federal_documents_in_db' tool. "
-                "Provide concise summaries based on the tool's output. "
-                "Always inform the user if no documents are found or if there's an issue. "
-                "If asked for current date, you can state you don't have direct access but can search recent documents."
-                "Be polite and helpful."
-            )
-        }]
+def _trim_history(history):
+    """Fits the history into the prompt token budget and records the prompt size of the upcoming LLM call."""
+    trimmed, prompt_tokens = fit_history(history)
+    record_prompt_tokens(prompt_tokens)
+    logger.debug("prompt fitted", messages=len(trimmed), prompt_tokens=prompt_tokens, budget=CONTEXT_TOKEN_BUDGET)
+    return trimmed
 
-    current_history = chat_histories[session_id]
-    current_history.append({"role": "user", "content": user_query})
+
+async def _start_turn(session_id, user_query):
+    """Loads the session history, appends the user's message and returns the (trimmed) history."""
+    history = await session_store.load(session_id)
+    if history is None:
+        history = [{"role": "system", "content": SYSTEM_PROMPT}]
+
+    history.append({"role": "user", "content": user_query})
 
     # Trim history if it's too long
-    if len(current_history) > MAX_HISTORY_LEN:
-        # Keep system prompt + last MAX_HISTORY_LEN-1 messages
-        current_history = [current_history[0]] + current_history[-(MAX_HISTORY_LEN-1):]
-        chat_histories[session_id] = current_history
+    current_history = _trim_history(history)
     
-    print(f"\n--- Current conversation history for session {session_id} (for LLM) ---")
-    for msg in current_history:
-        print(f"- {msg['role']}: {str(msg['content'])[:200]}...") # Log snippet
-    print("--- End of history ---")
+    if logger.sampled(logging.DEBUG): # Building the dump is itself costly, so only for sampled turns
+        logger.debug("conversation history", session_id=session_id, history=[
+            {"role": msg["role"], "content": str(msg.get("content"))[:200]} for msg in current_history
+        ])
+    return current_history
 
 
+async def _save_history(session_id, history):
+    """Saves the turn's history. Store errors are logged, not raised: the reply has already been produced."""
     try:
-        print(f"Sending to LLM with model: {OLLAMA_MODEL}")
-        response = await client.chat.completions.create(
-            model=OLLAMA_MODEL,
-            messages=current_history,
-            tools=TOOL_DEFINITIONS,
-            tool_choice="auto" # Let the model decide if it needs a tool
-        )
+        await session_store.save(session_id, history)
+    except Exception as e:
+        logger.error(f"Error saving chat history: {e}", exc_info=True, session_id=session_id)
+
+
+async def _execute_tool_call(function_name, function_args_str):
+    """Runs one tool requested by the LLM and returns its output (or an error message) as a string."""
+    if function_name not in AVAILABLE_TOOLS:
+        error_msg = f"Error: LLM tried to call unknown function '{function_name}'"
+        logger.warning(error_msg)
+        return error_msg
+
+    function_to_call = AVAILABLE_TOOLS[function_name]
+    try:
+        function_args = json.loads(function_args_str or "{}")
+        logger.info("calling tool", tool=function_name, args=function_args)
         
-        response_message = response.choices[0].message
-        # print(f"LLM raw response_message object: {response_message}")
+        # Ensure args are passed correctly, especially if some are optional
+        # The tool function itself should handle Optional[str]=None etc.
+        function_response = await function_to_call(**function_args)
+        
+        if logger.sampled(logging.DEBUG):
+            logger.debug("tool response", tool=function_name, snippet=str(function_response)[:200])
+        return function_response # Must be a string
+    except json.JSONDecodeError:
+        err_msg = f"Error: Invalid JSON arguments from LLM for {function_name}: {function_args_str}"
+        logger.warning(err_msg)
+        return err_msg
+    except Exception as e:
+        err_msg = f"Error executing tool {function_name}: {e}"
+        logger.error(err_msg, tool=function_name)
+        return err_msg
 
-        tool_calls = response_message.tool_calls
 
-        if tool_calls:
-            print(f"LLM requested tool call(s): {tool_calls}")
-            # Append the assistant's message with tool calls to history
-            current_history.append(response_message) # Model's turn, includes tool_calls
+def _tool_message(tool_call_id, function_name, content):
+    return {"tool_call_id": tool_call_id, "role": "tool", "name": function_name, "content": content}
+
+
+async def _run_tool_call(semaphore, function_name, function_args_str):
+    async with semaphore:
+        started = time.perf_counter()
+        outcome = "ok"
+        with span("tool_call", tool=function_name) as tool_span:
+            try:
+                result = await asyncio.wait_for(
+                    _execute_tool_call(function_name, function_args_str), timeout=TOOL_CALL_TIMEOUT
+                )
+                if result.startswith("Error"):
+                    outcome = "error"
+            except asyncio.TimeoutError:
+                result = f"Error: tool {function_name} timed out after {TOOL_CALL_TIMEOUT} seconds"
+                outcome = "timeout"
+                logger.warning(result, tool=function_name)
+            tool_span.set(outcome=outcome, chars=len(result))
+        TOOL_CALL_SECONDS.observe(time.perf_counter() - started, tool=function_name, outcome=outcome)
+        return result
+
+
+async def _run_tool_calls(tool_calls):
+    """
+    Runs the tool calls of one LLM turn concurrently (at most TOOL_CALL_CONCURRENCY at a time),
+    each with its own timeout. Returns the tool messages in the order the calls were requested.
+    If the request is cancelled, all outstanding calls are cancelled with it.
+    """
+    semaphore = asyncio.Semaphore(TOOL_CALL_CONCURRENCY)
+    results = await asyncio.gather(*(
+        _run_tool_call(semaphore, call["function"]["name"], call["function"]["arguments"])
+        for call in tool_calls
+    ))
+    return [
+        _tool_message(call["id"], call["function"]["name"], content)
+        for call, content in zip(tool_calls, results)
+    ]
+
+
+def _completion_kwargs(tool_round):
+    """Tools are offered for the first MAX_TOOL_ROUNDS calls of a turn; the call after that must answer."""
+    if tool_round < MAX_TOOL_ROUNDS:
+        return {"tools": TOOL_DEFINITIONS, "tool_choice": "auto"} # Let the model decide if it needs a tool
+    return {}
+
+
+async def _create_completion(messages, tool_round):
+    """
+    One non-streaming LLM turn through the response cache (agent/llm_cache.py).
+    Returns the assistant message as a dict. Actual model calls are timed as a span and in llm_request_duration_seconds.
+    """
+    request_kwargs = _completion_kwargs(tool_round)
+    messages = list(messages) # The request may outlive this turn's mutations when coalesced
+
+    async def create():
+        started = time.perf_counter()
+        outcome = "error"
+        with span("llm_completion", model=OLLAMA_MODEL, tool_round=tool_round, messages=len(messages)):
+            _mark_llm_call()
+            try:
+                response = await get_client().chat.completions.create(
+                    model=OLLAMA_MODEL,
+                    messages=messages,
+                    **request_kwargs
+                )
+                outcome = "ok"
+            finally:
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=OLLAMA_MODEL, mode="completion", outcome=outcome)
+        if response.usage:
+            record_reported_prompt_tokens(response.usage.prompt_tokens)
+        # Stored as a plain dict so the history stays loggable and serializable
+        return response.choices[0].message.model_dump(exclude_none=True)
 
-            for tool_call in tool_calls:
-                function_name = tool_call.function.name
-                function_args_str = tool_call.function.arguments
-                
-                if function_name not in AVAILABLE_TOOLS:
-                    error_msg = f"Error: LLM tried to call unknown function '{function_name}'"
-                    print(error_msg)
-                    current_history.append({
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": error_msg,
+    return await cached_completion(OLLAMA_MODEL, messages, request_kwargs, create)
+
+
+async def get_agent_response(session_id: str, user_query: str) -> str:
+    current_history = await _start_turn(session_id, user_query)
+
+    try:
+        for tool_round in range(MAX_TOOL_ROUNDS + 1):
+            logger.debug("sending to LLM", model=OLLAMA_MODEL, tool_round=tool_round)
+            response_message = await _create_completion(current_history, tool_round)
+
+            if not response_message.get("tool_calls"):
+                break
+
+            logger.info("LLM requested tool calls", tools=[call["function"]["name"] for call in response_message["tool_calls"]])
+            tool_messages = await _run_tool_calls(response_message["tool_calls"])
+            # The assistant's message with tool calls and the tool replies are added together, so a
+            # cancelled or failed round never saves tool_calls without their replies
+            current_history += [response_message, *tool_messages]
+
+            # Now, send the history (including tool responses) back to the LLM
+            # Trim history again before the next call if it grew too much
+            current_history = _trim_history(current_history)
+
+        final_answer = response_message.get("content")
+        current_history.append({"role": "assistant", "content": final_answer})
+        if logger.sampled(logging.DEBUG):
+            logger.debug("LLM final response", snippet=str(final_answer)[:200])
+        return final_answer
+
+    except Exception as e:
+        logger.error(f"Error in LLM communication or processing: {e}", exc_info=True, session_id=session_id)
+        # Add this error to history so it doesn't loop on error
+        current_history.append({"role": "assistant", "content": ERROR_MESSAGE_FOR_USER})
+        return ERROR_MESSAGE_FOR_USER
+    finally:
+        # Ensure history is saved back (it is trimmed again before the next LLM call)
+        await _save_history(session_id, current_history)
+
+
+async def _stream_completion(messages, **kwargs):
+    """
+    Streams one chat completion. Yields ("token", text) for content deltas as they arrive,
+    then a final ("message", assistant message dict) with any tool calls reassembled from their deltas.
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    content_parts = []
+    tool_calls = {} # index -> {"id", "type", "function": {"name", "arguments"}}
+    with span("llm_stream", model=OLLAMA_MODEL, messages=len(messages)) as stream_span:
+        _mark_llm_call()
+        try:
+            stream = await get_client().chat.completions.create(model=OLLAMA_MODEL, messages=messages, stream=True, **kwargs)
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    if not content_parts:
+                        stream_span.set(first_token_ms=round((time.perf_counter() - started) * 1000, 1))
+                    content_parts.append(delta.content)
+                    yield "token", delta.content
+                for tool_call_delta in delta.tool_calls or []:
+                    call = tool_calls.setdefault(tool_call_delta.index, {
+                        "id": None, "type": "function", "function": {"name": "", "arguments": ""}
                     })
-                    # Potentially let LLM try to recover or just return error to user
-                    # For now, let's make another call to LLM with this error info
-                    # This might not be strictly necessary if we are sure LLM won't hallucinate tools.
+                    if tool_call_delta.id:
+                        call["id"] = tool_call_delta.id
+                    if tool_call_delta.function:
+                        call["function"]["name"] += tool_call_delta.function.name or ""
+                        call["function"]["arguments"] += tool_call_delta.function.arguments or ""
+            outcome = "ok"
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=OLLAMA_MODEL, mode="stream", outcome=outcome)
 
-                else:
-                    function_to_call = AVAILABLE_TOOLS[function_name]
-                    try:
-                        function_args = json.loads(function_args_str)
-                        print(f"Calling tool: {function_name} with args: {function_args}")
-                        
-                        # Ensure args are passed correctly, especially if some are optional
-                        # The tool function itself should handle Optional[str]=None etc.
-                        function_response = await function_to_call(**function_args)
-                        
-                        print(f"Tool {function_name} response (snippet): {str(function_response)[:200]}...")
-                        current_history.append({
-                            "tool_call_id": tool_call.id,
-                            "role": "tool",
-                            "name": function_name,
-                            "content": function_response, # Must be a string
-                        })
-                    except json.JSONDecodeError:
-                        err_msg = f"Error: Invalid JSON arguments from LLM for {function_name}: {function_args_str}"
-                        print(err_msg)
-                        current_history.append({
-                            "tool_call_id": tool_call.id, "role": "tool", "name": function_name, "content": err_msg
-                        })
-                    except Exception as e:
-                        err_msg = f"Error executing tool {function_name}: {e}"
-                        print(err_msg)
-                        current_history.append({
-                            "tool_call_id": tool_call.id, "role": "tool", "name": function_name, "content": err_msg
-                        })
-
-            # Now, send the history (including tool responses) back to the LLM for a final answer
-            print("Sending conversation with tool results back to LLM for final response...")
-            
-            # Trim history again before the final call if it grew too much
-            if len(current_history) > MAX_HISTORY_LEN:
-                current_history = [current_history[0]] + current_history[-(MAX_HISTORY_LEN-1):]
-                chat_histories[session_id] = current_history
-
-            second_response = await client.chat.completions.create(
+    message = {"role": "assistant", "content": "".join(content_parts) or None}
+    if tool_calls:
+        message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+        for position, call in enumerate(message["tool_calls"]):
+            call["id"] = call["id"] or f"call_{position}"
+    yield "message", message
+
+
+async def warm_up_model():
+    """
+    Sends a one-token completion that starts like every chat turn (system prompt + tool schema), so Ollama
+    loads the model into memory and can reuse that prompt prefix. Bypasses the response cache.
+    Returns the seconds it took; raises if the model server is unreachable.
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    with span("llm_warmup", model=OLLAMA_MODEL):
+        _mark_llm_call()
+        try:
+            await get_client().chat.completions.create(
                 model=OLLAMA_MODEL,
-                messages=current_history
+                messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": LLM_WARMUP_PROMPT}],
+                max_tokens=1,
+                **_completion_kwargs(0)
             )
-            final_answer = second_response.choices[0].message.content
-            current_history.append({"role": "assistant", "content": final_answer})
-            print(f"LLM final response: {final_answer}")
-            return final_answer
-        
-        else:
-            # No tool call, LLM gave a direct answer
-            final_answer = response_message.content
-            current_history.append({"role": "assistant", "content": final_answer})
-            print(f"LLM direct response: {final_answer}")
-            return final_answer
+            outcome = "ok"
+        finally:
+            elapsed = time.perf_counter() - started
+            LLM_REQUEST_SECONDS.observe(elapsed, model=OLLAMA_MODEL, mode="warmup", outcome=outcome)
+    return elapsed
+
+
+async def keep_model_warm(interval=LLM_KEEPALIVE_INTERVAL):
+    """Runs until cancelled: repeats the warmup request whenever no request reached the model for `interval` seconds."""
+    while True:
+        await asyncio.sleep(max(1.0, interval - (time.monotonic() - _last_llm_call)))
+        if time.monotonic() - _last_llm_call < interval:
+            continue # Real traffic kept the model loaded
+        try:
+            await warm_up_model()
+        except Exception as e:
+            logger.warning("keep-alive request failed", error=str(e))
+
+
+async def stream_agent_response(session_id: str, user_query: str):
+    """
+    Streaming variant of get_agent_response. Yields (event, data) pairs:
+    ("tool_call", {...}) and ("tool_result", {...}) while tools run, ("token", {"content"}) as the
+    answer is generated, then ("done", {"response"}) or ("error", {"message"}).
+    Tokens streamed before a tool_call event are a preamble, not part of the answer in "done".
+    """
+    current_history = await _start_turn(session_id, user_query)
+    answer_parts = []
+
+    try:
+        for tool_round in range(MAX_TOOL_ROUNDS + 1):
+            logger.debug("streaming from LLM", model=OLLAMA_MODEL, tool_round=tool_round)
+            answer_parts = [] # Any preamble before a tool call is not part of the final answer
+            response_message = None
+            request_kwargs = _completion_kwargs(tool_round)
+            messages = list(current_history)
+            async for kind, payload in cached_stream(
+                OLLAMA_MODEL, messages, request_kwargs, lambda: _stream_completion(messages, **request_kwargs)
+            ):
+                if kind == "token":
+                    answer_parts.append(payload)
+                    yield "token", {"content": payload}
+                else:
+                    response_message = payload
+
+            if not response_message.get("tool_calls"):
+                break
+
+            logger.info("LLM requested tool calls", tools=[call["function"]["name"] for call in response_message["tool_calls"]])
+            for tool_call in response_message["tool_calls"]:
+                yield "tool_call", {"name": tool_call["function"]["name"], "arguments": tool_call["function"]["arguments"]}
+            tool_messages = await _run_tool_calls(response_message["tool_calls"])
+            # Added together, so a client disconnecting mid-round never saves tool_calls without their replies
+            current_history.append(response_message) # Model's turn, includes tool_calls
+            current_history.extend(tool_messages)
+            for tool_message in tool_messages:
+                yield "tool_result", {"name": tool_message["name"], "chars": len(tool_message["content"])}
+
+            current_history = _trim_history(current_history)
+
+        final_answer = "".join(answer_parts)
+        current_history.append({"role": "assistant", "content": final_answer})
+        if logger.sampled(logging.DEBUG):
+            logger.debug("LLM streamed response", snippet=final_answer[:200])
+        yield "done", {"response": final_answer}
 
     except Exception as e:
-        print(f"Error in LLM communication or processing: {e}")
-        # Log the error details, traceback etc. in a real app
-        # traceback.print_exc() 
-        error_message_for_user = "Sorry, I encountered an error while processing your request. Please try again."
-        # Add this error to history so it doesn't loop on error
-        current_history.append({"role": "assistant", "content": error_message_for_user})
-        return error_message_for_user
+        logger.error(f"Error in LLM streaming or processing: {e}", exc_info=True, session_id=session_id)
+        current_history.append({"role": "assistant", "content": ERROR_MESSAGE_FOR_USER})
+        yield "error", {"message": ERROR_MESSAGE_FOR_USER}
     finally:
-        # Ensure history is saved back, trimmed if needed
-        if len(chat_histories[session_id]) > MAX_HISTORY_LEN:
-           chat_histories[session_id] = [chat_histories[session_id][0]] + chat_histories[session_id][-(MAX_HISTORY_LEN-1):]
+        await _save_history(session_id, current_history)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,163 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from agent.cache import TTLCache
+from observability.metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS
+
+load_dotenv()
+
+# Responses are cached per (normalized messages, model, tools). TTL 0 turns reuse off but keeps coalescing.
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 256))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 600)) # Seconds
+# Concurrent requests per model; the rest wait in that model's queue
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 2))
+
+response_cache = TTLCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL)
+_model_queues = {}
+
+
+class ModelQueue:
+    """Caps concurrent requests to one model and reports how many are waiting for a slot."""
+
+    def __init__(self, model, limit):
+        self.model = model
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+        self.waiting = 0
+        self.active = 0
+        self.stats = {"requests": 0, "queued": 0, "max_waiting": 0, "wait_seconds_total": 0.0}
+
+    @asynccontextmanager
+    async def slot(self):
+        started = time.perf_counter()
+        self.stats["requests"] += 1
+        if self._semaphore.locked():
+            self.stats["queued"] += 1
+        self.waiting += 1
+        self.stats["max_waiting"] = max(self.stats["max_waiting"], self.waiting)
+        LLM_QUEUE_DEPTH.set(self.waiting, model=self.model)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+            LLM_QUEUE_DEPTH.set(self.waiting, model=self.model)
+        waited = time.perf_counter() - started
+        self.stats["wait_seconds_total"] += waited
+        LLM_QUEUE_WAIT_SECONDS.observe(waited, model=self.model)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def get_stats(self):
+        return dict(self.stats, waiting=self.waiting, active=self.active, limit=self.limit)
+
+
+def get_model_queue(model):
+    queue = _model_queues.get(model)
+    if queue is None:
+        queue = _model_queues[model] = ModelQueue(model, LLM_MAX_CONCURRENCY)
+    return queue
+
+
+def _normalize_message(message):
+    """The parts of a message that determine the model's answer (no call ids, collapsed whitespace)."""
+    normalized = {"role": message["role"]}
+    content = message.get("content")
+    normalized["content"] = " ".join(content.split()) if isinstance(content, str) else content
+    if message.get("name"):
+        normalized["name"] = message["name"]
+    calls = []
+    for call in message.get("tool_calls") or []:
+        arguments = call["function"]["arguments"]
+        try:
+            arguments = json.loads(arguments or "{}")
+        except json.JSONDecodeError:
+            pass # Keep the raw string
+        calls.append([call["function"]["name"], arguments])
+    if calls:
+        normalized["tool_calls"] = calls
+    return normalized
+
+
+def completion_key(model, messages, request_kwargs):
+    """SHA-256 over the normalized message list, the model and the tool definitions / tool_choice."""
+    payload = {
+        "model": model,
+        "messages": [_normalize_message(message) for message in messages],
+        "kwargs": request_kwargs,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+async def cached_completion(model, messages, request_kwargs, create):
+    """
+    Returns the assistant message dict for `messages`, from the cache when possible.
+    On a miss, `create()` runs once per key no matter how many identical requests arrive meanwhile,
+    and only after a slot in the model's queue is free.
+    """
+    async def load():
+        async with get_model_queue(model).slot():
+            return await create()
+
+    message = await response_cache.get_or_load(completion_key(model, messages, request_kwargs), load)
+    return copy.deepcopy(message) # Callers append it to (and later compact) their own history
+
+
+async def cached_stream(model, messages, request_kwargs, open_stream):
+    """
+    Streaming counterpart of cached_completion. `open_stream()` returns an async iterator of
+    ("token", text) pairs followed by ("message", assistant message dict).
+    The first request for a key streams tokens live. Cache hits and identical concurrent requests
+    receive the whole answer as one token once it is ready. The model call runs as a shared task,
+    so a client disconnecting does not fail the requests coalesced onto it (the answer still gets cached).
+    """
+    tokens = asyncio.Queue()
+
+    async def load():
+        message = None
+        async with get_model_queue(model).slot():
+            async for kind, payload in open_stream():
+                if kind == "token":
+                    tokens.put_nowait(payload)
+                else:
+                    message = payload
+        return message
+
+    result = asyncio.ensure_future(
+        response_cache.get_or_load(completion_key(model, messages, request_kwargs), load)
+    )
+    streamed = False
+    try:
+        while not result.done():
+            next_token = asyncio.ensure_future(tokens.get())
+            await asyncio.wait({next_token, result}, return_when=asyncio.FIRST_COMPLETED)
+            if next_token.done():
+                streamed = True
+                yield "token", next_token.result()
+            else:
+                next_token.cancel()
+        while not tokens.empty():
+            streamed = True
+            yield "token", tokens.get_nowait()
+        message = copy.deepcopy(result.result())
+    finally:
+        result.cancel() # Only this caller's wait; the shared load task is shielded
+
+    if not streamed and message.get("content"):
+        yield "token", message["content"]
+    yield "message", message
+
+
+def get_llm_cache_stats():
+    return {
+        "cache": response_cache.get_stats(),
+        "models": {model: queue.get_stats() for model, queue in _model_queues.items()},
+    }
@@ -0,0 +1,292 @@
+import abc
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+
+import aiomysql
+from dotenv import load_dotenv
+
+from agent.db import acquire_connection
+from data_pipeline.db_setup import CHAT_SESSIONS_TABLE_DDL
+from observability.logs import get_logger
+
+load_dotenv()
+
+logger = get_logger("session_store")
+
+# Where chat histories live: "memory" (per process, lost on restart) or "mysql" (shared by all workers)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 24 * 3600)) # Idle sessions expire after this
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", 10000))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", 64 * 1024 * 1024)) # Approximate, measured as JSON size
+# MySQL backend: in-process cache in front of the table, and write batching
+SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", 60)) # Set to 0 if the load balancer isn't sticky
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", 1.0))
+SESSION_FLUSH_BATCH_SIZE = int(os.getenv("SESSION_FLUSH_BATCH_SIZE", 100))
+SESSION_PURGE_INTERVAL = int(os.getenv("SESSION_PURGE_INTERVAL", 3600))
+SESSION_ID_MAX_LENGTH = 64 # chat_sessions.session_id is VARCHAR(64); the API rejects longer ids
+
+UPSERT_SESSIONS_SQL = """
+    INSERT INTO chat_sessions (session_id, messages)
+    VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE messages = VALUES(messages)
+"""
+# Errors caused by a row's values rather than the connection: retrying the row can never succeed
+REJECTED_ROW_ERRORS = (aiomysql.DataError, aiomysql.IntegrityError)
+
+
+def _serialize(messages):
+    return json.dumps(messages, separators=(",", ":"), default=str)
+
+
+class SessionStore(abc.ABC):
+    """
+    Interface of a chat history store. Histories are lists of OpenAI-style message dicts.
+    load() returns None for unknown or expired sessions, else a list of the caller's own to change;
+    the stored history only changes through save().
+    """
+
+    @abc.abstractmethod
+    async def load(self, session_id):
+        ...
+
+    @abc.abstractmethod
+    async def save(self, session_id, messages):
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, session_id):
+        ...
+
+    async def flush(self):
+        """Writes out anything buffered. No-op for stores that write through."""
+
+    async def close(self):
+        await self.flush()
+
+    def get_stats(self):
+        return {}
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Per-process LRU of histories with an idle TTL, a session count cap and an approximate byte cap.
+    Least recently used sessions are evicted first when either cap is exceeded.
+    """
+
+    def __init__(self, max_sessions=SESSION_MAX_COUNT, ttl=SESSION_TTL_SECONDS, max_bytes=SESSION_MAX_BYTES):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict() # session_id -> (expires_at, messages, size in bytes), least recent first
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _drop(self, session_id):
+        _, _, size = self._sessions.pop(session_id)
+        self._bytes -= size
+
+    async def load(self, session_id):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        expires_at, messages, _ = entry
+        if expires_at < time.monotonic():
+            self._drop(session_id)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+        self._sessions.move_to_end(session_id)
+        self.stats["hits"] += 1
+        return list(messages)
+
+    async def save(self, session_id, messages, size=None):
+        if session_id in self._sessions:
+            self._drop(session_id)
+        size = len(_serialize(messages)) if size is None else size
+        self._sessions[session_id] = (time.monotonic() + self.ttl, list(messages), size)
+        self._bytes += size
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            oldest = next(iter(self._sessions))
+            if oldest == session_id:
+                break # Always keep the session that was just written, even if it alone exceeds the cap
+            self._drop(oldest)
+            self.stats["evictions"] += 1
+
+    async def delete(self, session_id):
+        if session_id in self._sessions:
+            self._drop(session_id)
+
+    def get_stats(self):
+        return dict(
+            self.stats, backend="memory", sessions=len(self._sessions), bytes=self._bytes,
+            max_sessions=self.max_sessions, max_bytes=self.max_bytes, ttl_seconds=self.ttl,
+        )
+
+
+class MySQLSessionStore(SessionStore):
+    """
+    Histories persisted in the chat_sessions table, so every API worker sees the same sessions.
+    Histories are loaded lazily on first use and kept in a bounded MemorySessionStore.
+    Saves are buffered and written in one multi-row upsert every SESSION_FLUSH_INTERVAL seconds
+    (or as soon as SESSION_FLUSH_BATCH_SIZE sessions are dirty); repeated saves of a session coalesce.
+    """
+
+    def __init__(self, cache_ttl=SESSION_CACHE_TTL, ttl=SESSION_TTL_SECONDS,
+                 flush_interval=SESSION_FLUSH_INTERVAL, flush_batch_size=SESSION_FLUSH_BATCH_SIZE):
+        self.cache = MemorySessionStore(ttl=cache_ttl)
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self._dirty = {} # session_id -> messages not yet written
+        self._flush_lock = asyncio.Lock()
+        self._flusher = None
+        self._table_ready = False
+        self._last_purge = time.monotonic()
+        self.stats = {"db_loads": 0, "db_misses": 0, "flushes": 0, "rows_written": 0, "flush_errors": 0, "rows_dropped": 0, "purged": 0}
+
+    async def _ensure_table(self, cur):
+        if not self._table_ready:
+            await cur.execute(CHAT_SESSIONS_TABLE_DDL)
+            self._table_ready = True
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def load(self, session_id):
+        messages = await self.cache.load(session_id)
+        if messages is not None:
+            return messages
+        if session_id in self._dirty:
+            messages = self._dirty[session_id] # Evicted from the cache before it was flushed
+        else:
+            messages = await self._load_from_db(session_id)
+            if messages is None:
+                return None
+        await self.cache.save(session_id, messages)
+        return list(messages)
+
+    async def _load_from_db(self, session_id):
+        self.stats["db_loads"] += 1
+        async with acquire_connection() as conn:
+            async with conn.cursor() as cur:
+                await self._ensure_table(cur)
+                await cur.execute(
+                    """
+                    SELECT messages FROM chat_sessions
+                    WHERE session_id = %s AND updated_at >= NOW() - INTERVAL %s SECOND
+                    """,
+                    (session_id, self.ttl)
+                )
+                row = await cur.fetchone()
+        if row is None:
+            self.stats["db_misses"] += 1
+            return None
+        return json.loads(row["messages"])
+
+    async def save(self, session_id, messages):
+        await self.cache.save(session_id, messages)
+        self._dirty[session_id] = list(messages)
+        self._ensure_flusher()
+        if len(self._dirty) >= self.flush_batch_size:
+            await self.flush()
+
+    async def delete(self, session_id):
+        await self.cache.delete(session_id)
+        self._dirty.pop(session_id, None)
+        async with acquire_connection() as conn:
+            async with conn.cursor() as cur:
+                await self._ensure_table(cur)
+                await cur.execute("DELETE FROM chat_sessions WHERE session_id = %s", (session_id,))
+
+    async def flush(self):
+        """
+        Writes every dirty session in one multi-row upsert. If MySQL rejects a row, the sessions are written
+        one by one and the rejected ones are dropped, so one bad session cannot block every later flush.
+        Sessions not written because of any other error stay dirty for the next flush.
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return 0
+            batch, self._dirty = self._dirty, {}
+            # Serialized now, so saves made while this flush runs are picked up by the next one
+            rows = [(session_id, _serialize(messages)) for session_id, messages in batch.items()]
+            unwritten = dict(batch)
+            dropped = 0
+            try:
+                async with acquire_connection() as conn:
+                    async with conn.cursor() as cur:
+                        await self._ensure_table(cur)
+                        try:
+                            await cur.executemany(UPSERT_SESSIONS_SQL, rows)
+                            unwritten = {}
+                        except REJECTED_ROW_ERRORS as e:
+                            logger.warning("chat session batch rejected, writing sessions one by one", error=str(e))
+                            for row in rows:
+                                try:
+                                    await cur.execute(UPSERT_SESSIONS_SQL, row)
+                                except REJECTED_ROW_ERRORS as e:
+                                    dropped += 1
+                                    logger.error(f"Dropping chat session MySQL cannot store: {e}", session_id=row[0][:100])
+                                del unwritten[row[0]]
+            except Exception:
+                self.stats["flush_errors"] += 1
+                for session_id, messages in unwritten.items():
+                    self._dirty.setdefault(session_id, messages) # Keep newer saves made meanwhile
+                raise
+            self.stats["flushes"] += 1
+            self.stats["rows_written"] += len(rows) - dropped
+            self.stats["rows_dropped"] += dropped
+            return len(rows) - dropped
+
+    async def purge_expired(self):
+        """Deletes sessions idle for longer than the TTL."""
+        async with acquire_connection() as conn:
+            async with conn.cursor() as cur:
+                await self._ensure_table(cur)
+                await cur.execute(
+                    "DELETE FROM chat_sessions WHERE updated_at < NOW() - INTERVAL %s SECOND", (self.ttl,)
+                )
+                self.stats["purged"] += cur.rowcount
+                return cur.rowcount
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - self._last_purge >= SESSION_PURGE_INTERVAL:
+                    self._last_purge = time.monotonic()
+                    await self.purge_expired()
+            except Exception as e:
+                logger.error(f"Error writing chat sessions to MySQL: {e}", dirty=len(self._dirty))
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    def get_stats(self):
+        return dict(self.stats, backend="mysql", dirty=len(self._dirty), cache=self.cache.get_stats())
+
+
+def create_session_store(backend=None):
+    """Builds the store selected by SESSION_STORE."""
+    backend = backend or SESSION_STORE
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "mysql":
+        return MySQLSessionStore()
+    raise ValueError(f"Unknown SESSION_STORE '{backend}' (expected 'memory' or 'mysql')")
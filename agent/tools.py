@@ -2,21 +2,27 @@ import asyncio
 import aiomysql
 import os
 import json
+import time
+import logging
+import math
+import re
+from collections import Counter
+from datetime import date, timedelta
 from typing import Optional, List, Dict, Any
 from dotenv import load_dotenv
+from agent.db import acquire_connection, close_pool # Shared, application-wide pool
+from agent.cache import TTLCache, date_range_contains
+from data_pipeline.db_setup import UNDATED_PUBLICATION_DATE
+from data_pipeline.document_text import DOCUMENT_TEXT_ENABLED, decompress_chunk
+from data_pipeline.processor import add_commit_listener
+from data_pipeline.vector_index import EMBEDDING_MODEL, embed_texts, get_vector_index
+from observability.logs import get_logger
+from observability.metrics import SQL_QUERY_SECONDS, SQL_ROWS_RETURNED
+from observability.tracing import span
 
 load_dotenv()
 
-async def get_db_pool_agent(): # Renamed to avoid conflict if imported elsewhere
-    return await aiomysql.create_pool(
-        host=os.getenv("MYSQL_HOST"),
-        port=int(os.getenv("MYSQL_PORT", 3306)),
-        user=os.getenv("MYSQL_USER"),
-        password=os.getenv("MYSQL_PASSWORD"),
-        db=os.getenv("MYSQL_DB"),
-        autocommit=True, # Simpler for read queries
-        cursorclass=aiomysql.cursors.DictCursor # Get results as dictionaries
-    )
+logger = get_logger("tools")
 
 # Tool definition for the LLM
 # This schema will be sent to the LLM so it knows how to call the function.
@@ -45,6 +51,18 @@ search_federal_documents_tool_schema = {
                     "type": "string",
                     "description": "The end date for the search range (YYYY-MM-DD). Example: '2024-01-15'. Use for 'until date X' or 'before date X' queries. If user asks for documents 'on' a specific date, set start_date and end_date to the same value."
                 },
+                "agency": {
+                    "type": "string",
+                    "description": "Only documents of agencies whose name contains this text. Prefer this over putting the agency in search_term. Example: 'Environmental Protection Agency'"
+                },
+                "topic": {
+                    "type": "string",
+                    "description": "Only documents tagged with a Federal Register topic whose name contains this text. Example: 'Air pollution control'"
+                },
+                "cfr_reference": {
+                    "type": "string",
+                    "description": "Only documents affecting this part of the Code of Federal Regulations. Example: '40 CFR 52' (or '40 CFR' for a whole title)"
+                },
                 "limit": {
                     "type": "integer",
                     "description": "Maximum number of documents to return. Default is 5, max is 20.",
@@ -57,99 +75,951 @@ search_federal_documents_tool_schema = {
     }
 }
 
+# Registered only when EMBEDDING_MODEL is set (see data_pipeline/vector_index.py)
+semantic_search_tool_schema = {
+    "type": "function",
+    "function": {
+        "name": "semantic_search_federal_documents",
+        "description": "Finds Federal Register documents by meaning rather than exact words, e.g. 'AI regulation' also matches 'automated decision systems'. Prefer this for topical or conceptual questions. Dates should be in YYYY-MM-DD format.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "A natural-language description of what the documents should be about."
+                },
+                "document_type": {
+                    "type": "string",
+                    "description": "Filter by document type.",
+                    "enum": ["Rule", "Proposed Rule", "Notice", "Presidential Document"]
+                },
+                "start_date": {
+                    "type": "string",
+                    "description": "Only documents published on or after this date (YYYY-MM-DD)."
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "Only documents published on or before this date (YYYY-MM-DD)."
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of documents to return. Default is 5, max is 20.",
+                    "default": 5,
+                    "maximum": 20
+                }
+            },
+            "required": ["query"]
+        }
+    }
+}
+
+
+count_documents_tool_schema = {
+    "type": "function",
+    "function": {
+        "name": "count_federal_documents",
+        "description": "Counts Federal Register documents from pre-computed daily totals. Use this instead of searching for questions like 'how many rules were published last month', 'how did the number of notices change over the year' or 'which agencies or document types published the most this week'. Dates should be in YYYY-MM-DD format.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "group_by": {
+                    "type": "string",
+                    "description": "'total' for one number, 'day'/'week'/'month'/'year' for a trend over time, 'document_type' or 'agency' for a top-N ranking.",
+                    "enum": ["total", "day", "week", "month", "year", "document_type", "agency"],
+                    "default": "total"
+                },
+                "document_type": {
+                    "type": "string",
+                    "description": "Only count this document type.",
+                    "enum": ["Rule", "Proposed Rule", "Notice", "Presidential Document"]
+                },
+                "agency": {
+                    "type": "string",
+                    "description": "Only count documents of this agency: its name, or a part of the name that matches only one agency. Example: 'Environmental Protection Agency'"
+                },
+                "start_date": {
+                    "type": "string",
+                    "description": "Count documents published on or after this date (YYYY-MM-DD)."
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "Count documents published on or before this date (YYYY-MM-DD)."
+                },
+                "compare_to_previous_period": {
+                    "type": "boolean",
+                    "description": "Also return the counts of the equally long period just before start_date, to spot spikes and drops. Needs start_date and end_date.",
+                    "default": False
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "For document_type and agency rankings: how many to return. Default is 10, max is 50.",
+                    "default": 10,
+                    "maximum": 50
+                }
+            },
+            "required": []
+        }
+    }
+}
+
+
+# Registered only when DOCUMENT_TEXT_ENABLED is set (see data_pipeline/document_text.py)
+document_text_tool_schema = {
+    "type": "function",
+    "function": {
+        "name": "get_document_text",
+        "description": "Reads passages of the full text of one Federal Register document, e.g. to find its effective date, requirements or how to submit comments when the abstract is not enough. Call it with a document_number from a search result and a query describing what to look for.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "document_number": {
+                    "type": "string",
+                    "description": "The document_number of a document returned by a search."
+                },
+                "query": {
+                    "type": "string",
+                    "description": "What to look for in the document; the passages that best match it are returned. Example: 'effective date'"
+                },
+                "chunk_index": {
+                    "type": "integer",
+                    "description": "Without a query: the passage to start reading at (0 is the beginning). Use next_chunk_index from a previous call to read on.",
+                    "default": 0
+                },
+                "max_chunks": {
+                    "type": "integer",
+                    "description": "How many passages of about 2000 characters to return. Default is 2, max is 4.",
+                    "default": 2,
+                    "maximum": 4
+                }
+            },
+            "required": ["document_number"]
+        }
+    }
+}
+
+
+# Full-text search settings. "fulltext" uses the FULLTEXT index created by db_setup,
+# "like" forces the old substring scan (useful for comparisons and benchmarks).
+SEARCH_MODE = os.getenv("SEARCH_MODE", "fulltext").lower()
+# InnoDB ignores tokens shorter than innodb_ft_min_token_size (3 by default)
+FULLTEXT_MIN_TOKEN_LEN = int(os.getenv("FULLTEXT_MIN_TOKEN_LEN", 3))
+ER_FT_MATCHING_KEY_NOT_FOUND = 1191 # "Can't find FULLTEXT index matching the column list"
+
+# Result cache for the search tool, keyed on the normalized tool arguments
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 256))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 300)) # Seconds
+search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+# Semantic search: "hybrid" fuses vector and keyword rankings, "vector" uses embeddings only
+SEMANTIC_SEARCH_MODE = os.getenv("SEMANTIC_SEARCH_MODE", "hybrid").lower()
+SEMANTIC_CANDIDATES = int(os.getenv("SEMANTIC_CANDIDATES", 50)) # Per ranking, before fusion
+RRF_K = 60 # Reciprocal rank fusion constant; damps the weight of the very top ranks
+
+
+def _can_use_fulltext(search_term: str) -> bool:
+    return any(len(token) >= FULLTEXT_MIN_TOKEN_LEN for token in search_term.split())
+
+
+# Facet filters: (join table, its slug column, names table). They resolve through the join tables'
+# (slug, document_number) indexes instead of scanning title and abstract.
+FACET_FILTERS = {
+    "agency": ("document_agencies", "agency_slug", "agencies"),
+    "topic": ("document_topics", "topic_slug", "topics"),
+}
+FACET_COUNT_LIMIT = 10 # Values returned per facet by get_document_facets
+CFR_REFERENCE_PATTERN = re.compile(r"^(\d+)\s*(?:C\.?F\.?R\.?)?\s*(?:(?:part|§)\s*)?([\w.-]*)$", re.IGNORECASE)
+
+
+def parse_cfr_reference(cfr_reference):
+    """'40 CFR 52' -> (40, '52'), '40 CFR' -> (40, None). Raises ValueError for anything else."""
+    match = CFR_REFERENCE_PATTERN.match(" ".join(cfr_reference.split()))
+    if not match:
+        raise ValueError(f"cfr_reference must look like '40 CFR 52' or '40 CFR', got {cfr_reference!r}")
+    return int(match.group(1)), match.group(2) or None
+
+
+def _like_contains(value):
+    """LIKE pattern for names containing `value`, with its '%' and '_' taken literally (MySQL escapes with '\\')."""
+    return "%" + value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _facet_condition(facet, value):
+    link_table, slug_column, names_table = FACET_FILTERS[facet]
+    return (
+        f"document_number IN (SELECT l.document_number FROM {link_table} l "
+        f"JOIN {names_table} n ON n.slug = l.{slug_column} WHERE n.slug = %s OR n.name LIKE %s)"
+    ), [value, _like_contains(value)]
+
+
+def _filter_conditions(search_term, document_type, start_date, end_date, mode, agency=None, topic=None,
+                       cfr_reference=None):
+    """
+    WHERE conditions and params shared by the search, browse and facet queries.
+    `cfr_reference` is a parsed (title, part or None) pair, see parse_cfr_reference.
+    """
+    conditions = []
+    params = []
+    if search_term and mode == "fulltext":
+        conditions.append("MATCH(title, abstract) AGAINST (%s IN NATURAL LANGUAGE MODE)")
+        params.append(search_term)
+    elif search_term:
+        conditions.append("(title LIKE %s OR abstract LIKE %s)")
+        params.extend([f"%{search_term}%", f"%{search_term}%"])
+
+    if document_type:
+        conditions.append("document_type = %s")
+        params.append(document_type)
+
+    if start_date:
+        conditions.append("publication_date >= %s")
+        params.append(start_date)
+
+    if end_date:
+        conditions.append("publication_date <= %s")
+        params.append(end_date)
+
+    for facet, value in (("agency", agency), ("topic", topic)):
+        if value:
+            condition, facet_params = _facet_condition(facet, value)
+            conditions.append(condition)
+            params.extend(facet_params)
+
+    if cfr_reference:
+        title, part = cfr_reference
+        if part:
+            conditions.append(
+                "document_number IN (SELECT document_number FROM document_cfr_references "
+                "WHERE cfr_title = %s AND cfr_part = %s)"
+            )
+            params.extend([title, part])
+        else:
+            conditions.append("document_number IN (SELECT document_number FROM document_cfr_references WHERE cfr_title = %s)")
+            params.append(title)
+    return conditions, params
+
+
+def build_search_query(
+    search_term: Optional[str] = None,
+    document_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 5,
+    mode: str = "fulltext",
+    table: str = "federal_documents",
+    agency: Optional[str] = None,
+    topic: Optional[str] = None,
+    cfr_reference: Optional[tuple] = None
+):
+    """
+    Builds the SQL and params for a document search.
+    With mode="fulltext" and a search term, results are ranked by MATCH ... AGAINST relevance,
+    with the most recent publication date as the tie-breaker.
+    """
+    columns = "document_number, tool_payload" # Serialized at ingest; see data_pipeline/payloads.py
+    params = []
+    order_by = "ORDER BY publication_date DESC, id DESC" # Most recent first
+
+    if search_term and mode == "fulltext":
+        columns += ", MATCH(title, abstract) AGAINST (%s IN NATURAL LANGUAGE MODE) AS relevance"
+        params.append(search_term)
+        order_by = "ORDER BY relevance DESC, publication_date DESC, id DESC"
+
+    conditions, filter_params = _filter_conditions(
+        search_term, document_type, start_date, end_date, mode, agency, topic, cfr_reference
+    )
+    params.extend(filter_params)
+
+    query_parts = [f"SELECT {columns} FROM {table}"]
+    if conditions:
+        query_parts.append("WHERE " + " AND ".join(conditions))
+    query_parts.append(order_by)
+    query_parts.append(f"LIMIT {int(limit)}") # Use f-string for LIMIT as it's sanitized
+
+    return " ".join(query_parts), params
+
+
+def build_list_query(
+    search_term: Optional[str] = None,
+    document_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    after: Optional[tuple] = None,
+    limit: int = 50,
+    mode: str = "fulltext",
+    table: str = "federal_documents",
+    agency: Optional[str] = None,
+    topic: Optional[str] = None,
+    cfr_reference: Optional[tuple] = None
+):
+    """
+    Builds a keyset-paginated listing, newest first. `after` is the (publication_date, id) of the
+    previous page's last row: the seek condition starts the idx_pubdate_id / idx_type_pubdate range
+    scan at that row, so every page costs the same instead of growing with OFFSET.
+    Keywords only filter here (no relevance ordering), which keeps page boundaries stable.
+    """
+    conditions, params = _filter_conditions(
+        search_term, document_type, start_date, end_date, mode, agency, topic, cfr_reference
+    )
+    conditions.append("publication_date IS NOT NULL") # NULLs cannot be seeked past
+    if after:
+        # Expanded form of (publication_date, id) < (%s, %s), which MySQL can turn into an index range
+        conditions.append("(publication_date < %s OR (publication_date = %s AND id < %s))")
+        params.extend([after[0], after[0], after[1]])
+
+    query = (
+        f"SELECT id, document_number, title, publication_date, document_type, abstract_preview, html_url "
+        f"FROM {table} WHERE {' AND '.join(conditions)} "
+        f"ORDER BY publication_date DESC, id DESC LIMIT {int(limit)}"
+    )
+    return query, params
+
+
+def build_facet_query(
+    facet: str,
+    search_term: Optional[str] = None,
+    document_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    agency: Optional[str] = None,
+    topic: Optional[str] = None,
+    cfr_reference: Optional[tuple] = None,
+    limit: int = FACET_COUNT_LIMIT,
+    mode: str = "fulltext"
+):
+    """Builds the top-`limit` values of `facet` ("agency" or "topic") among the documents matching the filters."""
+    link_table, slug_column, names_table = FACET_FILTERS[facet]
+    conditions, params = _filter_conditions(
+        search_term, document_type, start_date, end_date, mode, agency, topic, cfr_reference
+    )
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = (
+        f"SELECT n.slug, n.name, COUNT(*) AS count "
+        f"FROM (SELECT document_number FROM federal_documents {where}) d "
+        f"JOIN {link_table} l ON l.document_number = d.document_number "
+        f"JOIN {names_table} n ON n.slug = l.{slug_column} "
+        f"GROUP BY n.slug, n.name ORDER BY count DESC, n.name LIMIT {int(limit)}"
+    )
+    return query, params
+
+
+async def _timed_query(cur, label, sql, params):
+    """Executes and fetches one query, recording its latency and row count under `label`."""
+    if logger.sampled(logging.DEBUG):
+        logger.debug("executing SQL", query=label, sql=" ".join(sql.split()), params=list(params))
+    started = time.perf_counter()
+    with span("sql", query=label) as sql_span:
+        await cur.execute(sql, tuple(params))
+        rows = await cur.fetchall()
+        sql_span.set(rows=len(rows))
+    SQL_QUERY_SECONDS.observe(time.perf_counter() - started, query=label)
+    SQL_ROWS_RETURNED.observe(len(rows), query=label)
+    return rows
+
+
+async def _execute_search(cur, label, build_query, search_term):
+    """
+    Runs the query from build_query(mode) on `cur`: FULLTEXT when the term allows it, else LIKE.
+    Falls back to LIKE if the FULLTEXT index has not been created yet.
+    """
+    mode = "like"
+    if search_term and SEARCH_MODE == "fulltext" and _can_use_fulltext(search_term):
+        mode = "fulltext"
+
+    final_query, params = build_query(mode)
+    try:
+        return await _timed_query(cur, f"{label}_{mode}", final_query, params)
+    except aiomysql.MySQLError as e:
+        if mode != "fulltext" or e.args[0] != ER_FT_MATCHING_KEY_NOT_FOUND:
+            raise
+        # Schema migration not applied yet; fall back to the LIKE scan
+        logger.warning("FULLTEXT index missing, falling back to LIKE search. Run data_pipeline.db_setup.")
+        final_query, params = build_query("like")
+        return await _timed_query(cur, f"{label}_like", final_query, params)
+
+
+async def _run_keyword_search(cur, search_term, document_type, start_date, end_date, limit,
+                              agency=None, topic=None, cfr_reference=None):
+    """Executes the keyword search on `cur` and returns the rows, best match first."""
+    return await _execute_search(
+        cur, "search",
+        lambda mode: build_search_query(
+            search_term, document_type, start_date, end_date, limit, mode=mode,
+            agency=agency, topic=topic, cfr_reference=cfr_reference
+        ),
+        search_term
+    )
+
+
+def _format_documents(documents, scores=None):
+    """
+    Joins the stored per-document payloads into the JSON array the LLM summarizes.
+    With `scores`, each object gets a "score" key (spliced in, not re-serialized).
+    """
+    payloads = []
+    for doc in documents:
+        payload = doc["tool_payload"]
+        if scores is not None:
+            payload = f'{payload[:-1]},"score":{round(scores[doc["document_number"]], 4)}}}'
+        payloads.append(payload)
+    return "[" + ",".join(payloads) + "]"
+
+
+async def _query_documents(search_term, document_type, start_date, end_date, limit,
+                           agency=None, topic=None, cfr_reference=None) -> str:
+    """Runs the search against MySQL and formats the rows for the LLM. Raises on database errors."""
+    async with acquire_connection() as conn:
+        async with conn.cursor() as cur:
+            documents = await _run_keyword_search(
+                cur, search_term, document_type, start_date, end_date, limit, agency, topic, cfr_reference
+            )
+
+    if not documents:
+        return "No documents found matching your criteria."
+    return _format_documents(documents)
+
+
+async def list_documents(
+    search_term: Optional[str] = None,
+    document_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    after: Optional[tuple] = None,
+    limit: int = 50,
+    agency: Optional[str] = None,
+    topic: Optional[str] = None,
+    cfr_reference: Optional[str] = None
+):
+    """
+    One page of documents for the REST API, newest first (see build_list_query).
+    Returns (documents, key of the last row to pass as `after` for the next page, or None on the last page).
+    Raises ValueError for a malformed cfr_reference.
+    """
+    search_term = " ".join(search_term.split()) if search_term else None
+    cfr_reference = parse_cfr_reference(cfr_reference) if cfr_reference else None
+    async with acquire_connection() as conn:
+        async with conn.cursor() as cur:
+            # One extra row tells us whether another page exists without a COUNT(*)
+            rows = await _execute_search(
+                cur, "list",
+                lambda mode: build_list_query(
+                    search_term, document_type, start_date, end_date, after, limit + 1, mode=mode,
+                    agency=agency, topic=topic, cfr_reference=cfr_reference
+                ),
+                search_term
+            )
+
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1]["publication_date"], rows[-1]["id"])
+    for row in rows:
+        del row["id"] # Internal; the opaque cursor carries it
+    return rows, next_key
+
+
+async def get_document(document_number: str, include_raw: bool = False):
+    """One document by number (a unique-index lookup), or None. With include_raw, also the original API document."""
+    columns = "d.document_number, d.title, d.publication_date, d.document_type, d.abstract, d.html_url, d.updated_at"
+    join = ""
+    if include_raw:
+        columns += ", r.raw_data"
+        # Both key columns, so only the partition of the document's date is read
+        join = (
+            "LEFT JOIN federal_documents_raw r ON r.document_number = d.document_number "
+            f"AND r.publication_date = COALESCE(d.publication_date, '{UNDATED_PUBLICATION_DATE}')"
+        )
+    async with acquire_connection() as conn:
+        async with conn.cursor() as cur:
+            rows = await _timed_query(
+                cur, "get_document",
+                f"SELECT {columns} FROM federal_documents d {join} WHERE d.document_number = %s",
+                [document_number]
+            )
+    if not rows:
+        return None
+    document = rows[0]
+    if include_raw and document["raw_data"] is not None:
+        document["raw_data"] = json.loads(document["raw_data"])
+    return document
+
 
 async def search_federal_documents_in_db(
     search_term: Optional[str] = None, 
     document_type: Optional[str] = None, 
     start_date: Optional[str] = None, 
     end_date: Optional[str] = None, 
-    limit: int = 5
+    limit: int = 5,
+    agency: Optional[str] = None,
+    topic: Optional[str] = None,
+    cfr_reference: Optional[str] = None
 ) -> str:
     """
     Actual Python function that queries the MySQL database.
     The LLM will "call" this function by providing arguments for these parameters.
+    Agency, topic and CFR filters are index lookups in the facet join tables (see data_pipeline/facets.py).
+    Results are cached per normalized argument set; identical concurrent calls share one query.
     """
-    pool = await get_db_pool_agent()
-    results_str = "No documents found matching your criteria or an error occurred."
-    
     # Validate limit
     limit = min(max(1, limit), 20) # Ensure limit is between 1 and 20
 
-    async with pool.acquire() as conn:
+    # Normalize so close variants ("Executive  Order" / "executive order") share a cache entry
+    search_term = " ".join(search_term.split()).lower() if search_term else None
+    document_type = document_type or None
+    start_date = start_date or None
+    end_date = end_date or None
+    agency = " ".join(agency.split()).lower() if agency else None
+    topic = " ".join(topic.split()).lower() if topic else None
+    try:
+        cfr_reference = parse_cfr_reference(cfr_reference) if cfr_reference else None
+    except ValueError as e:
+        return f"Error: {e}"
+    cache_key = (search_term, document_type, start_date, end_date, limit, agency, topic, cfr_reference)
+
+    try:
+        results_str = await search_cache.get_or_load(
+            cache_key, lambda: _query_documents(*cache_key), meta=(start_date, end_date)
+        )
+    except Exception as e:
+        logger.error(f"Error querying database: {e}")
+        results_str = f"Error querying database: {str(e)}"
+    
+    if logger.sampled(logging.DEBUG):
+        logger.debug("search result", tool="search_federal_documents_in_db", snippet=results_str[:500])
+    return results_str
+
+
+async def _query_facets(search_term, document_type, start_date, end_date, agency, topic, cfr_reference, limit):
+    facets = {}
+    async with acquire_connection() as conn:
         async with conn.cursor() as cur:
-            query_parts = ["SELECT document_number, title, publication_date, document_type, abstract, html_url FROM federal_documents"]
-            conditions = []
-            params = []
-
-            if search_term:
-                conditions.append("(title LIKE %s OR abstract LIKE %s)")
-                params.extend([f"%{search_term}%", f"%{search_term}%"])
-            
-            if document_type:
-                conditions.append("document_type = %s")
-                params.append(document_type)
-
-            if start_date:
-                conditions.append("publication_date >= %s")
-                params.append(start_date)
-            
-            if end_date:
-                conditions.append("publication_date <= %s")
-                params.append(end_date)
-
-            if conditions:
-                query_parts.append("WHERE " + " AND ".join(conditions))
-            
-            query_parts.append("ORDER BY publication_date DESC, id DESC") # Most recent first
-            query_parts.append(f"LIMIT {limit}") # Use f-string for LIMIT as it's sanitized
-
-            final_query = " ".join(query_parts)
-            print(f"Executing SQL: {final_query} with params: {params}")
-
-            try:
-                await cur.execute(final_query, tuple(params))
-                documents = await cur.fetchall()
-                
-                if documents:
-                    # Format for LLM to summarize. Giving key info.
-                    formatted_docs = []
-                    for doc in documents:
-                        # Truncate abstract for brevity if too long
-                        abstract_summary = doc.get('abstract', '')
-                        if abstract_summary and len(abstract_summary) > 200:
-                            abstract_summary = abstract_summary[:200] + "..."
-                        
-                        formatted_docs.append({
-                            "document_number": doc.get("document_number"),
-                            "title": doc.get("title"),
-                            "publication_date": str(doc.get("publication_date")), # Ensure string
-                            "type": doc.get("document_type"),
-                            "abstract_preview": abstract_summary,
-                            "url": doc.get("html_url")
-                        })
-                    results_str = json.dumps(formatted_docs) # Return as JSON string for LLM
+            for facet, name in (("agency", "agencies"), ("topic", "topics")):
+                facets[name] = await _execute_search(
+                    cur, f"facet_{facet}",
+                    lambda mode: build_facet_query(
+                        facet, search_term, document_type, start_date, end_date, agency, topic, cfr_reference,
+                        limit, mode
+                    ),
+                    search_term
+                )
+    return facets
+
+
+async def get_document_facets(
+    search_term: Optional[str] = None,
+    document_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    agency: Optional[str] = None,
+    topic: Optional[str] = None,
+    cfr_reference: Optional[str] = None,
+    limit: int = FACET_COUNT_LIMIT
+):
+    """
+    The most frequent agencies and topics (slug, name, count) among the documents matching the filters.
+    Counting touches every matching document, so results share the search cache and its invalidation on ingest.
+    Raises ValueError for a malformed cfr_reference.
+    """
+    search_term = " ".join(search_term.split()).lower() if search_term else None
+    agency = " ".join(agency.split()).lower() if agency else None
+    topic = " ".join(topic.split()).lower() if topic else None
+    cfr_reference = parse_cfr_reference(cfr_reference) if cfr_reference else None
+    cache_key = ("facets", search_term, document_type or None, start_date or None, end_date or None,
+                 agency, topic, cfr_reference, limit)
+    return await search_cache.get_or_load(
+        cache_key, lambda: _query_facets(*cache_key[1:]), meta=(start_date or None, end_date or None)
+    )
+
+
+async def _fetch_documents(cur, document_numbers):
+    if not document_numbers:
+        return []
+    placeholders = ", ".join(["%s"] * len(document_numbers))
+    return await _timed_query(
+        cur, "fetch_by_number",
+        f"""
+        SELECT document_number, tool_payload FROM federal_documents WHERE document_number IN ({placeholders})
+        """,
+        document_numbers
+    )
+
+
+async def _semantic_query(query, document_type, start_date, end_date, limit, mode) -> str:
+    """Vector search over the local embedding index, optionally fused with the keyword ranking."""
+    index = get_vector_index()
+    query_vector = (await embed_texts([query]))[0]
+    loop = asyncio.get_running_loop()
+    # The index scan is NumPy/HNSW work; keep it off the event loop
+    with span("vector_search", rows=index.count) as search_span:
+        vector_hits = await loop.run_in_executor(
+            None, index.search, query_vector, max(limit, SEMANTIC_CANDIDATES), start_date, end_date, document_type
+        )
+        search_span.set(hits=len(vector_hits))
+
+    async with acquire_connection() as conn:
+        async with conn.cursor() as cur:
+            keyword_rows = []
+            if mode == "hybrid":
+                keyword_rows = await _run_keyword_search(
+                    cur, query, document_type, start_date, end_date, SEMANTIC_CANDIDATES
+                )
+            # Reciprocal rank fusion: documents ranked well by both searches rise to the top
+            scores = {}
+            for rank, (document_number, _) in enumerate(vector_hits):
+                scores[document_number] = scores.get(document_number, 0.0) + 1.0 / (RRF_K + rank + 1)
+            for rank, row in enumerate(keyword_rows):
+                document_number = row["document_number"]
+                scores[document_number] = scores.get(document_number, 0.0) + 1.0 / (RRF_K + rank + 1)
+            if mode != "hybrid":
+                scores = dict(vector_hits) # Plain cosine similarity
+
+            top = sorted(scores, key=scores.get, reverse=True)[:limit]
+            rows = {row["document_number"]: row for row in keyword_rows}
+            rows.update({
+                row["document_number"]: row
+                for row in await _fetch_documents(cur, [number for number in top if number not in rows])
+            })
+
+    documents = [rows[number] for number in top if number in rows]
+    if not documents:
+        return "No documents found matching your criteria."
+    return _format_documents(documents, scores)
+
+
+async def semantic_search_federal_documents(
+    query: str,
+    document_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 5
+) -> str:
+    """
+    Semantic search tool: nearest neighbours of the query embedding in the local vector index,
+    fused with keyword matches in SEMANTIC_SEARCH_MODE=hybrid. Shares the search result cache.
+    """
+    limit = min(max(1, limit), 20)
+    query = " ".join(query.split()) if query else ""
+    if not query:
+        return "Error: a query is required for semantic search."
+    document_type = document_type or None
+    start_date = start_date or None
+    end_date = end_date or None
+    cache_key = ("semantic", SEMANTIC_SEARCH_MODE, query.lower(), document_type, start_date, end_date, limit)
+
+    try:
+        results_str = await search_cache.get_or_load(
+            cache_key,
+            lambda: _semantic_query(query, document_type, start_date, end_date, limit, SEMANTIC_SEARCH_MODE),
+            meta=(start_date, end_date)
+        )
+    except Exception as e:
+        logger.error(f"Error in semantic search: {e}")
+        results_str = f"Error in semantic search: {str(e)}"
+
+    if logger.sampled(logging.DEBUG):
+        logger.debug("search result", tool="semantic_search_federal_documents", snippet=results_str[:500])
+    return results_str
+
+
+# Rollup queries of count_federal_documents (tables maintained at ingest, see data_pipeline/rollups.py)
+COUNT_GROUPS = {
+    "total": None,
+    "day": "c.publication_date",
+    "week": "DATE_SUB(c.publication_date, INTERVAL WEEKDAY(c.publication_date) DAY)", # Monday of the week
+    "month": "DATE_FORMAT(c.publication_date, '%%Y-%%m')",
+    "year": "YEAR(c.publication_date)",
+    "document_type": "c.document_type",
+    "agency": "a.name",
+}
+COUNT_MAX_SERIES_POINTS = 120 # Latest periods returned for day/week/month/year trends
+AGENCY_CANDIDATES_LIMIT = 10 # Agencies listed when an agency filter is ambiguous
+
+
+async def resolve_agency(cur, agency):
+    """
+    The one agency `agency` refers to: an exact slug or name, else the only agency whose name contains it.
+    Returns ({"slug", "name"}, None), or (None, error message) if no agency or several match.
+    """
+    rows = await _timed_query(
+        cur, "resolve_agency",
+        f"""
+        SELECT slug, name FROM agencies WHERE slug = %s OR name LIKE %s
+        ORDER BY slug = %s OR name = %s DESC, name LIMIT {AGENCY_CANDIDATES_LIMIT + 1}
+        """,
+        [agency, _like_contains(agency), agency, agency]
+    )
+    if rows and (len(rows) == 1 or agency.lower() in (rows[0]["slug"].lower(), rows[0]["name"].lower())):
+        return rows[0], None
+    if not rows:
+        return None, f"Error: no agency matches '{agency}'."
+    names = "; ".join(row["name"] for row in rows[:AGENCY_CANDIDATES_LIMIT])
+    more = " (and more)" if len(rows) > AGENCY_CANDIDATES_LIMIT else ""
+    return None, f"Error: '{agency}' matches several agencies: {names}{more}. Call again with the full name of one of them."
+
+
+def build_count_query(group_by, document_type, agency_slug, start_date, end_date, limit):
+    """
+    Returns (sql, params) summing the daily rollups, grouped by a time bucket, type or agency.
+    `agency_slug` is a single agency (see resolve_agency), so no document is counted twice.
+    """
+    if group_by == "agency":
+        table = "agency_document_counts_daily c JOIN agencies a ON a.slug = c.agency_slug"
+    elif agency_slug:
+        table = "agency_document_counts_daily c"
+    else:
+        table = "document_counts_daily c"
+    conditions = []
+    params = []
+    if start_date:
+        conditions.append("c.publication_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("c.publication_date <= %s")
+        params.append(end_date)
+    if document_type:
+        conditions.append("c.document_type = %s")
+        params.append(document_type)
+    if agency_slug:
+        conditions.append("c.agency_slug = %s")
+        params.append(agency_slug)
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+
+    key = COUNT_GROUPS[group_by]
+    if key is None:
+        return f"SELECT SUM(c.document_count) AS count FROM {table} {where}", params
+    if group_by in ("document_type", "agency"):
+        order = f"ORDER BY count DESC, period LIMIT {int(limit)}"
+    else:
+        order = f"ORDER BY period DESC LIMIT {COUNT_MAX_SERIES_POINTS}"
+    return f"SELECT {key} AS period, SUM(c.document_count) AS count FROM {table} {where}GROUP BY period {order}", params
+
+
+async def _count_rows(cur, group_by, document_type, agency_slug, start_date, end_date, limit):
+    sql, params = build_count_query(group_by, document_type, agency_slug, start_date, end_date, limit)
+    rows = await _timed_query(cur, f"count_{group_by}", sql, params)
+    if group_by == "total":
+        return int(rows[0]["count"] or 0)
+    counts = [{"key": str(row["period"]), "count": int(row["count"])} for row in rows]
+    return counts if group_by in ("document_type", "agency") else counts[::-1] # Trends oldest first
+
+
+async def _query_counts(group_by, document_type, agency, start_date, end_date, limit, previous) -> str:
+    async with acquire_connection() as conn:
+        async with conn.cursor() as cur:
+            agency_slug = None
+            if agency:
+                resolved, error = await resolve_agency(cur, agency)
+                if error:
+                    return error
+                agency, agency_slug = resolved["name"], resolved["slug"]
+            result = {"group_by": group_by}
+            counts = await _count_rows(cur, group_by, document_type, agency_slug, start_date, end_date, limit)
+            result["count" if group_by == "total" else "counts"] = counts
+            if previous:
+                previous_counts = await _count_rows(cur, group_by, document_type, agency_slug, *previous, limit)
+                result["previous_period"] = {"start_date": previous[0], "end_date": previous[1]}
+                if group_by == "total":
+                    result["previous_count"] = previous_counts
                 else:
-                    results_str = "No documents found matching your criteria."
+                    before = {row["key"]: row["count"] for row in previous_counts}
+                    for row in counts:
+                        row["previous_count"] = before.get(row["key"], 0)
+            latest = await _timed_query(cur, "count_latest", "SELECT MAX(publication_date) AS latest FROM document_counts_daily", [])
+    result["filters"] = {
+        name: value for name, value in
+        (("document_type", document_type), ("agency", agency), ("start_date", start_date), ("end_date", end_date))
+        if value
+    }
+    result["data_through"] = str(latest[0]["latest"]) if latest and latest[0]["latest"] else None
+    return json.dumps(result, separators=(",", ":"))
 
-            except Exception as e:
-                print(f"Error querying database: {e}")
-                results_str = f"Error querying database: {str(e)}"
-    
-    pool.close()
-    await pool.wait_closed()
-    print(f"Tool search_federal_documents_in_db result: {results_str[:500]}...") # Log snippet
+
+async def count_federal_documents(
+    group_by: str = "total",
+    document_type: Optional[str] = None,
+    agency: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    compare_to_previous_period: bool = False,
+    limit: int = 10
+) -> str:
+    """
+    Aggregation tool: counts, trends and top-N rankings answered from the daily rollup tables,
+    so no query scans federal_documents. Shares the search result cache (and its invalidation on ingest).
+    """
+    if group_by not in COUNT_GROUPS:
+        return f"Error: group_by must be one of {', '.join(COUNT_GROUPS)}."
+    limit = min(max(1, limit), 50)
+    agency = " ".join(agency.split()) if agency else None
+    document_type = document_type or None
+    start_date = start_date or None
+    end_date = end_date or None
+    try:
+        first = date.fromisoformat(start_date) if start_date else None
+        last = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        return "Error: start_date and end_date must be in YYYY-MM-DD format."
+
+    previous = None
+    if compare_to_previous_period and group_by in ("total", "document_type", "agency"):
+        if not (first and last) or first > last:
+            return "Error: compare_to_previous_period needs a start_date on or before end_date."
+        length = last - first + timedelta(days=1)
+        previous = ((first - length).isoformat(), (first - timedelta(days=1)).isoformat())
+
+    cache_key = ("count", group_by, document_type, agency and agency.lower(), start_date, end_date, limit, previous)
+    try:
+        results_str = await search_cache.get_or_load(
+            cache_key,
+            lambda: _query_counts(group_by, document_type, agency, start_date, end_date, limit, previous),
+            meta=(previous[0] if previous else start_date, end_date)
+        )
+    except Exception as e:
+        logger.error(f"Error counting documents: {e}")
+        results_str = f"Error counting documents: {str(e)}"
+
+    if logger.sampled(logging.DEBUG):
+        logger.debug("count result", tool="count_federal_documents", snippet=results_str[:500])
     return results_str
 
+
+TEXT_MAX_CHUNKS = 4 # Passages returned per get_document_text call
+TEXT_TERM_PATTERN = re.compile(r"\w+")
+
+
+def rank_chunks(texts, query, limit):
+    """
+    Positions of the `limit` passages of one document that best match `query`, in document order.
+    Scores are term counts weighted by how few passages contain the term (tf-idf within the document).
+    Empty when no passage contains any query term.
+    """
+    terms = set(TEXT_TERM_PATTERN.findall(query.lower()))
+    counts = [Counter(TEXT_TERM_PATTERN.findall(text.lower())) for text in texts]
+    document_frequency = {term: sum(1 for count in counts if term in count) for term in terms}
+    scores = [
+        sum(count[term] * math.log(1 + len(texts) / document_frequency[term]) for term in terms if term in count)
+        for count in counts
+    ]
+    best = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: (-scores[i], i))[:limit]
+    return sorted(best)
+
+
+async def _query_document_text(document_number, query, chunk_index, max_chunks) -> str:
+    async with acquire_connection() as conn:
+        async with conn.cursor() as cur:
+            status = await _timed_query(
+                cur, "text_status",
+                "SELECT status, chunk_count, char_count FROM document_texts WHERE document_number = %s",
+                [document_number]
+            )
+            if not status or status[0]["status"] != "stored":
+                state = status[0]["status"] if status else "not_fetched"
+                return json.dumps({"document_number": document_number, "status": state,
+                                   "message": "The full text of this document is not available."})
+            if query:
+                rows = await _timed_query(
+                    cur, "text_chunks_all",
+                    "SELECT chunk_index, char_offset, body FROM document_text_chunks WHERE document_number = %s "
+                    "ORDER BY chunk_index",
+                    [document_number]
+                )
+            else:
+                # A primary key range: only the requested passages are read and decompressed
+                rows = await _timed_query(
+                    cur, "text_chunks_range",
+                    "SELECT chunk_index, char_offset, body FROM document_text_chunks WHERE document_number = %s "
+                    "AND chunk_index BETWEEN %s AND %s ORDER BY chunk_index",
+                    [document_number, chunk_index, chunk_index + max_chunks - 1]
+                )
+
+    def select_chunks():
+        texts = [decompress_chunk(row["body"]) for row in rows]
+        positions = rank_chunks(texts, query, max_chunks) if query else list(range(len(texts)))
+        return [
+            {"chunk_index": rows[i]["chunk_index"], "char_offset": rows[i]["char_offset"], "text": texts[i]}
+            for i in positions
+        ]
+
+    # Ranking decompresses and tokenizes the whole document; keep it off the event loop
+    chunks = await asyncio.get_running_loop().run_in_executor(None, select_chunks)
+    result = {
+        "document_number": document_number,
+        "status": "stored",
+        "chunk_count": status[0]["chunk_count"],
+        "char_count": status[0]["char_count"],
+        "chunks": chunks,
+    }
+    if query and not chunks:
+        result["message"] = "No passage matches the query; read the document by chunk_index instead."
+    elif not query and chunks and chunks[-1]["chunk_index"] + 1 < status[0]["chunk_count"]:
+        result["next_chunk_index"] = chunks[-1]["chunk_index"] + 1
+    return json.dumps(result, separators=(",", ":"))
+
+
+async def get_document_text(
+    document_number: str,
+    query: Optional[str] = None,
+    chunk_index: int = 0,
+    max_chunks: int = 2
+) -> str:
+    """
+    Full-text tool: passages of a document body stored by data_pipeline/document_text.py, either the ones
+    best matching `query` or `max_chunks` consecutive ones from `chunk_index`. Without a query only those
+    rows are read. Results share the search cache; bodies are only re-fetched for changed documents,
+    so a stale entry lives at most SEARCH_CACHE_TTL.
+    """
+    document_number = document_number.strip() if document_number else ""
+    if not document_number:
+        return "Error: a document_number is required."
+    query = " ".join(query.split()).lower() if query else None
+    chunk_index = max(0, chunk_index)
+    max_chunks = min(max(1, max_chunks), TEXT_MAX_CHUNKS)
+    cache_key = ("text", document_number, query, None if query else chunk_index, max_chunks)
+
+    try:
+        results_str = await search_cache.get_or_load(
+            cache_key, lambda: _query_document_text(document_number, query, chunk_index, max_chunks)
+        )
+    except Exception as e:
+        logger.error(f"Error reading document text: {e}")
+        results_str = f"Error reading document text: {str(e)}"
+
+    if logger.sampled(logging.DEBUG):
+        logger.debug("text result", tool="get_document_text", snippet=results_str[:500])
+    return results_str
+
+
+def invalidate_search_cache(publication_dates):
+    """Commit listener: drops cached searches whose date range covers a newly committed publication date."""
+    dropped = search_cache.invalidate(
+        lambda key, meta: meta is not None
+        and any(date_range_contains(meta[0], meta[1], date_str) for date_str in publication_dates)
+    )
+    if dropped:
+        logger.info("invalidated cached search results", dropped=dropped, dates=sorted(map(str, publication_dates)))
+
+
+add_commit_listener(invalidate_search_cache)
+
 # This dictionary maps tool names (as the LLM knows them) to actual Python functions
 AVAILABLE_TOOLS = {
-    "search_federal_documents_in_db": search_federal_documents_in_db
+    "search_federal_documents_in_db": search_federal_documents_in_db,
+    "count_federal_documents": count_federal_documents,
 }
 
 # And a list of schemas for the LLM
 TOOL_DEFINITIONS = [
-    search_federal_documents_tool_schema
+    search_federal_documents_tool_schema,
+    count_documents_tool_schema,
 ]
 
+if EMBEDDING_MODEL:
+    AVAILABLE_TOOLS["semantic_search_federal_documents"] = semantic_search_federal_documents
+    TOOL_DEFINITIONS.append(semantic_search_tool_schema)
+
+if DOCUMENT_TEXT_ENABLED:
+    AVAILABLE_TOOLS["get_document_text"] = get_document_text
+    TOOL_DEFINITIONS.append(document_text_tool_schema)
+
 if __name__ == '__main__':
     # Test the tool function
     async def test_tool():
@@ -158,6 +1028,7 @@ if __name__ == '__main__':
         result = await search_federal_documents_in_db(search_term="executive order", document_type="Presidential Document", limit=2)
         print("\n--- Test Tool Result ---")
         print(result)
+        await close_pool()
 
     # Make sure you have some data in the DB by running the pipeline first.
     # Example: python -m data_pipeline.run_pipeline
@@ -1,14 +1,103 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Query, Header
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional
+import asyncio
+import base64
+import hmac
 import uuid
 import os
+import json
+import time
 
-from agent.llm_agent import get_agent_response # The core agent logic
+from agent.llm_agent import get_agent_response, stream_agent_response, session_store, ERROR_MESSAGE_FOR_USER # The core agent logic
+from agent.llm_agent import warm_up_model, keep_model_warm, LLM_KEEPALIVE_INTERVAL
+from agent.db import close_pool, get_pool_metrics, warm_pool # Shared DB pool
+from agent.tools import search_cache, list_documents, get_document, get_document_facets, FACET_COUNT_LIMIT
+from agent.context import get_context_stats
+from agent.llm_cache import get_llm_cache_stats
+from agent.session_store import SESSION_ID_MAX_LENGTH
+from data_pipeline.scheduler import PipelineScheduler, PIPELINE_SCHEDULER_ENABLED
+from observability.asgi import ObservabilityMiddleware
+from observability.logs import get_logger
+from observability.metrics import CHAT_SECONDS, CHAT_FIRST_TOKEN_SECONDS, add_collector, render_metrics
+from observability.tracing import recent_traces
+
+logger = get_logger("api")
+
+# Page sizes of the document browse API
+DOCUMENTS_PAGE_SIZE = int(os.getenv("DOCUMENTS_PAGE_SIZE", 50))
+DOCUMENTS_MAX_PAGE_SIZE = int(os.getenv("DOCUMENTS_MAX_PAGE_SIZE", 500))
+# Required in X-Admin-Token for the /admin endpoints, which are disabled while it is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Startup warmup (templates, model load); /ready answers 503 until it and the DB connection have succeeded
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() in ("1", "true", "yes")
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", 5))
+readiness = {"ready": False, "steps": {}}
+
+# Incremental ingestion inside this process (started in the lifespan when PIPELINE_SCHEDULER_ENABLED)
+pipeline_scheduler = PipelineScheduler()
+
+# Existing stats endpoints, also exported as gauges on /metrics
+add_collector("db_pool", get_pool_metrics)
+add_collector("search_cache", search_cache.get_stats)
+add_collector("session_store", session_store.get_stats)
+add_collector("context", get_context_stats)
+add_collector("llm", get_llm_cache_stats)
+add_collector("pipeline_scheduler", pipeline_scheduler.get_stats)
+
+async def warm_up_step(name, warm):
+    """Runs one warmup step until it succeeds, recording its duration (or last error) in readiness["steps"]."""
+    attempts = 0
+    while True:
+        attempts += 1
+        started = time.perf_counter()
+        try:
+            await warm()
+            readiness["steps"][name] = {"ok": True, "seconds": round(time.perf_counter() - started, 3), "attempts": attempts}
+            return
+        except Exception as e:
+            readiness["steps"][name] = {"ok": False, "error": f"{type(e).__name__}: {e}", "attempts": attempts}
+            logger.warning("warmup step failed", step=name, attempt=attempts, error=str(e))
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+async def warm_up():
+    """
+    Connects to the database, creating the shared pool (retried until MySQL is reachable). With STARTUP_WARMUP,
+    also pays the other first-request costs before traffic arrives: the page template and loading the model
+    with the chat prompt prefix. Then keeps the model resident.
+    """
+    started = time.perf_counter()
+    await warm_up_step("database", warm_pool) # The first acquire creates the pool
+    if STARTUP_WARMUP:
+        await warm_up_step("templates", lambda: asyncio.to_thread(templates.get_template, "index.html"))
+        await warm_up_step("model", warm_up_model)
+    readiness["ready"] = True
+    logger.info("warmup finished", seconds=round(time.perf_counter() - started, 2), steps=readiness["steps"])
+    if STARTUP_WARMUP and LLM_KEEPALIVE_INTERVAL > 0:
+        await keep_model_warm()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In the background, so the process starts and serves /ready (and liveness checks) while MySQL
+    # is unreachable or the model loads. The one DB pool of the process is created by the first step.
+    warmup_task = asyncio.create_task(warm_up())
+    if PIPELINE_SCHEDULER_ENABLED:
+        pipeline_scheduler.start()
+    yield
+    warmup_task.cancel()
+    await pipeline_scheduler.stop()
+    await session_store.close() # Write out buffered chat histories while the pool is still open
+    await close_pool()
 
 # Create app
-app = FastAPI(title="Federal RAG Agent API")
+app = FastAPI(title="Federal RAG Agent API", lifespan=lifespan)
+app.add_middleware(ObservabilityMiddleware, skip_paths=("/metrics", "/traces", "/ready")) # Trace span + latency histogram per request
 
 # Mount static files (for HTML, CSS, JS)
 # Ensure the 'static' directory is at api/static
@@ -33,30 +122,202 @@ async def get_chat_ui(request: Request):
     """Serves the main chat HTML page."""
     return templates.TemplateResponse("index.html", {"request": request})
 
+def _validate_chat_message(chat_message):
+    if not chat_message.message or not chat_message.session_id:
+        raise HTTPException(status_code=400, detail="Session ID and message are required.")
+    if len(chat_message.session_id) > SESSION_ID_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Session ID must be at most {SESSION_ID_MAX_LENGTH} characters.")
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_with_agent(chat_message: ChatMessage):
     """
     Endpoint to send a message to the agent and get a response.
     A session_id is used to maintain conversation context.
     """
-    print(f"Received message for session {chat_message.session_id}: {chat_message.message}")
-    if not chat_message.message or not chat_message.session_id:
-        raise HTTPException(status_code=400, detail="Session ID and message are required.")
+    logger.info("chat message received", session_id=chat_message.session_id, chars=len(chat_message.message))
+    _validate_chat_message(chat_message)
 
+    started = time.perf_counter()
     try:
         agent_reply = await get_agent_response(chat_message.session_id, chat_message.message)
+        outcome = "error" if agent_reply == ERROR_MESSAGE_FOR_USER else "ok"
+        CHAT_SECONDS.observe(time.perf_counter() - started, endpoint="chat", outcome=outcome)
         return ChatResponse(session_id=chat_message.session_id, response=agent_reply)
     except Exception as e:
-        print(f"Error in /chat endpoint: {e}")
-        # In a real app, log this exception properly
-        # traceback.print_exc()
+        CHAT_SECONDS.observe(time.perf_counter() - started, endpoint="chat", outcome="exception")
+        logger.error(f"Error in /chat endpoint: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An internal error occurred.")
 
+@app.post("/chat/stream")
+async def chat_with_agent_stream(chat_message: ChatMessage):
+    """
+    Streaming variant of /chat using Server-Sent Events.
+    Emits `tool_call` / `tool_result` progress events, `token` events as the answer is generated,
+    and a final `done` (or `error`) event.
+    """
+    logger.info("streaming chat message received", session_id=chat_message.session_id, chars=len(chat_message.message))
+    _validate_chat_message(chat_message)
+
+    async def event_stream():
+        started = time.perf_counter()
+        first_token = True
+        outcome = "disconnected"
+        try:
+            async for event, data in stream_agent_response(chat_message.session_id, chat_message.message):
+                if event == "token" and first_token:
+                    CHAT_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started)
+                    first_token = False
+                elif event in ("done", "error"):
+                    outcome = "ok" if event == "done" else "error"
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            CHAT_SECONDS.observe(time.perf_counter() - started, endpoint="chat_stream", outcome=outcome)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} # Don't let proxies buffer tokens
+    )
+
+def encode_cursor(key):
+    """Opaque page cursor for a (publication_date, id) keyset position."""
+    publication_date, row_id = key
+    return base64.urlsafe_b64encode(f"{publication_date.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date_str, row_id = raw.split("|")
+        return date.fromisoformat(date_str), int(row_id)
+    except ValueError: # Also covers bad base64 and UTF-8
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+@app.get("/documents")
+async def browse_documents(
+    q: Optional[str] = None,
+    document_type: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(DOCUMENTS_PAGE_SIZE, ge=1, le=DOCUMENTS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    agency: Optional[str] = None,
+    topic: Optional[str] = None,
+    cfr: Optional[str] = None,
+):
+    """
+    Lists documents newest first, optionally filtered by keywords (`q`), type, publication date range,
+    agency, topic and CFR reference (e.g. `cfr=40 CFR 52`).
+    Pass the returned `next_cursor` as `cursor` to get the next page; it is null on the last page.
+    Pages are keyset-paginated, so deep pages are as fast as the first one.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    try:
+        documents, next_key = await list_documents(
+            q, document_type, start_date, end_date, after, limit, agency, topic, cfr
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in /documents endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+    return {"documents": documents, "next_cursor": encode_cursor(next_key) if next_key else None}
+
+@app.get("/documents/facets")
+async def document_facets(
+    q: Optional[str] = None,
+    document_type: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    agency: Optional[str] = None,
+    topic: Optional[str] = None,
+    cfr: Optional[str] = None,
+    limit: int = Query(FACET_COUNT_LIMIT, ge=1, le=100),
+):
+    """Top agencies and topics, with document counts, for the same filters as /documents. Cached."""
+    try:
+        return await get_document_facets(
+            q, document_type, start_date.isoformat() if start_date else None,
+            end_date.isoformat() if end_date else None, agency, topic, cfr, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in /documents/facets endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+
+@app.get("/documents/{document_number}")
+async def read_document(document_number: str, include_raw: bool = False):
+    """Fetches one document by its Federal Register document number."""
+    try:
+        document = await get_document(document_number, include_raw)
+    except Exception as e:
+        logger.error(f"Error in /documents/{{document_number}} endpoint: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="An internal error occurred.")
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found.")
+    return document
+
 @app.post("/generate-session")
 async def generate_session():
     """Generates a new unique session ID for the chat."""
     return {"session_id": str(uuid.uuid4())}
 
+@app.get("/pool-stats")
+async def pool_stats():
+    """Reports usage of the shared database connection pool."""
+    return get_pool_metrics()
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """Reports hit, miss and eviction counters of the search and LLM response caches, and LLM queue depth."""
+    return {"search": search_cache.get_stats(), "llm": get_llm_cache_stats()}
+
+@app.get("/session-stats")
+async def session_stats():
+    """Reports size, eviction and write-batching counters of the chat session store."""
+    return session_store.get_stats()
+
+@app.get("/context-stats")
+async def context_stats():
+    """Reports prompt tokens per LLM request and how often history had to be compacted or dropped."""
+    return get_context_stats()
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the database is reachable and warmup has finished, 503 (with the step status) before that."""
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of latency histograms, counters and the stats above."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/traces")
+async def traces(limit: int = 20):
+    """Most recent sampled (or slow) request traces, newest first."""
+    return list(recent_traces)[::-1][:limit]
+
+def check_admin_token(token):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them.")
+    if not hmac.compare_digest((token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+@app.post("/admin/pipeline/run", status_code=202)
+async def run_pipeline_now(x_admin_token: Optional[str] = Header(None)):
+    """Starts an incremental ingestion run in the background; 409 while one is in progress."""
+    check_admin_token(x_admin_token)
+    if not pipeline_scheduler.trigger("manual"):
+        return JSONResponse(status_code=409, content={"detail": "A pipeline run is already in progress.",
+                                                      "status": pipeline_scheduler.get_status()})
+    return {"detail": "Pipeline run started."}
+
+@app.get("/admin/pipeline/status")
+async def pipeline_status(x_admin_token: Optional[str] = Header(None)):
+    """Schedule, current stage and throughput of a running ingestion, and the result of the last run."""
+    check_admin_token(x_admin_token)
+    return pipeline_scheduler.get_status()
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -13,6 +13,31 @@ document.addEventListener('DOMContentLoaded', () => {
         messageDiv.appendChild(textNode);
         chatBox.appendChild(messageDiv);
         chatBox.scrollTop = chatBox.scrollHeight; // Scroll to bottom
+        return messageDiv;
+    }
+
+    // Parses a Server-Sent Events stream from a fetch() response, calling onEvent(event, data) per event
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                for (const line of rawEvent.split('\n')) {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                onEvent(event, data ? JSON.parse(data) : {});
+            }
+        }
     }
     
     // Function to generate a new session ID
@@ -45,8 +70,11 @@ document.addEventListener('DOMContentLoaded', () => {
         userInput.value = ''; // Clear input
         sendButton.disabled = true; // Disable button while waiting
 
+        let statusDiv = null;
+        let assistantDiv = null;
         try {
-            const response = await fetch('/chat', {
+            // Stream the answer so tokens render as soon as the model produces them
+            const response = await fetch('/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -59,13 +87,33 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
             }
 
-            const data = await response.json();
-            addMessage(data.response, 'assistant');
+            await readEventStream(response, (event, data) => {
+                if (event === 'tool_call') {
+                    if (assistantDiv) { // Text streamed before a tool call is not part of the answer
+                        assistantDiv.remove();
+                        assistantDiv = null;
+                    }
+                    statusDiv = statusDiv || addMessage('', 'status');
+                    statusDiv.textContent = 'Searching Federal Register documents...';
+                } else if (event === 'tool_result') {
+                    if (statusDiv) statusDiv.textContent = 'Summarizing results...';
+                } else if (event === 'token') {
+                    if (!assistantDiv) assistantDiv = addMessage('', 'assistant');
+                    assistantDiv.textContent += data.content;
+                    chatBox.scrollTop = chatBox.scrollHeight;
+                } else if (event === 'done') {
+                    if (!assistantDiv) assistantDiv = addMessage('', 'assistant');
+                    assistantDiv.textContent = data.response || ''; // The final answer replaces what was streamed
+                } else if (event === 'error') {
+                    addMessage(`Error: ${data.message}`, 'error');
+                }
+            });
 
         } catch (error) {
             console.error('Error sending message:', error);
             addMessage(`Error: ${error.message || "Could not get response from server."}`, 'error');
         } finally {
+            if (statusDiv) statusDiv.remove();
             sendButton.disabled = false; // Re-enable button
             userInput.focus();
         }
@@ -0,0 +1,69 @@
+"""
+Measures time-to-first-token of /chat/stream against the total latency of /chat.
+
+Start the API against the fake model server first, e.g.:
+    python -m benchmarks.fake_openai_server --port 11435 &
+    OLLAMA_BASE_URL=http://127.0.0.1:11435/v1 OLLAMA_MODEL=fake uvicorn api.main:app --port 8000 &
+    python -m benchmarks.bench_chat_stream --base-url http://127.0.0.1:8000 --requests 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+PROMPTS = [
+    "Hello, what can you do?",
+    "Are there any new executive orders related to technology?",
+    "Find rules about environmental protection published this week",
+]
+
+
+async def time_chat(client, session_id, prompt):
+    started = time.perf_counter()
+    response = await client.post("/chat", json={"session_id": session_id, "message": prompt})
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def time_chat_stream(client, session_id, prompt):
+    """Returns (seconds to first token event, seconds to end of stream)."""
+    started = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/chat/stream", json={"session_id": session_id, "message": prompt}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_token is None and line == "event: token":
+                first_token = time.perf_counter() - started
+    total = time.perf_counter() - started
+    return (first_token if first_token is not None else total), total
+
+
+def describe(label, values):
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    print(f"{label:<28} p50 {statistics.median(values) * 1000:>8.1f} ms   p95 {p95 * 1000:>8.1f} ms")
+
+
+async def main(base_url, requests):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        session_id = (await client.post("/generate-session")).json()["session_id"]
+        blocking, ttft, streamed_total = [], [], []
+        for i in range(requests):
+            prompt = PROMPTS[i % len(PROMPTS)]
+            blocking.append(await time_chat(client, session_id, prompt))
+            first, total = await time_chat_stream(client, session_id, prompt)
+            ttft.append(first)
+            streamed_total.append(total)
+    describe("/chat total", blocking)
+    describe("/chat/stream first token", ttft)
+    describe("/chat/stream total", streamed_total)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.requests))
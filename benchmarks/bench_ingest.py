@@ -0,0 +1,93 @@
+"""
+Compares the row-at-a-time upsert with the batched upsert path in data_pipeline.processor.
+
+Point it at a scratch database, e.g. a throwaway MariaDB container:
+    docker run -d --name fr-bench -p 3307:3306 -e MARIADB_ALLOW_EMPTY_ROOT_PASSWORD=1 \
+        -e MARIADB_DATABASE=federal_bench mariadb:11
+    MYSQL_HOST=127.0.0.1 MYSQL_PORT=3307 MYSQL_USER=root MYSQL_PASSWORD= MYSQL_DB=federal_bench \
+        python -m benchmarks.bench_ingest --docs 20000 --batch-size 500
+
+Synthetic rows use BENCH- document numbers and are deleted after each run.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.corpus import synthetic_document
+from data_pipeline.db_setup import setup_database
+from data_pipeline.document_text import TEXT_TABLES
+from data_pipeline.facets import FACET_LINK_TABLES
+from data_pipeline.processor import (
+    UPSERT_DOCUMENT_SQL, UPSERT_RAW_SQL, document_values, get_db_pool, normalize_document, raw_values, upsert_rows
+)
+from data_pipeline.rollups import refresh_rollups
+
+
+async def upsert_row_by_row(conn, rows):
+    """The pre-batching ingest path: one round trip per document, one commit per file."""
+    async with conn.cursor() as cur:
+        for row in rows:
+            await cur.execute(UPSERT_DOCUMENT_SQL, document_values(row))
+            await cur.execute(UPSERT_RAW_SQL, raw_values(row))
+    await conn.commit()
+    return len(rows)
+
+
+async def upsert_batched(conn, rows, batch_size):
+    # Hash-based skipping would turn the second pass into a no-op; measure the write path itself
+    written, _, _ = await upsert_rows(conn, rows, batch_size, skip_unchanged=False)
+    return written
+
+
+async def delete_bench_rows(conn):
+    async with conn.cursor() as cur:
+        await cur.execute("SELECT DISTINCT publication_date FROM federal_documents WHERE document_number LIKE %s", ("BENCH-%",))
+        publication_dates = [row[0] for row in await cur.fetchall()]
+        await cur.execute("DELETE FROM federal_documents WHERE document_number LIKE %s", ("BENCH-%",))
+        await cur.execute("DELETE FROM federal_documents_raw WHERE document_number LIKE %s", ("BENCH-%",))
+        for table in FACET_LINK_TABLES + TEXT_TABLES:
+            await cur.execute(f"DELETE FROM {table} WHERE document_number LIKE %s", ("BENCH-%",))
+        await refresh_rollups(cur, publication_dates) # Drop the benchmark documents from the daily counts
+    await conn.commit()
+
+
+async def timed(label, coro):
+    started = time.perf_counter()
+    count = await coro
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {count:>8} rows {elapsed:>8.2f}s {count / elapsed:>10.0f} rows/s")
+    return elapsed
+
+
+async def main(num_docs, batch_size):
+    await setup_database()
+    rng = random.Random(7)
+    rows = [normalize_document(synthetic_document(i, rng)) for i in range(num_docs)]
+
+    pool = await get_db_pool()
+    try:
+        async with pool.acquire() as conn:
+            await delete_bench_rows(conn)
+            results = {}
+            for label, runner in (
+                ("row-by-row", lambda: upsert_row_by_row(conn, rows)),
+                (f"batched (batch_size={batch_size})", lambda: upsert_batched(conn, rows, batch_size)),
+            ):
+                inserted = await timed(f"{label} insert", runner())
+                updated = await timed(f"{label} update", runner()) # Same rows again: ON DUPLICATE KEY path
+                results[label] = inserted + updated
+                await delete_bench_rows(conn)
+            baseline, batched = results.values()
+            print(f"\nSpeedup: {baseline / batched:.1f}x")
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.docs, args.batch_size))
@@ -0,0 +1,111 @@
+"""
+Compares LIKE and FULLTEXT search latency on a synthetic corpus.
+
+Loads N synthetic rows into a scratch copy of `federal_documents` (default 1M rows)
+and times the queries produced by agent.tools.build_search_query in both modes.
+
+Run from the project root (MySQL must be running, .env configured):
+    python -m benchmarks.bench_search --rows 1000000 --repeat 20
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from agent.tools import build_search_query
+from benchmarks.corpus import synthetic_document
+from data_pipeline.db_setup import get_db_pool, index_exists, setup_database
+from data_pipeline.processor import document_values, normalize_document
+
+BENCH_TABLE = "federal_documents_bench"
+INSERT_BATCH_SIZE = 5000
+
+SEARCH_TERMS = ["artificial intelligence", "hazardous waste", "fishery management", "executive order", "cybersecurity"]
+
+
+def synthetic_row(i, rng):
+    return document_values(normalize_document(synthetic_document(i, rng)))
+
+
+async def load_corpus(pool, rows):
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(f"CREATE TABLE IF NOT EXISTS {BENCH_TABLE} LIKE federal_documents")
+            await cur.execute(f"SELECT COUNT(*) FROM {BENCH_TABLE}")
+            existing = (await cur.fetchone())[0]
+            if existing >= rows:
+                print(f"{BENCH_TABLE} already holds {existing} rows, reusing it.")
+                return
+
+            # Building the FULLTEXT index once after the load is much faster than maintaining it per row
+            await cur.execute(f"TRUNCATE TABLE {BENCH_TABLE}")
+            if await index_exists(cur, BENCH_TABLE, "ft_title_abstract"):
+                await cur.execute(f"ALTER TABLE {BENCH_TABLE} DROP INDEX ft_title_abstract")
+
+            rng = random.Random(42)
+            started = time.perf_counter()
+            for offset in range(0, rows, INSERT_BATCH_SIZE):
+                batch = [synthetic_row(i, rng) for i in range(offset, min(offset + INSERT_BATCH_SIZE, rows))]
+                await cur.executemany(
+                    f"""
+                    INSERT INTO {BENCH_TABLE} (
+                        document_number, title, publication_date, document_type,
+                        abstract, html_url, abstract_preview, tool_payload, content_hash
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """,
+                    batch
+                )
+                if (offset // INSERT_BATCH_SIZE) % 20 == 0:
+                    print(f"Loaded {offset + len(batch)}/{rows} rows...")
+            print(f"Loaded {rows} rows in {time.perf_counter() - started:.1f}s. Building FULLTEXT index...")
+            await cur.execute(f"ALTER TABLE {BENCH_TABLE} ADD FULLTEXT INDEX ft_title_abstract (title, abstract)")
+            await cur.execute(f"ANALYZE TABLE {BENCH_TABLE}")
+
+
+async def time_query(pool, mode, search_term, repeat, **filters):
+    query, params = build_search_query(search_term, limit=20, mode=mode, table=BENCH_TABLE, **filters)
+    timings = []
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                await cur.execute(query, tuple(params))
+                await cur.fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "mean": statistics.fmean(timings),
+    }
+
+
+async def main(rows, repeat, keep):
+    await setup_database() # Ensures federal_documents and its indexes exist to copy from
+    pool = await get_db_pool()
+    try:
+        await load_corpus(pool, rows)
+        print(f"\n{'search term':<24} {'filters':<26} {'mode':<9} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+        for term in SEARCH_TERMS:
+            for filters in ({}, {"document_type": "Rule", "start_date": "2020-01-01", "end_date": "2020-12-31"}):
+                label = "type+date" if filters else "-"
+                for mode in ("like", "fulltext"):
+                    stats = await time_query(pool, mode, term, repeat, **filters)
+                    print(f"{term:<24} {label:<26} {mode:<9} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['mean']:>9.1f}")
+        if not keep:
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(f"DROP TABLE {BENCH_TABLE}")
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help=f"Keep {BENCH_TABLE} for later runs")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat, args.keep))
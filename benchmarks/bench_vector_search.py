@@ -0,0 +1,82 @@
+"""
+Measures query latency of the local vector index (data_pipeline/vector_index.py).
+
+Fills a scratch index with N random unit vectors and times exact NumPy scans, filtered
+scans and, when hnswlib is installed, HNSW graph queries. No database or model server needed.
+
+    python -m benchmarks.bench_vector_search --rows 1000000 --dim 768 --queries 50
+"""
+import argparse
+import asyncio
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from data_pipeline.vector_index import DOCUMENT_TYPE_CODES, VectorIndex, hnswlib
+
+ADD_BATCH_SIZE = 50000
+
+
+async def fill_index(index, rows, dim, rng):
+    types = list(DOCUMENT_TYPE_CODES)
+    start = date(2024, 1, 1)
+    started = time.perf_counter()
+    for offset in range(0, rows, ADD_BATCH_SIZE):
+        n = min(ADD_BATCH_SIZE, rows - offset)
+        vectors = rng.standard_normal((n, dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        await index.add(
+            [f"BENCH-{offset + i}" for i in range(n)], vectors,
+            [(start + timedelta(days=int(d))).isoformat() for d in rng.integers(0, 540, n)],
+            [types[t] for t in rng.integers(0, len(types), n)],
+        )
+    print(f"Appended {rows} vectors ({dim} dims) in {time.perf_counter() - started:.1f}s")
+
+
+def time_queries(label, index, queries, **filters):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, 10, **filters)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<32} p50 {statistics.median(latencies) * 1000:>8.2f} ms   p95 {p95 * 1000:>8.2f} ms")
+
+
+async def main(rows, dim, queries):
+    rng = np.random.default_rng(42)
+    directory = tempfile.mkdtemp(prefix="vector_bench_")
+    try:
+        index = VectorIndex(directory)
+        await fill_index(index, rows, dim, rng)
+        query_vectors = rng.standard_normal((queries, dim), dtype=np.float32)
+        index.refresh()
+
+        time_queries("exact scan", index, query_vectors)
+        time_queries("exact scan, 30-day window", index, query_vectors, start_date="2025-01-01", end_date="2025-01-30")
+        time_queries("exact scan, type=Rule", index, query_vectors, document_type="Rule")
+
+        if hnswlib is None:
+            print("hnswlib not installed; skipping HNSW timings (pip install hnswlib).")
+            return
+        started = time.perf_counter()
+        index.save_graph()
+        print(f"Built HNSW graph in {time.perf_counter() - started:.1f}s")
+        time_queries("hnsw", index, query_vectors)
+        time_queries("hnsw, type=Rule", index, query_vectors, document_type="Rule")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.dim, args.queries))
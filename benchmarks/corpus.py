@@ -0,0 +1,116 @@
+"""
+Synthetic Federal Register documents in the shape of the API results stored in
+data/processed/federal_register_YYYY-MM-DD.json, for benchmarks.
+
+Writes a corpus of raw files the processor can ingest:
+    python -m benchmarks.corpus --out data/raw --days 30 --docs-per-day 300 --format json
+"""
+import argparse
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+from data_pipeline.raw_store import raw_filename
+
+VOCABULARY = (
+    "agency rule notice proposed environmental protection air quality emissions standards "
+    "fishery management council meeting trade zone production activity pharmaceutical "
+    "education services children disabilities grant application deadline security "
+    "national emergency executive order technology artificial intelligence automated "
+    "decision systems cybersecurity transportation safety aviation highway railroad "
+    "energy efficiency conservation water pollution discharge permit hazardous waste "
+    "medicare medicaid payment health insurance drug approval food labeling agriculture "
+    "import export tariff antidumping investigation commerce treasury sanctions wildlife"
+).split()
+DOCUMENT_TYPES = ["Rule", "Proposed Rule", "Notice", "Presidential Document"]
+AGENCIES = [
+    "Environmental Protection Agency", "Commerce Department", "International Trade Administration",
+    "National Oceanic and Atmospheric Administration", "Federal Aviation Administration",
+    "Centers for Medicare & Medicaid Services", "Food and Drug Administration", "Education Department",
+    "Treasury Department", "Executive Office of the President",
+]
+TOPICS = [
+    "Air pollution control", "Administrative practice and procedure", "Reporting and recordkeeping requirements",
+    "Fisheries", "Aviation safety", "Medicare", "Food labeling", "Exports", "Imports", "Hazardous waste",
+]
+CFR_TITLES = [7, 14, 15, 19, 21, 40, 42, 50]
+CORPUS_START_DATE = date(2015, 1, 1)
+
+
+def _words(rng, low, high):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(low, high)))
+
+
+def _agency(name):
+    slug = "-".join(name.lower().replace("&", "").split())
+    return {"name": name, "raw_name": name.upper(), "slug": slug, "url": f"https://www.federalregister.gov/agencies/{slug}"}
+
+
+def synthetic_document(i, rng, publication_date=None):
+    """One document dict with the same fields the downloader requests from the API."""
+    if publication_date is None:
+        publication_date = CORPUS_START_DATE + timedelta(days=rng.randint(0, 3650))
+    pub = publication_date.isoformat()
+    document_number = f"BENCH-{i:08d}"
+    path = pub.replace("-", "/")
+    return {
+        "document_number": document_number,
+        "title": _words(rng, 6, 14).capitalize(),
+        "publication_date": pub,
+        "type": rng.choice(DOCUMENT_TYPES),
+        "abstract": _words(rng, 20, 60).capitalize() + "." if rng.random() > 0.2 else None,
+        "html_url": f"https://www.federalregister.gov/documents/{path}/{document_number}/bench",
+        "raw_text_url": f"https://www.federalregister.gov/documents/full_text/text/{path}/{document_number}.txt",
+        "agencies": [_agency(name) for name in rng.sample(AGENCIES, rng.choice((1, 1, 1, 2)))],
+        "topics": rng.sample(TOPICS, rng.randint(0, 3)),
+        "cfr_references": [
+            {"title": rng.choice(CFR_TITLES), "part": rng.randint(1, 999), "chapter": None} for _ in range(rng.randint(0, 2))
+        ],
+    }
+
+
+def synthetic_text(rng, paragraphs):
+    """A document body: a heading line, then `paragraphs` paragraphs of 40-160 words separated by blank lines."""
+    sections = [_words(rng, 4, 8).upper()]
+    sections += [_words(rng, 40, 160).capitalize() + "." for _ in range(paragraphs)]
+    return "\n\n".join(sections) + "\n"
+
+
+def write_corpus(directory, days, docs_per_day, start_date=CORPUS_START_DATE, fmt="json", seed=42):
+    """
+    Writes one raw file per weekday (weekends are empty, like the real register) and returns their paths.
+    "json" matches the legacy one-array files in data/processed; "ndjson" is what the downloader writes.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    number = 0
+    for offset in range(days):
+        publication_date = start_date + timedelta(days=offset)
+        if publication_date.weekday() >= 5:
+            continue
+        docs = [synthetic_document(number + i, rng, publication_date) for i in range(docs_per_day)]
+        number += docs_per_day
+        path = directory / raw_filename(publication_date.isoformat(), fmt)
+        with open(path, "w", encoding="utf-8") as f:
+            if fmt == "json":
+                json.dump(docs, f, indent=2)
+            else:
+                f.writelines(json.dumps(doc, separators=(",", ":")) + "\n" for doc in docs)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="data/raw")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--docs-per-day", type=int, default=300)
+    parser.add_argument("--start-date", type=date.fromisoformat, default=CORPUS_START_DATE)
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    written = write_corpus(args.out, args.days, args.docs_per_day, args.start_date, args.format, args.seed)
+    print(f"Wrote {len(written)} file(s) with {len(written) * args.docs_per_day} documents to {args.out}.")
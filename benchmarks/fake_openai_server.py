@@ -0,0 +1,156 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions server (what Ollama exposes at /v1).
+
+Answers deterministically with configurable prefill and per-token latency, in both streaming
+and non-streaming mode. When tools are offered and the last message is from the user it asks
+for a `search_federal_documents_in_db` call first, like a tool-using model would.
+/v1/embeddings returns deterministic hashed bag-of-words vectors.
+
+    python -m benchmarks.fake_openai_server --port 11435 --token-latency 0.02 --prefill-latency 0.3
+    OLLAMA_BASE_URL=http://127.0.0.1:11435/v1 OLLAMA_MODEL=fake uvicorn api.main:app
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+import zlib
+
+from aiohttp import web
+
+EMBEDDING_DIM = 64
+STATS = web.AppKey("stats", dict) # Also served at GET /stats
+
+ANSWER_WORDS = (
+    "Here is a summary of the Federal Register documents that match your question . "
+    "The most recent items include notices and rules from several agencies , "
+    "covering public meetings , proposed changes and final regulations ."
+).split()
+
+
+def _last_message(messages):
+    return messages[-1] if messages else {"role": "user", "content": ""}
+
+
+def _wants_tool_call(body, tool_call_rate):
+    tools = body.get("tools") or []
+    last = _last_message(body.get("messages", []))
+    if not tools or last.get("role") != "user":
+        return False
+    # Deterministic per prompt so repeated benchmark runs behave the same
+    return (zlib.crc32(str(last.get("content")).encode()) % 1000) / 1000 < tool_call_rate
+
+
+def _tool_calls(body, count):
+    """`count` search calls over different slices of the prompt, like a model fanning out a question."""
+    names = [tool["function"]["name"] for tool in body.get("tools", [])]
+    name = "search_federal_documents_in_db" if "search_federal_documents_in_db" in names else names[0]
+    words = str(_last_message(body["messages"]).get("content", "")).split()
+    calls = []
+    for i in range(count):
+        arguments = json.dumps({"search_term": " ".join(words[-4 - i:len(words) - i]), "limit": 3})
+        calls.append({"id": f"call_{uuid.uuid4().hex[:8]}", "type": "function", "function": {"name": name, "arguments": arguments}})
+    return calls
+
+
+def _embedding(text):
+    """Hashed bag of words: texts sharing words get similar vectors, which is enough to exercise the index."""
+    vector = [0.0] * EMBEDDING_DIM
+    for word in str(text).lower().split():
+        vector[zlib.crc32(word.encode()) % EMBEDDING_DIM] += 1.0
+    return vector
+
+
+def create_app(token_latency=0.02, prefill_latency=0.2, answer_tokens=40, tool_call_rate=1.0, tool_calls_per_turn=1):
+    app = web.Application()
+    app[STATS] = {"requests": 0, "streamed": 0, "tool_calls": 0, "embedding_inputs": 0}
+
+    def answer():
+        return [ANSWER_WORDS[i % len(ANSWER_WORDS)] + " " for i in range(answer_tokens)]
+
+    async def chat_completions(request):
+        body = await request.json()
+        app[STATS]["requests"] += 1
+        model = body.get("model", "fake")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        tool_calls = _tool_calls(body, tool_calls_per_turn) if _wants_tool_call(body, tool_call_rate) else []
+        app[STATS]["tool_calls"] += len(tool_calls)
+
+        await asyncio.sleep(prefill_latency) # Prompt processing before the first token
+
+        if not body.get("stream"):
+            tokens = [] if tool_calls else answer()
+            await asyncio.sleep(token_latency * len(tokens))
+            message = {"role": "assistant", "content": "".join(tokens) or None}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return web.json_response({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            })
+
+        app[STATS]["streamed"] += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        async def send(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        await send({"role": "assistant", "content": ""})
+        if tool_calls:
+            await send({"tool_calls": [dict(call, index=i) for i, call in enumerate(tool_calls)]})
+            await send({}, "tool_calls")
+        else:
+            for token in answer():
+                await asyncio.sleep(token_latency)
+                await send({"content": token})
+            await send({}, "stop")
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def embeddings(request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        app[STATS]["embedding_inputs"] += len(inputs)
+        return web.json_response({
+            "object": "list", "model": body.get("model", "fake"),
+            "data": [{"object": "embedding", "index": i, "embedding": _embedding(text)} for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+    async def models(request):
+        return web.json_response({"object": "list", "data": [{"id": "fake", "object": "model"}]})
+
+    async def stats(request):
+        return web.json_response(app[STATS])
+
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/v1/embeddings", embeddings)
+    app.router.add_get("/v1/models", models)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Seconds between generated tokens")
+    parser.add_argument("--prefill-latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    parser.add_argument("--tool-call-rate", type=float, default=1.0,
+                        help="Fraction of user prompts that trigger a tool call when tools are offered")
+    parser.add_argument("--tool-calls-per-turn", type=int, default=1, help="Tool calls requested at once")
+    args = parser.parse_args()
+    web.run_app(
+        create_app(args.token_latency, args.prefill_latency, args.answer_tokens, args.tool_call_rate, args.tool_calls_per_turn),
+        host=args.host, port=args.port
+    )
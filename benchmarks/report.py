@@ -0,0 +1,96 @@
+"""
+Latency/throughput summaries for the benchmark suite, and comparison with a saved baseline.
+
+A baseline is a JSON file written by `python -m benchmarks.suite --save-baseline PATH`:
+    {"created": "...", "params": {...}, "results": {"search_cold": {"p50_ms": ..., "throughput": ...}, ...}}
+"""
+import json
+import math
+import platform
+import statistics
+from datetime import datetime, timezone
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+DEFAULT_TOLERANCE = 0.2 # Relative change allowed before a metric counts as a regression
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, elapsed, items=None, unit="req", errors=0):
+    """
+    latencies: seconds per operation. elapsed: wall-clock seconds of the whole run.
+    items: units of work done (e.g. documents) if throughput should not be counted in operations.
+    """
+    values = sorted(latencies)
+    count = items if items is not None else len(values)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+        "throughput": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "unit": f"{unit}/s",
+    }
+
+
+def print_results(results):
+    print(f"\n{'scenario':<22} {'n':>6} {'errors':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'throughput':>16}")
+    for name, stats in results.items():
+        print(f"{name:<22} {stats['count']:>6} {stats['errors']:>6} {stats['p50_ms']:>10.1f} {stats['p95_ms']:>10.1f} "
+              f"{stats['p99_ms']:>10.1f} {stats['throughput']:>10.1f} {stats['unit']}")
+
+
+def save_baseline(path, results, params):
+    baseline = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "params": params,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    print(f"\nSaved baseline to {path}")
+
+
+def load_baseline(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Prints a per-metric comparison and returns the regressions as (scenario, metric, old, new) tuples.
+    Latencies regress when they grow by more than `tolerance`, throughput when it drops by more than it,
+    and any increase in failed operations is a regression.
+    """
+    regressions = []
+    old_results = baseline.get("results", {})
+    print(f"\nCompared with baseline from {baseline.get('created', '?')} (tolerance {tolerance:.0%}):")
+    for name, stats in results.items():
+        old = old_results.get(name)
+        if old is None:
+            print(f"  {name}: not in baseline")
+            continue
+        if stats.get("errors", 0) > old.get("errors", 0):
+            regressions.append((name, "errors", old.get("errors", 0), stats["errors"]))
+            print(f"  {name:<20} {'errors':<11} {old.get('errors', 0):>10} -> {stats['errors']:>10} REGRESSION")
+        for key in LATENCY_KEYS + ("throughput",):
+            before, after = old.get(key), stats.get(key)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = change > tolerance if key != "throughput" else change < -tolerance
+            if worse:
+                regressions.append((name, key, before, after))
+            marker = "REGRESSION" if worse else "ok"
+            print(f"  {name:<20} {key:<11} {before:>10.1f} -> {after:>10.1f} ({change:+.0%}) {marker}")
+    return regressions
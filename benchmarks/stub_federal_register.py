@@ -0,0 +1,111 @@
+"""
+Local stand-in for the Federal Register documents API.
+
+Serves deterministic synthetic documents for any publication date, with the
+`count` / `total_pages` metadata of the real API, plus optional latency and
+injected 429/503 responses to exercise the downloader's retry path.
+Also serves a body for every raw_text_url path (like federalregister.gov, an HTML page
+with the text in a <pre>), for the full-text stage in data_pipeline/document_text.py.
+
+    python -m benchmarks.stub_federal_register --port 8081 --docs-per-day 450 --error-rate 0.05
+    FEDERAL_REGISTER_API_URL=http://127.0.0.1:8081/api/v1/documents.json python -m data_pipeline.run_pipeline
+    FEDERAL_REGISTER_TEXT_BASE_URL=http://127.0.0.1:8081 python -m data_pipeline.document_text
+"""
+import argparse
+import asyncio
+import html
+import random
+import zlib
+from datetime import date
+
+from aiohttp import web
+
+from benchmarks.corpus import synthetic_document, synthetic_text
+
+DOCUMENTS_PATH = "/api/v1/documents.json"
+TEXT_PATH_PREFIX = "/documents/full_text/text/" # raw_text_url paths: <prefix>YYYY/MM/DD/<document_number>.txt
+STATS = web.AppKey("stats", dict) # Requests served, errors injected and bodies served
+
+
+def documents_for_date(date_str, docs_per_day):
+    """Same documents for the same date on every call, so pages are consistent."""
+    seed = zlib.crc32(date_str.encode())
+    rng = random.Random(seed)
+    publication_date = date.fromisoformat(date_str)
+    # Weekends are light, like the real register
+    count = docs_per_day if publication_date.weekday() < 5 else 0
+    return [synthetic_document(seed % 100000 * 10000 + i, rng, publication_date) for i in range(count)]
+
+
+def text_for_document(document_number, paragraphs=30):
+    """Same body for the same document on every call; about 0.7 KB of text per paragraph."""
+    rng = random.Random(zlib.crc32(document_number.encode()))
+    return synthetic_text(rng, rng.randint(paragraphs // 2, paragraphs * 3 // 2))
+
+
+def create_app(docs_per_day=300, latency=0.0, error_rate=0.0, max_per_page=1000, text_paragraphs=30):
+    app = web.Application()
+    app[STATS] = {"requests": 0, "errors_injected": 0, "texts": 0}
+    error_rng = random.Random(1234)
+
+    def injected_error():
+        if error_rate and error_rng.random() < error_rate:
+            app[STATS]["errors_injected"] += 1
+            status = error_rng.choice([429, 503])
+            return web.json_response({"errors": ["injected"]}, status=status, headers={"Retry-After": "0"})
+        return None
+
+    async def documents(request):
+        app[STATS]["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        error = injected_error()
+        if error:
+            return error
+
+        date_str = request.query.get("conditions[publication_date][is]")
+        if not date_str:
+            return web.json_response({"errors": ["publication_date condition required"]}, status=400)
+        per_page = min(int(request.query.get("per_page", 20)), max_per_page)
+        page = int(request.query.get("page", 1))
+        fields = request.query.getall("fields[]", [])
+
+        docs = documents_for_date(date_str, docs_per_day)
+        total_pages = (len(docs) + per_page - 1) // per_page
+        results = docs[(page - 1) * per_page: page * per_page]
+        if fields:
+            results = [{k: v for k, v in doc.items() if k in fields} for doc in results]
+        payload = {"count": len(docs), "total_pages": total_pages, "results": results}
+        if not results:
+            payload.pop("results") # The real API omits results past the last page
+        return web.json_response(payload)
+
+    async def document_text(request):
+        app[STATS]["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        error = injected_error()
+        if error:
+            return error
+        app[STATS]["texts"] += 1
+        body = html.escape(text_for_document(request.match_info["document_number"], text_paragraphs))
+        return web.Response(text=f"<html><body><pre>{body}</pre></body></html>", content_type="text/html")
+
+    app.router.add_get(DOCUMENTS_PATH, documents)
+    app.router.add_get(TEXT_PATH_PREFIX + "{date_path:.+}/{document_number}.txt", document_text)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--docs-per-day", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429/503")
+    parser.add_argument("--text-paragraphs", type=int, default=30, help="Average paragraphs per document body")
+    args = parser.parse_args()
+    web.run_app(
+        create_app(args.docs_per_day, args.latency, args.error_rate, text_paragraphs=args.text_paragraphs),
+        host=args.host, port=args.port
+    )
@@ -0,0 +1,347 @@
+"""
+End-to-end benchmark suite against local stand-ins.
+
+Scenarios (always run in this order, so the processed corpus is what search and chat query):
+  download  the concurrent downloader against benchmarks.stub_federal_register
+  process   the processor on a synthetic corpus from benchmarks.corpus (BENCH- rows, deleted afterwards)
+  text      the full-text stage fetching the processed corpus' bodies from the stub, then a rerun that must skip them all
+  search    search_federal_documents_in_db, cold (unique queries) and warm (same queries again, cached)
+  chat      /chat and /chat/stream of a uvicorn worker using benchmarks.fake_openai_server as the model
+
+Reports p50/p95/p99 latency and throughput per scenario. Save a baseline once, then compare
+before deploying; the exit status is 1 if any metric regressed by more than --tolerance:
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+
+process, text, search and chat need MySQL (.env configured; use a scratch database).
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+import aiohttp
+import httpx
+from aiohttp import web
+
+from benchmarks import fake_openai_server, stub_federal_register
+from benchmarks.bench_chat_stream import PROMPTS, time_chat, time_chat_stream
+from benchmarks.corpus import DOCUMENT_TYPES, VOCABULARY, write_corpus
+from benchmarks.report import (
+    DEFAULT_TOLERANCE, compare_to_baseline, load_baseline, print_results, save_baseline, summarize
+)
+
+SCENARIOS = ("download", "process", "text", "search", "chat")
+CORPUS_START_DATE = date(2024, 1, 1)
+API_READY_TIMEOUT = 30 # Seconds to wait for the spawned uvicorn worker
+
+
+async def run_load(operation, requests, concurrency):
+    """
+    Calls `await operation(i)` for i in range(requests) with at most `concurrency` in flight.
+    An operation fails if it raises or returns False. Returns (latencies in seconds, failures, elapsed seconds).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(i):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok = await operation(i)
+            except Exception as e:
+                print(f"Operation {i} failed: {e!r}")
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if ok is False:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, failures, time.perf_counter() - started
+
+
+async def start_server(app, port):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def bench_download(args, workdir):
+    from data_pipeline import downloader
+
+    stub = stub_federal_register.create_app(args.docs_per_day, args.api_latency, args.error_rate)
+    runner = await start_server(stub, args.stub_port)
+    downloader.FEDERAL_REGISTER_API_URL = f"http://127.0.0.1:{args.stub_port}{stub_federal_register.DOCUMENTS_PATH}"
+    downloader.RAW_DATA_DIR = workdir / "download"
+    downloader.RAW_DATA_DIR.mkdir(parents=True)
+
+    dates = [(CORPUS_START_DATE + timedelta(days=offset)).isoformat() for offset in range(args.days)]
+    limiter = downloader.TokenBucket(downloader.DOWNLOAD_RATE_LIMIT, downloader.DOWNLOAD_BURST)
+    semaphore = asyncio.Semaphore(downloader.DOWNLOAD_MAX_IN_FLIGHT)
+    try:
+        timeout = aiohttp.ClientTimeout(total=downloader.DOWNLOAD_REQUEST_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async def download_day(i):
+                _, complete = await downloader.download_day_concurrent(
+                    session, dates[i], limiter, semaphore, args.per_page
+                )
+                return complete
+
+            # All days at once, like download_date_range_concurrent; the shared limiter does the pacing
+            latencies, failures, elapsed = await run_load(download_day, len(dates), len(dates))
+    finally:
+        await runner.cleanup()
+    print(f"Stub served {stub[stub_federal_register.STATS]['requests']} requests ({stub[stub_federal_register.STATS]['errors_injected']} injected errors).")
+    documents = sum(len(stub_federal_register.documents_for_date(d, args.docs_per_day)) for d in dates)
+    return {"download_day": summarize(latencies, elapsed, items=documents, unit="docs", errors=failures)}
+
+
+async def delete_bench_rows():
+    from benchmarks.bench_ingest import delete_bench_rows as delete_rows
+    from data_pipeline.processor import get_db_pool
+
+    pool = await get_db_pool(maxsize=1)
+    try:
+        async with pool.acquire() as conn:
+            await delete_rows(conn)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+async def bench_process(args, workdir):
+    from data_pipeline import processor
+    from data_pipeline.db_setup import setup_database
+
+    await setup_database()
+    await delete_bench_rows() # Start from an empty BENCH- corpus so no rows are skipped as unchanged
+    paths = write_corpus(workdir / "process", args.days, args.docs_per_day, CORPUS_START_DATE, fmt="ndjson")
+    processor.PROCESSED_DATA_DIR = workdir / "processed"
+
+    pool = await processor.get_db_pool(maxsize=args.process_concurrency)
+    try:
+        async def process(i):
+            return await processor.process_file(paths[i], pool) is not None
+
+        latencies, failures, elapsed = await run_load(process, len(paths), args.process_concurrency)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+    documents = len(paths) * args.docs_per_day
+    return {"process_file": summarize(latencies, elapsed, items=documents, unit="docs", errors=failures)}
+
+
+async def bench_text(args, workdir):
+    from data_pipeline import document_text
+    from data_pipeline.processor import get_db_pool
+
+    pool = await get_db_pool(maxsize=1)
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                for table in document_text.TEXT_TABLES: # Bodies kept by an earlier --keep run would be skipped
+                    await cur.execute(f"DELETE FROM {table} WHERE document_number LIKE %s", ("BENCH-%",))
+            await conn.commit()
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+    stub = stub_federal_register.create_app(args.docs_per_day, args.api_latency, args.error_rate)
+    runner = await start_server(stub, args.stub_port)
+    document_text.FEDERAL_REGISTER_TEXT_BASE_URL = f"http://127.0.0.1:{args.stub_port}"
+    document_text.TEXT_FETCH_RATE_LIMIT = args.text_rate
+    end = CORPUS_START_DATE + timedelta(days=args.days - 1)
+    results = {}
+    try:
+        # One whole stage run per measurement: latency is the run, throughput is bodies stored per second
+        for name in ("text_fetch", "text_resume"):
+            started = time.perf_counter()
+            stats = await document_text.fetch_document_texts(CORPUS_START_DATE, end, max_in_flight=args.text_concurrency)
+            elapsed = time.perf_counter() - started
+            results[name] = summarize([elapsed], elapsed, items=stats["stored"], unit="docs", errors=stats["failed"])
+    finally:
+        await runner.cleanup()
+    print(f"Stub served {stub[stub_federal_register.STATS]['texts']} bodies ({stub[stub_federal_register.STATS]['errors_injected']} injected errors).")
+    if results["text_resume"]["throughput"]:
+        print("Warning: the rerun fetched bodies again instead of skipping the stored ones.")
+    return results
+
+
+def search_workload(count, days, seed=7):
+    """`count` distinct argument sets: two-word terms, half of them filtered by type and a date window."""
+    rng = random.Random(seed)
+    workload = set()
+    while len(workload) < count:
+        term = " ".join(rng.sample(VOCABULARY, 2))
+        if rng.random() < 0.5:
+            workload.add((term, None, None, None))
+            continue
+        start = CORPUS_START_DATE + timedelta(days=rng.randint(0, max(days - 7, 0)))
+        workload.add((term, rng.choice(DOCUMENT_TYPES), start.isoformat(), (start + timedelta(days=6)).isoformat()))
+    return sorted(workload, key=str)
+
+
+async def bench_search(args, workdir):
+    from agent.db import close_pool, init_pool
+    from agent.tools import search_cache, search_federal_documents_in_db
+
+    workload = search_workload(args.search_requests, args.days)
+    await init_pool()
+    try:
+        async def search(i):
+            result = await search_federal_documents_in_db(*workload[i], limit=5)
+            return not result.startswith("Error querying database")
+
+        results = {}
+        search_cache.clear()
+        for name in ("search_cold", "search_warm"): # The second pass is served from the result cache
+            latencies, failures, elapsed = await run_load(search, len(workload), args.search_concurrency)
+            results[name] = summarize(latencies, elapsed, errors=failures)
+    finally:
+        await close_pool()
+    return results
+
+
+async def start_api(args, workdir):
+    """Spawns a uvicorn worker that talks to the fake model server. Returns (process, base URL)."""
+    env = dict(
+        os.environ, OLLAMA_BASE_URL=f"http://127.0.0.1:{args.llm_port}/v1", OLLAMA_MODEL="fake",
+        LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"),
+    )
+    log_path = workdir / "api.log"
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(args.api_port),
+        env=env, stdout=open(log_path, "w"), stderr=asyncio.subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{args.api_port}"
+    deadline = time.monotonic() + API_READY_TIMEOUT
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.returncode is not None:
+                break
+            try:
+                if (await client.get("/ready")).status_code == 200: # Warmup done: measure a warm server
+                    return process, base_url
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    if process.returncode is None:
+        process.kill()
+        await process.wait()
+    raise RuntimeError(f"API did not become ready; see {log_path}:\n{log_path.read_text()[-2000:]}")
+
+
+async def bench_chat(args, workdir):
+    model = fake_openai_server.create_app(
+        token_latency=args.token_latency, prefill_latency=args.prefill_latency,
+        answer_tokens=args.answer_tokens, tool_call_rate=args.tool_call_rate,
+    )
+    llm_runner = await start_server(model, args.llm_port)
+    process = None
+    try:
+        if args.api_url:
+            base_url = args.api_url # Already running, pointed at --llm-port
+        else:
+            process, base_url = await start_api(args, workdir)
+        run_id = uuid.uuid4().hex[:8]
+        first_tokens = []
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+            async def chat(i):
+                await time_chat(client, f"bench-{run_id}-{i}", PROMPTS[i % len(PROMPTS)])
+
+            async def chat_stream(i):
+                first, _ = await time_chat_stream(client, f"bench-{run_id}-stream-{i}", PROMPTS[i % len(PROMPTS)])
+                first_tokens.append(first)
+
+            results = {}
+            latencies, failures, elapsed = await run_load(chat, args.chat_requests, args.chat_concurrency)
+            results["chat"] = summarize(latencies, elapsed, errors=failures)
+            latencies, failures, elapsed = await run_load(chat_stream, args.chat_requests, args.chat_concurrency)
+            results["chat_stream"] = summarize(latencies, elapsed, errors=failures)
+            results["chat_stream_ttft"] = summarize(first_tokens, elapsed, errors=failures)
+    finally:
+        if process is not None:
+            process.terminate()
+            await process.wait()
+        await llm_runner.cleanup()
+    return results
+
+
+SCENARIO_RUNNERS = {
+    "download": bench_download, "process": bench_process, "text": bench_text, "search": bench_search, "chat": bench_chat,
+}
+
+
+async def main(args):
+    results = {}
+    workdir = Path(tempfile.mkdtemp(prefix="fr-bench-"))
+    try:
+        for name in SCENARIOS:
+            if name in args.scenarios:
+                print(f"\n=== {name} ===")
+                results.update(await SCENARIO_RUNNERS[name](args, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if "process" in args.scenarios and not args.keep:
+            await delete_bench_rows()
+
+    print_results(results)
+    params = {
+        key: value for key, value in vars(args).items()
+        if key not in ("baseline", "save_baseline", "tolerance", "keep", "api_url")
+    }
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, params)
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline.get("params") != params:
+            print(f"\nWarning: parameters differ from the baseline run: {baseline.get('params')}")
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}.")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS),
+                        help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--days", type=int, default=10, help="Publication dates downloaded / processed")
+    parser.add_argument("--docs-per-day", type=int, default=300)
+    parser.add_argument("--per-page", type=int, default=200)
+    parser.add_argument("--api-latency", type=float, default=0.05, help="Stub Federal Register API latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub 429/503 rate")
+    parser.add_argument("--process-concurrency", type=int, default=4, help="Files processed at once")
+    parser.add_argument("--text-concurrency", type=int, default=8, help="Document bodies fetched at once")
+    parser.add_argument("--text-rate", type=float, default=500, help="Document body requests per second")
+    parser.add_argument("--search-requests", type=int, default=200)
+    parser.add_argument("--search-concurrency", type=int, default=10)
+    parser.add_argument("--chat-requests", type=int, default=50)
+    parser.add_argument("--chat-concurrency", type=int, default=5)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument("--prefill-latency", type=float, default=0.2)
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    parser.add_argument("--tool-call-rate", type=float, default=0.5)
+    parser.add_argument("--stub-port", type=int, default=8081)
+    parser.add_argument("--llm-port", type=int, default=11435)
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--api-url", help="Benchmark an already running API (using --llm-port) instead of spawning one")
+    parser.add_argument("--keep", action="store_true", help="Keep the BENCH- rows in federal_documents")
+    parser.add_argument("--baseline", help="Baseline JSON to compare with; exit status 1 on regression")
+    parser.add_argument("--save-baseline", help="Write this run's results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
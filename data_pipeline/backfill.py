@@ -0,0 +1,474 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from dotenv import load_dotenv
+from data_pipeline.checkpoints import get_checkpoint, set_checkpoint, advance_checkpoint
+from data_pipeline.db_setup import (
+    INDEX_MIGRATIONS, PIPELINE_LOCK_NAME, UNDATED_PUBLICATION_DATE, apply_index_migrations, get_db_pool, get_lock,
+    index_exists, release_lock, setup_database,
+)
+from data_pipeline.document_text import DOCUMENT_TEXT_ENABLED, TEXT_FETCH_PER_RUN, fetch_document_texts
+from data_pipeline.downloader import RAW_DATA_DIR, download_missing_dates
+from data_pipeline.facets import FACET_LINK_TABLES
+from data_pipeline.processor import (
+    AGENCIES, CFR_REFERENCES, TOPICS, _move_to_processed, embed_written_rows, normalize_document, normalized_batches,
+    save_vector_graph,
+)
+from data_pipeline.raw_store import date_from_raw_filename, iter_raw_documents, list_raw_files
+from data_pipeline.rollups import rebuild_rollups
+from data_pipeline.vector_index import EMBEDDING_BATCH_SIZE, EMBEDDING_MODEL
+from observability.metrics import PIPELINE_ROWS, PIPELINE_STAGE_SECONDS
+
+load_dotenv()
+
+# Publication dates staged and merged per round; the checkpoint advances after each one
+BACKFILL_CHUNK_DAYS = int(os.getenv("BACKFILL_CHUNK_DAYS", 31))
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", os.cpu_count() or 1))
+# Rows per multi-row INSERT when the server does not allow LOAD DATA LOCAL INFILE
+BACKFILL_INSERT_BATCH_SIZE = int(os.getenv("BACKFILL_INSERT_BATCH_SIZE", 2000))
+BACKFILL_CHECKPOINT = "backfill"
+# Federal Register documents are published from 1994 on
+BACKFILL_EARLIEST_DATE = date(1994, 1, 1)
+
+STAGING_TABLE = "federal_documents_staging"
+FACET_STAGING_TABLE = "document_facets_staging"
+# Same order as the start of normalize_document's rows, so staged files and INSERTs need no reshuffling
+STAGING_COLUMNS = (
+    "document_number", "title", "publication_date", "document_type", "abstract",
+    "html_url", "abstract_preview", "tool_payload", "content_hash", "raw_data",
+)
+DOCUMENT_COLUMNS = ", ".join(STAGING_COLUMNS[:-1])
+
+# No FULLTEXT or date indexes: rows are appended in `seq` order and read back once by the merge.
+# document_number is indexed for the facet merge, which looks staged documents up by it.
+STAGING_TABLE_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {STAGING_TABLE} (
+        seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+        document_number VARCHAR(255) NOT NULL,
+        title TEXT,
+        publication_date DATE,
+        document_type VARCHAR(255),
+        abstract TEXT,
+        html_url VARCHAR(1024),
+        abstract_preview VARCHAR(255),
+        tool_payload TEXT,
+        content_hash CHAR(64),
+        raw_data LONGTEXT,
+        INDEX idx_document_number (document_number)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+"""
+
+# One row per facet link: ('agency' | 'topic', slug, name) or ('cfr', title, part)
+FACET_STAGING_TABLE_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {FACET_STAGING_TABLE} (
+        document_number VARCHAR(255) NOT NULL,
+        facet VARCHAR(16) NOT NULL,
+        facet_key VARCHAR(255) NOT NULL,
+        facet_value VARCHAR(255) NOT NULL
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+"""
+
+LOAD_STAGING_SQL = f"""
+    LOAD DATA LOCAL INFILE %s INTO TABLE {STAGING_TABLE} CHARACTER SET utf8mb4
+    ({", ".join(STAGING_COLUMNS)})
+"""
+
+LOAD_FACET_STAGING_SQL = f"""
+    LOAD DATA LOCAL INFILE %s INTO TABLE {FACET_STAGING_TABLE} CHARACTER SET utf8mb4
+    (document_number, facet, facet_key, facet_value)
+"""
+
+INSERT_FACET_STAGING_SQL = f"""
+    INSERT INTO {FACET_STAGING_TABLE} (document_number, facet, facet_key, facet_value) VALUES (%s, %s, %s, %s)
+"""
+
+INSERT_STAGING_SQL = f"""
+    INSERT INTO {STAGING_TABLE} ({", ".join(STAGING_COLUMNS)})
+    VALUES ({", ".join(["%s"] * len(STAGING_COLUMNS))})
+"""
+
+# Staged documents whose stored content hash matches are dropped before the merge (cheap re-runs)
+DELETE_UNCHANGED_SQL = f"""
+    DELETE s FROM {STAGING_TABLE} s
+    JOIN federal_documents d ON d.document_number = s.document_number AND d.content_hash = s.content_hash
+"""
+
+# Set-based counterparts of processor.UPSERT_DOCUMENT_SQL / UPSERT_RAW_SQL; ORDER BY seq lets the
+# last staged copy of a document win, as it would when files are processed one after another
+MERGE_DOCUMENTS_SQL = f"""
+    INSERT INTO federal_documents ({DOCUMENT_COLUMNS})
+    SELECT {DOCUMENT_COLUMNS} FROM {STAGING_TABLE} ORDER BY seq
+    ON DUPLICATE KEY UPDATE
+        title = VALUES(title),
+        publication_date = VALUES(publication_date),
+        document_type = VALUES(document_type),
+        abstract = VALUES(abstract),
+        html_url = VALUES(html_url),
+        abstract_preview = VALUES(abstract_preview),
+        tool_payload = VALUES(tool_payload),
+        content_hash = VALUES(content_hash),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+MERGE_RAW_SQL = f"""
+    INSERT INTO federal_documents_raw (document_number, publication_date, raw_data)
+    SELECT document_number, COALESCE(publication_date, '{UNDATED_PUBLICATION_DATE}'), raw_data
+    FROM {STAGING_TABLE} ORDER BY seq
+    ON DUPLICATE KEY UPDATE raw_data = VALUES(raw_data)
+"""
+
+# Runs before MERGE_DOCUMENTS_SQL: raw copies filed under a stored date the staged document no longer has
+DELETE_MOVED_RAW_SQL = f"""
+    DELETE r FROM federal_documents_raw r
+    JOIN federal_documents d ON d.document_number = r.document_number
+        AND r.publication_date = COALESCE(d.publication_date, '{UNDATED_PUBLICATION_DATE}')
+    JOIN {STAGING_TABLE} s ON s.document_number = d.document_number
+    WHERE r.publication_date <> COALESCE(s.publication_date, '{UNDATED_PUBLICATION_DATE}')
+"""
+
+# Facet links of the staged (changed) documents replace their previous ones
+_STAGED_FACET_SQL = f"""
+    FROM {FACET_STAGING_TABLE} f
+    WHERE f.facet = '{{facet}}'
+    AND EXISTS (SELECT 1 FROM {STAGING_TABLE} s WHERE s.document_number = f.document_number)
+"""
+MERGE_FACET_STATEMENTS = [
+    f"""
+    DELETE l FROM {table} l
+    JOIN (SELECT DISTINCT document_number FROM {STAGING_TABLE}) s ON s.document_number = l.document_number
+    """
+    for table in FACET_LINK_TABLES
+] + [
+    f"""
+    INSERT INTO agencies (slug, name)
+    SELECT f.facet_key, MAX(f.facet_value) {_STAGED_FACET_SQL.format(facet="agency")} GROUP BY f.facet_key
+    ON DUPLICATE KEY UPDATE name = VALUES(name)
+    """,
+    f"""
+    INSERT INTO topics (slug, name)
+    SELECT f.facet_key, MAX(f.facet_value) {_STAGED_FACET_SQL.format(facet="topic")} GROUP BY f.facet_key
+    ON DUPLICATE KEY UPDATE name = VALUES(name)
+    """,
+    f"""
+    INSERT IGNORE INTO document_agencies (document_number, agency_slug)
+    SELECT f.document_number, f.facet_key {_STAGED_FACET_SQL.format(facet="agency")}
+    """,
+    f"""
+    INSERT IGNORE INTO document_topics (document_number, topic_slug)
+    SELECT f.document_number, f.facet_key {_STAGED_FACET_SQL.format(facet="topic")}
+    """,
+    f"""
+    INSERT IGNORE INTO document_cfr_references (document_number, cfr_title, cfr_part)
+    SELECT f.document_number, f.facet_key, f.facet_value {_STAGED_FACET_SQL.format(facet="cfr")}
+    """,
+]
+
+# The merged (new or changed) documents left in the staging table, as processor rows for the vector index
+SELECT_STAGED_FOR_EMBEDDING_SQL = f"""
+    SELECT seq, document_number, title, publication_date, document_type, abstract
+    FROM {STAGING_TABLE} WHERE seq > %s ORDER BY seq LIMIT %s
+"""
+
+# Escapes of LOAD DATA's default format (tab-separated, backslash-escaped, \N for NULL)
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+
+
+def _tsv_field(value):
+    if value is None:
+        return "\\N"
+    return str(value).translate(_TSV_ESCAPES)
+
+
+def _facet_rows(row):
+    return (
+        [(row[0], "agency", slug, name) for slug, name in row[AGENCIES]]
+        + [(row[0], "topic", slug, name) for slug, name in row[TOPICS]]
+        + [(row[0], "cfr", title, part) for title, part in row[CFR_REFERENCES]]
+    )
+
+
+def write_staging_file(path, tsv_path):
+    """
+    Process-pool worker: normalizes one raw file into LOAD DATA files for the document staging table
+    (`tsv_path`) and the facet staging table (`tsv_path` + ".facets"). Returns a picklable dict with parse statistics.
+    """
+    started = time.perf_counter()
+    result = {"file": Path(path).name, "tsv": tsv_path, "documents": 0, "invalid": 0, "error": None}
+    try:
+        with open(tsv_path, "w", encoding="utf-8", newline="\n") as out, \
+                open(tsv_path + ".facets", "w", encoding="utf-8", newline="\n") as facets_out:
+            for doc in iter_raw_documents(path):
+                if not isinstance(doc, dict) or "document_number" not in doc:
+                    result["invalid"] += 1
+                    continue
+                row = normalize_document(doc)
+                out.write("\t".join(_tsv_field(value) for value in row[:len(STAGING_COLUMNS)]) + "\n")
+                facets_out.writelines(
+                    "\t".join(_tsv_field(value) for value in facet_row) + "\n" for facet_row in _facet_rows(row)
+                )
+                result["documents"] += 1
+    except Exception as e: # Includes json.JSONDecodeError
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["parse_seconds"] = time.perf_counter() - started
+    return result
+
+
+def _parse_for_insert(path, tsv_path):
+    """Process-pool worker for the INSERT method: the normalized rows instead of a file."""
+    started = time.perf_counter()
+    result = {"file": Path(path).name, "tsv": None, "batches": [], "documents": 0, "invalid": 0, "error": None}
+    try:
+        result["batches"] = list(normalized_batches(path, BACKFILL_INSERT_BATCH_SIZE, result))
+    except Exception as e: # Includes json.JSONDecodeError; nothing of an unreadable file is staged
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["parse_seconds"] = time.perf_counter() - started
+    return result
+
+
+async def choose_load_method(cur, method):
+    """'load' if LOAD DATA LOCAL INFILE may be used (asked for, or 'auto' and the server allows it), else 'insert'."""
+    if method != "auto":
+        return method
+    await cur.execute("SHOW VARIABLES LIKE 'local_infile'")
+    row = await cur.fetchone()
+    return "load" if row and str(row[1]).upper() in ("ON", "1") else "insert"
+
+
+async def drop_secondary_indexes(cur):
+    """
+    Drops the db_setup-managed indexes of federal_documents (FULLTEXT included) so merges only maintain
+    the primary and document_number keys. Searches fall back to LIKE until rebuild_indexes() runs.
+    """
+    for table, index_name, _ in INDEX_MIGRATIONS:
+        if table == "federal_documents" and await index_exists(cur, table, index_name):
+            print(f"Dropping index '{index_name}' for the bulk load...")
+            await cur.execute(f"ALTER TABLE {table} DROP INDEX {index_name}")
+
+
+async def rebuild_indexes(cur):
+    started = time.perf_counter()
+    await apply_index_migrations(cur) # Recreates whatever is missing, e.g. after --drop-indexes or a crash
+    await cur.execute("ANALYZE TABLE federal_documents")
+    await cur.fetchall()
+    print(f"Indexes ready after {time.perf_counter() - started:.1f}s.")
+
+
+async def stage_files(cur, files, method, executor):
+    """
+    Parses `files` in the process pool and loads them into the staging table in file (publication date)
+    order, each as soon as it and the files before it are ready.
+    """
+    loop = asyncio.get_running_loop()
+    worker = write_staging_file if method == "load" else _parse_for_insert
+    with tempfile.TemporaryDirectory(prefix="backfill_") as tmp:
+        jobs = [
+            loop.run_in_executor(executor, worker, str(path), os.path.join(tmp, f"{path.name}.tsv"))
+            for path in files
+        ]
+        results = []
+        for job in jobs:
+            parsed = await job
+            PIPELINE_STAGE_SECONDS.observe(parsed["parse_seconds"], stage="parse_file")
+            results.append(parsed)
+            if parsed["error"]:
+                print(f"Error reading file {parsed['file']}: {parsed['error']}. Its date will be retried.")
+                continue
+            with PIPELINE_STAGE_SECONDS.time(stage="backfill_load"):
+                if method == "load":
+                    await cur.execute(LOAD_STAGING_SQL, (parsed["tsv"],))
+                    await cur.execute(LOAD_FACET_STAGING_SQL, (parsed["tsv"] + ".facets",))
+                    os.remove(parsed["tsv"])
+                    os.remove(parsed["tsv"] + ".facets")
+                else:
+                    for rows in parsed["batches"]:
+                        await cur.executemany(INSERT_STAGING_SQL, [row[:len(STAGING_COLUMNS)] for row in rows])
+                        facet_rows = [facet_row for row in rows for facet_row in _facet_rows(row)]
+                        if facet_rows:
+                            await cur.executemany(INSERT_FACET_STAGING_SQL, facet_rows)
+    return results
+
+
+async def embed_staged_documents(cur, batch_size=EMBEDDING_BATCH_SIZE * 8):
+    """Adds the documents the last merge wrote (still in the staging table) to the vector index. Returns the count."""
+    last_seq = 0
+    embedded = 0
+    while True:
+        await cur.execute(SELECT_STAGED_FOR_EMBEDDING_SQL, (last_seq, batch_size))
+        rows = await cur.fetchall()
+        if not rows:
+            return embedded
+        last_seq = rows[-1][0]
+        embedded += await embed_written_rows([row[1:] for row in rows])
+
+
+async def backfill_chunk(cur, start, end, method, executor, download=False, source=RAW_DATA_DIR, embed=True):
+    """
+    Stages and merges the raw files for [start, end], then embeds the merged documents if `embed` and
+    EMBEDDING_MODEL are set. Returns (chunk stats, last date fully ingested or None).
+    """
+    stats = {"staged": 0, "skipped": 0, "merged": 0, "embedded": 0, "files": 0}
+    completed = set()
+    current = start
+    while current <= end:
+        completed.add(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+    if download:
+        _, downloaded = await download_missing_dates(start, end)
+        completed &= downloaded
+
+    files = [
+        path for path in list_raw_files(source)
+        if start.strftime("%Y-%m-%d") <= date_from_raw_filename(path) <= end.strftime("%Y-%m-%d")
+    ]
+    stats["files"] = len(files)
+    await cur.execute(f"TRUNCATE TABLE {STAGING_TABLE}")
+    await cur.execute(f"TRUNCATE TABLE {FACET_STAGING_TABLE}")
+    started = time.perf_counter()
+    results = await stage_files(cur, files, method, executor)
+    stats["staged"] = sum(r["documents"] for r in results if not r["error"])
+    stats["load_seconds"] = time.perf_counter() - started
+    failed = {date_from_raw_filename(r["file"]) for r in results if r["error"]}
+
+    started = time.perf_counter()
+    with PIPELINE_STAGE_SECONDS.time(stage="backfill_merge"):
+        await cur.execute(DELETE_UNCHANGED_SQL)
+        stats["skipped"] = cur.rowcount
+        stats["merged"] = stats["staged"] - stats["skipped"]
+        if stats["merged"]:
+            await cur.execute("START TRANSACTION") # Documents and their raw JSON land together
+            await cur.execute(DELETE_MOVED_RAW_SQL)
+            await cur.execute(MERGE_DOCUMENTS_SQL)
+            await cur.execute(MERGE_RAW_SQL)
+            for statement in MERGE_FACET_STATEMENTS:
+                await cur.execute(statement)
+            await cur.execute("COMMIT")
+    stats["merge_seconds"] = time.perf_counter() - started
+    PIPELINE_ROWS.inc(stats["merged"], stage="backfill", result="written")
+    PIPELINE_ROWS.inc(stats["skipped"], stage="backfill", result="skipped")
+    if embed and EMBEDDING_MODEL and stats["merged"]:
+        stats["embedded"] = await embed_staged_documents(cur)
+
+    for path in files:
+        if date_from_raw_filename(path) not in failed:
+            _move_to_processed(path)
+    return stats, advance_checkpoint(start, end, completed - failed)
+
+
+async def run_backfill(start, end, chunk_days=BACKFILL_CHUNK_DAYS, workers=BACKFILL_WORKERS, method="auto",
+                       download=False, drop_indexes=False, restart=False, source=RAW_DATA_DIR, embed=True,
+                       fetch_texts=True):
+    """
+    Bulk-loads every publication date in [start, end], `chunk_days` at a time: raw files are normalized in a
+    process pool, streamed into a staging table (LOAD DATA LOCAL INFILE, or large multi-row INSERTs),
+    then merged into federal_documents, federal_documents_raw and the facet tables with set-based statements.
+    Each chunk's new or changed documents are embedded into the vector index unless `embed` is off.
+    The daily count rollups are rebuilt for the whole range at the end, and if `fetch_texts` and
+    DOCUMENT_TEXT_ENABLED are set, up to TEXT_FETCH_PER_RUN document bodies of the range are fetched.
+    Resumes after the 'backfill' checkpoint unless `restart`. Holds the pipeline lock, so scheduled
+    incremental runs wait until it finishes.
+    """
+    await setup_database()
+    # One connection holds the pipeline lock and loads; the other writes checkpoints
+    pool = await get_db_pool(maxsize=2, local_infile=True)
+    requested_start = start
+    totals = {"staged": 0, "skipped": 0, "merged": 0, "embedded": 0, "files": 0}
+    started = time.perf_counter()
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                if not await get_lock(cur, PIPELINE_LOCK_NAME):
+                    raise RuntimeError("Another pipeline run holds the pipeline lock; try again when it finishes.")
+                try:
+                    checkpoint = None if restart else await get_checkpoint(pool, BACKFILL_CHECKPOINT)
+                    if checkpoint and checkpoint >= start:
+                        print(f"Resuming after checkpoint '{BACKFILL_CHECKPOINT}' ({checkpoint}).")
+                        start = checkpoint + timedelta(days=1)
+                    if start > end:
+                        print(f"Nothing to backfill: checkpoint is at {checkpoint}.")
+                        return totals
+                    method = await choose_load_method(cur, method)
+                    print(f"Backfilling {start} to {end} in chunks of {chunk_days} day(s) "
+                          f"({method}, {workers} parser process(es))...")
+                    await cur.execute(STAGING_TABLE_DDL)
+                    await cur.execute(FACET_STAGING_TABLE_DDL)
+                    if drop_indexes:
+                        await drop_secondary_indexes(cur)
+
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        chunk_start = start
+                        while chunk_start <= end:
+                            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+                            chunk_started = time.perf_counter()
+                            stats, ingested_through = await backfill_chunk(
+                                cur, chunk_start, chunk_end, method, executor, download, source, embed
+                            )
+                            elapsed = time.perf_counter() - chunk_started
+                            for key in totals:
+                                totals[key] += stats[key]
+                            print(f"{chunk_start} to {chunk_end}: {stats['files']} files, {stats['staged']} staged "
+                                  f"({stats['load_seconds']:.1f}s), {stats['merged']} merged, {stats['skipped']} "
+                                  f"unchanged ({stats['merge_seconds']:.1f}s), {stats['embedded']} embedded, "
+                                  f"{stats['staged'] / elapsed if elapsed else 0:.0f} docs/s")
+                            if ingested_through:
+                                await set_checkpoint(pool, ingested_through, BACKFILL_CHECKPOINT)
+                            if ingested_through != chunk_end:
+                                print(f"Stopping: not every date after {ingested_through or chunk_start - timedelta(days=1)} "
+                                      "was ingested. Re-run the same command to resume.")
+                                break
+                            chunk_start = chunk_end + timedelta(days=1)
+
+                    if totals["embedded"]:
+                        await save_vector_graph()
+                    await cur.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}, {FACET_STAGING_TABLE}")
+                    print("Rebuilding indexes...")
+                    await rebuild_indexes(cur)
+                    # Once over the whole requested range (earlier runs may have stopped before this step)
+                    await rebuild_rollups(cur, requested_start, end)
+                    if fetch_texts and DOCUMENT_TEXT_ENABLED:
+                        # Bodies beyond the cap are fetched by later pipeline runs or `python -m data_pipeline.document_text`
+                        print(f"Fetching document bodies (at most {TEXT_FETCH_PER_RUN or 'all'})...")
+                        await fetch_document_texts(requested_start, end, limit=TEXT_FETCH_PER_RUN or None)
+                finally:
+                    await release_lock(cur, PIPELINE_LOCK_NAME)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+    elapsed = time.perf_counter() - started
+    print(f"\nBackfill done: {totals['staged']} documents from {totals['files']} files, {totals['merged']} merged, "
+          f"{totals['skipped']} unchanged, {totals['embedded']} embedded in {elapsed:.1f}s "
+          f"({totals['staged'] / elapsed if elapsed else 0:.0f} docs/s including index rebuild).")
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load a range of Federal Register publication dates")
+    parser.add_argument("--start", type=date.fromisoformat, default=BACKFILL_EARLIEST_DATE,
+                        help="First publication date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today() - timedelta(days=1),
+                        help="Last publication date (default: yesterday)")
+    parser.add_argument("--download", action="store_true",
+                        help="Download each chunk before loading it (otherwise only existing raw files are loaded)")
+    parser.add_argument("--source", type=Path, default=RAW_DATA_DIR, help="Directory of raw files to load")
+    parser.add_argument("--chunk-days", type=int, default=BACKFILL_CHUNK_DAYS)
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Parser processes")
+    parser.add_argument("--method", choices=("auto", "load", "insert"), default="auto",
+                        help="LOAD DATA LOCAL INFILE or multi-row INSERTs into the staging table")
+    parser.add_argument("--drop-indexes", action="store_true",
+                        help="Drop secondary and FULLTEXT indexes during the load and rebuild them once at the end")
+    parser.add_argument("--restart", action="store_true", help="Ignore the backfill checkpoint")
+    parser.add_argument("--skip-embeddings", action="store_true",
+                        help="Do not embed the loaded documents (run `python -m data_pipeline.vector_index --rebuild` later)")
+    parser.add_argument("--skip-texts", action="store_true",
+                        help="Do not fetch document bodies (later runs or `python -m data_pipeline.document_text` do)")
+    args = parser.parse_args()
+    asyncio.run(run_backfill(
+        args.start, args.end, args.chunk_days, args.workers, args.method,
+        args.download, args.drop_indexes, args.restart, args.source,
+        not args.skip_embeddings, not args.skip_texts,
+    ))
@@ -0,0 +1,64 @@
+import asyncio
+from datetime import date, timedelta
+
+from data_pipeline.db_setup import get_db_pool
+
+# Checkpoint name for the daily incremental ingest
+INGEST_CHECKPOINT = "ingest"
+
+
+async def get_checkpoint(pool, name=INGEST_CHECKPOINT):
+    """Returns the last publication date fully ingested under `name`, or None if never run."""
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT last_publication_date FROM pipeline_checkpoints WHERE name = %s", (name,))
+            row = await cur.fetchone()
+        await conn.commit() # End the read snapshot on non-autocommit pools
+    return row[0] if row else None
+
+
+async def set_checkpoint(pool, last_publication_date, name=INGEST_CHECKPOINT):
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                INSERT INTO pipeline_checkpoints (name, last_publication_date) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE last_publication_date = VALUES(last_publication_date)
+                """,
+                (name, last_publication_date)
+            )
+        await conn.commit()
+    print(f"Checkpoint '{name}' advanced to {last_publication_date}.")
+
+
+def missing_date_range(checkpoint, initial_days, today=None):
+    """
+    Publication dates still to ingest: the day after the checkpoint up to yesterday.
+    Without a checkpoint, starts `initial_days` back. Returns (start, end) or None if up to date.
+    """
+    today = today or date.today()
+    end = today - timedelta(days=1) # Today's issue can still be incomplete
+    start = checkpoint + timedelta(days=1) if checkpoint else today - timedelta(days=initial_days)
+    if start > end:
+        return None
+    return start, end
+
+
+def advance_checkpoint(start, end, completed_dates):
+    """The last date D such that every date in [start, D] completed, or None if `start` itself did not."""
+    last_complete = None
+    current = start
+    while current <= end and current.strftime("%Y-%m-%d") in completed_dates:
+        last_complete = current
+        current += timedelta(days=1)
+    return last_complete
+
+
+if __name__ == "__main__":
+    async def show_checkpoint():
+        pool = await get_db_pool()
+        print(f"Checkpoint '{INGEST_CHECKPOINT}': {await get_checkpoint(pool)}")
+        pool.close()
+        await pool.wait_closed()
+
+    asyncio.run(show_checkpoint())
@@ -1,41 +1,510 @@
 import asyncio
 import aiomysql
 import os
+from contextlib import asynccontextmanager
+from datetime import date
 from dotenv import load_dotenv
+from data_pipeline.payloads import abstract_preview, tool_payload
 
 load_dotenv()
 
-async def get_db_pool():
+async def get_db_pool(maxsize=10, local_infile=False):
     return await aiomysql.create_pool(
         host=os.getenv("MYSQL_HOST"),
         port=int(os.getenv("MYSQL_PORT", 3306)),
         user=os.getenv("MYSQL_USER"),
         password=os.getenv("MYSQL_PASSWORD"),
         db=os.getenv("MYSQL_DB"),
-        autocommit=True
+        maxsize=maxsize,
+        autocommit=True,
+        local_infile=local_infile # The backfill's LOAD DATA LOCAL INFILE
     )
 
-async def setup_database():
+# Chat histories of the API when SESSION_STORE=mysql (agent/session_store.py also ensures it lazily)
+CHAT_SESSIONS_TABLE_DDL = """
+        CREATE TABLE IF NOT EXISTS chat_sessions (
+            session_id VARCHAR(64) PRIMARY KEY,
+            messages MEDIUMTEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_updated_at (updated_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """
+
+# Bump whenever the DDL or a migration list below changes: setup_database() skips all of it
+# while the database records the current version.
+SCHEMA_VERSION = 5
+SCHEMA_LOCK_NAME = "federal_rag_schema"
+SCHEMA_LOCK_TIMEOUT = 600 # Seconds to wait for another worker's migration (index builds can be slow)
+ER_NO_SUCH_TABLE = 1146
+# Held for a whole ingestion run (run_pipeline jobs, backfill, retention) so only one process writes documents at a time
+PIPELINE_LOCK_NAME = "federal_rag_pipeline"
+
+SCHEMA_VERSION_TABLE_DDL = """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            id TINYINT PRIMARY KEY,
+            version INT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """
+
+# federal_documents_raw, which holds most of the bytes, is RANGE-partitioned by publication_date so retention
+# (data_pipeline/retention.py) drops whole partitions. federal_documents itself cannot be partitioned:
+# InnoDB does not support FULLTEXT indexes on partitioned tables.
+PARTITIONED_TABLE = "federal_documents_raw"
+PARTITION_INTERVAL = os.getenv("PARTITION_INTERVAL", "year").lower() # "year" or "month"
+PARTITIONS_AHEAD = int(os.getenv("PARTITIONS_AHEAD", 2)) # Empty intervals kept ready after the current one
+PARTITION_START_DATE = date(1994, 1, 1) # First issue on federalregister.gov; older dates go to p_before
+# Stands in for a missing publication date in federal_documents_raw, whose partitioning column cannot be NULL
+UNDATED_PUBLICATION_DATE = "1000-01-01"
+
+# Tables that live next to federal_documents: (table name, CREATE TABLE IF NOT EXISTS statement)
+AUXILIARY_TABLES = [
+    # High-water marks for incremental ingestion (see data_pipeline/checkpoints.py)
+    ("pipeline_checkpoints", """
+        CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+            name VARCHAR(64) PRIMARY KEY,
+            last_publication_date DATE NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """),
+    ("chat_sessions", CHAT_SESSIONS_TABLE_DDL),
+    # The original API document of each row, kept out of federal_documents so search reads narrow rows.
+    # Partitioned by publication_date (see migrate_raw_partitioning), hence the date in the primary key.
+    ("federal_documents_raw", f"""
+        CREATE TABLE IF NOT EXISTS federal_documents_raw (
+            document_number VARCHAR(255) NOT NULL,
+            publication_date DATE NOT NULL DEFAULT '{UNDATED_PUBLICATION_DATE}',
+            raw_data JSON NOT NULL,
+            PRIMARY KEY (document_number, publication_date)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """),
+    # Agencies named by the API, and which documents each one published (see data_pipeline/facets.py)
+    ("agencies", """
+        CREATE TABLE IF NOT EXISTS agencies (
+            slug VARCHAR(255) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """),
+    ("document_agencies", """
+        CREATE TABLE IF NOT EXISTS document_agencies (
+            document_number VARCHAR(255) NOT NULL,
+            agency_slug VARCHAR(255) NOT NULL,
+            PRIMARY KEY (document_number, agency_slug),
+            INDEX idx_agency_document (agency_slug, document_number)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """),
+    # Topics the API assigns (e.g. 'Air pollution control'), same layout as the agency tables
+    ("topics", """
+        CREATE TABLE IF NOT EXISTS topics (
+            slug VARCHAR(255) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """),
+    ("document_topics", """
+        CREATE TABLE IF NOT EXISTS document_topics (
+            document_number VARCHAR(255) NOT NULL,
+            topic_slug VARCHAR(255) NOT NULL,
+            PRIMARY KEY (document_number, topic_slug),
+            INDEX idx_topic_document (topic_slug, document_number)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """),
+    # CFR parts a document affects ('' part when only the title is cited)
+    ("document_cfr_references", """
+        CREATE TABLE IF NOT EXISTS document_cfr_references (
+            document_number VARCHAR(255) NOT NULL,
+            cfr_title SMALLINT UNSIGNED NOT NULL,
+            cfr_part VARCHAR(32) NOT NULL,
+            PRIMARY KEY (document_number, cfr_title, cfr_part),
+            INDEX idx_cfr_document (cfr_title, cfr_part, document_number)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """),
+    # Documents per publication date and type ('' when the type is unknown), maintained at ingest
+    ("document_counts_daily", """
+        CREATE TABLE IF NOT EXISTS document_counts_daily (
+            publication_date DATE NOT NULL,
+            document_type VARCHAR(255) NOT NULL,
+            document_count INT NOT NULL,
+            PRIMARY KEY (publication_date, document_type),
+            INDEX idx_type_date (document_type, publication_date)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """),
+    # The same per agency; a document with several agencies counts once for each
+    ("agency_document_counts_daily", """
+        CREATE TABLE IF NOT EXISTS agency_document_counts_daily (
+            publication_date DATE NOT NULL,
+            agency_slug VARCHAR(255) NOT NULL,
+            document_type VARCHAR(255) NOT NULL,
+            document_count INT NOT NULL,
+            PRIMARY KEY (publication_date, agency_slug, document_type),
+            INDEX idx_agency_date (agency_slug, publication_date)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """),
+    # Full-text bodies fetched from raw_text_url (see data_pipeline/document_text.py): one status row per
+    # document, content_hash being federal_documents.content_hash of the version whose body is stored
+    ("document_texts", """
+        CREATE TABLE IF NOT EXISTS document_texts (
+            document_number VARCHAR(255) PRIMARY KEY,
+            status ENUM('stored', 'missing', 'failed') NOT NULL,
+            content_hash CHAR(64) NULL,
+            chunk_count INT NOT NULL DEFAULT 0,
+            char_count INT NOT NULL DEFAULT 0,
+            attempts SMALLINT NOT NULL DEFAULT 0,
+            fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """),
+    # The bodies in zlib-compressed chunks, addressed by position so a reader fetches only the ones it needs
+    ("document_text_chunks", """
+        CREATE TABLE IF NOT EXISTS document_text_chunks (
+            document_number VARCHAR(255) NOT NULL,
+            chunk_index INT NOT NULL,
+            char_offset INT NOT NULL,
+            char_count INT NOT NULL,
+            body MEDIUMBLOB NOT NULL,
+            PRIMARY KEY (document_number, chunk_index)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """),
+]
+
+# Columns added to existing tables: (table, column name, ALTER TABLE clause). Applied idempotently.
+COLUMN_MIGRATIONS = [
+    # SHA-256 of the raw document; unchanged documents are skipped on re-ingest
+    ("federal_documents", "content_hash", "ADD COLUMN content_hash CHAR(64) NULL"),
+    # Precomputed at ingest (data_pipeline/payloads.py) so searches skip per-row formatting
+    ("federal_documents", "abstract_preview", "ADD COLUMN abstract_preview VARCHAR(255) NULL AFTER abstract"),
+    ("federal_documents", "tool_payload", "ADD COLUMN tool_payload TEXT NULL AFTER html_url"),
+    # Partitioning column of federal_documents_raw; filled in by migrate_raw_partitioning
+    ("federal_documents_raw", "publication_date",
+     f"ADD COLUMN publication_date DATE NOT NULL DEFAULT '{UNDATED_PUBLICATION_DATE}' AFTER document_number"),
+]
+
+# Rows per statement when migrating existing data
+DATA_MIGRATION_BATCH_SIZE = int(os.getenv("DATA_MIGRATION_BATCH_SIZE", 5000))
+
+# Secondary indexes managed by db_setup: (table, index name, ALTER TABLE clause).
+# Applied idempotently so existing databases are migrated in place.
+INDEX_MIGRATIONS = [
+    # Relevance-ranked keyword search over title and abstract (replaces LIKE '%term%' scans)
+    ("federal_documents", "ft_title_abstract", "ADD FULLTEXT INDEX ft_title_abstract (title, abstract)"),
+    # Type filter + date range / date ordering
+    ("federal_documents", "idx_type_pubdate", "ADD INDEX idx_type_pubdate (document_type, publication_date)"),
+    # Date range filters and ORDER BY publication_date DESC, id DESC
+    ("federal_documents", "idx_pubdate_id", "ADD INDEX idx_pubdate_id (publication_date, id)"),
+]
+
+
+async def column_exists(cur, table, column_name):
+    await cur.execute(
+        """
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        LIMIT 1
+        """,
+        (table, column_name)
+    )
+    return await cur.fetchone() is not None
+
+
+async def apply_column_migrations(cur):
+    for table, column_name, clause in COLUMN_MIGRATIONS:
+        if await column_exists(cur, table, column_name):
+            continue
+        print(f"Adding column '{column_name}' to '{table}'...")
+        await cur.execute(f"ALTER TABLE {table} {clause}")
+
+
+async def _next_id_batch(cur, last_id, where=""):
+    """Upper id of the next batch of at most DATA_MIGRATION_BATCH_SIZE rows after `last_id`, or None when done."""
+    await cur.execute(
+        f"""
+        SELECT MAX(id) FROM (
+            SELECT id FROM federal_documents WHERE id > %s {where} ORDER BY id LIMIT %s
+        ) AS batch
+        """,
+        (last_id, DATA_MIGRATION_BATCH_SIZE)
+    )
+    return (await cur.fetchone())[0]
+
+
+async def migrate_raw_data(cur):
+    """Moves the legacy federal_documents.raw_data column into federal_documents_raw, then drops it."""
+    if not await column_exists(cur, "federal_documents", "raw_data"):
+        return
+    print("Moving raw_data from 'federal_documents' to 'federal_documents_raw'...")
+    last_id = 0
+    while True:
+        batch_end = await _next_id_batch(cur, last_id)
+        if batch_end is None:
+            break
+        # Side-table rows already written by the processor are newer; keep them
+        await cur.execute(
+            f"""
+            INSERT IGNORE INTO federal_documents_raw (document_number, publication_date, raw_data)
+            SELECT document_number, COALESCE(publication_date, '{UNDATED_PUBLICATION_DATE}'), raw_data
+            FROM federal_documents
+            WHERE id > %s AND id <= %s AND raw_data IS NOT NULL
+            """,
+            (last_id, batch_end)
+        )
+        last_id = batch_end
+    await cur.execute("ALTER TABLE federal_documents DROP COLUMN raw_data")
+    print("Column 'raw_data' moved.")
+
+
+async def backfill_tool_payloads(cur):
+    """Computes abstract_preview and tool_payload for rows ingested before those columns existed."""
+    last_id = 0
+    updated = 0
+    while True:
+        batch_end = await _next_id_batch(cur, last_id, "AND tool_payload IS NULL")
+        if batch_end is None:
+            break
+        await cur.execute(
+            """
+            SELECT id, document_number, title, publication_date, document_type, abstract, html_url
+            FROM federal_documents WHERE id > %s AND id <= %s AND tool_payload IS NULL
+            """,
+            (last_id, batch_end)
+        )
+        updates = []
+        for row_id, number, title, publication_date, document_type, abstract, html_url in await cur.fetchall():
+            preview = abstract_preview(abstract)
+            payload = tool_payload(number, title, publication_date, document_type, preview, html_url)
+            updates.append((preview, payload, row_id))
+        await cur.executemany("UPDATE federal_documents SET abstract_preview = %s, tool_payload = %s WHERE id = %s", updates)
+        updated += len(updates)
+        last_id = batch_end
+    if updated:
+        print(f"Backfilled search payloads for {updated} documents.")
+
+
+async def index_exists(cur, table, index_name):
+    await cur.execute(
+        """
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        LIMIT 1
+        """,
+        (table, index_name)
+    )
+    return await cur.fetchone() is not None
+
+
+async def apply_index_migrations(cur):
+    for table, index_name, clause in INDEX_MIGRATIONS:
+        if await index_exists(cur, table, index_name):
+            continue
+        print(f"Creating index '{index_name}' on '{table}' (this can take a while on large tables)...")
+        await cur.execute(f"ALTER TABLE {table} {clause}")
+        print(f"Index '{index_name}' created.")
+
+
+def next_partition_boundary(day):
+    """First day of the PARTITION_INTERVAL after the one containing `day`."""
+    if PARTITION_INTERVAL == "month":
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return date(day.year + 1, 1, 1)
+
+
+def _partition_definitions(first):
+    """
+    Partitions for [first, ...) one interval each, up to PARTITIONS_AHEAD intervals past today's,
+    followed by the catch-all p_future.
+    """
+    horizon = date.today()
+    for _ in range(PARTITIONS_AHEAD):
+        horizon = next_partition_boundary(horizon)
+    definitions = []
+    lower = first
+    while lower <= horizon:
+        upper = next_partition_boundary(lower)
+        name = f"p{lower:%Y%m}" if PARTITION_INTERVAL == "month" else f"p{lower:%Y}"
+        definitions.append(f"PARTITION {name} VALUES LESS THAN ('{upper}')")
+        lower = upper
+    definitions.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+    return definitions
+
+
+async def get_partitions(cur, table=PARTITIONED_TABLE):
+    """[(partition name, exclusive upper bound or None for MAXVALUE)], oldest first; [] if `table` is not partitioned."""
+    await cur.execute(
+        """
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+        """,
+        (table,)
+    )
+    return [
+        (name, None if description == "MAXVALUE" else date.fromisoformat(description.strip("'")))
+        for name, description in await cur.fetchall()
+    ]
+
+
+async def migrate_raw_partitioning(cur):
+    """
+    Converts an unpartitioned federal_documents_raw into the publication_date RANGE layout: copies each
+    document's date over from federal_documents in batches, widens the primary key, then partitions.
+    """
+    if await get_partitions(cur):
+        return
+    print(f"Partitioning '{PARTITIONED_TABLE}' by publication_date ({PARTITION_INTERVAL}ly)...")
+    last_id = 0
+    while True:
+        batch_end = await _next_id_batch(cur, last_id, "AND publication_date IS NOT NULL")
+        if batch_end is None:
+            break
+        await cur.execute(
+            f"""
+            UPDATE {PARTITIONED_TABLE} r JOIN federal_documents d ON d.document_number = r.document_number
+            SET r.publication_date = d.publication_date
+            WHERE d.id > %s AND d.id <= %s AND d.publication_date IS NOT NULL
+            """,
+            (last_id, batch_end)
+        )
+        last_id = batch_end
+    await cur.execute(
+        """
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = 'PRIMARY' AND COLUMN_NAME = 'publication_date'
+        """,
+        (PARTITIONED_TABLE,)
+    )
+    if await cur.fetchone() is None: # Tables created before the date was part of the key
+        await cur.execute(
+            f"ALTER TABLE {PARTITIONED_TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (document_number, publication_date)"
+        )
+    definitions = [f"PARTITION p_before VALUES LESS THAN ('{PARTITION_START_DATE}')"]
+    definitions += _partition_definitions(PARTITION_START_DATE)
+    await cur.execute(
+        f"ALTER TABLE {PARTITIONED_TABLE} PARTITION BY RANGE COLUMNS(publication_date) ({', '.join(definitions)})"
+    )
+    print(f"'{PARTITIONED_TABLE}' partitioned into {len(definitions)} partitions.")
+
+
+async def ensure_partitions(cur):
+    """
+    Splits new intervals off the (normally empty) p_future partition so PARTITIONS_AHEAD intervals after
+    today's always exist. A no-op apart from one information_schema query when they already do.
+    """
+    bounds = [bound for _, bound in await get_partitions(cur) if bound is not None]
+    if not bounds:
+        return 0
+    definitions = _partition_definitions(max(bounds))
+    if len(definitions) == 1: # Only p_future: far enough ahead already
+        return 0
+    await cur.execute(
+        f"ALTER TABLE {PARTITIONED_TABLE} REORGANIZE PARTITION p_future INTO ({', '.join(definitions)})"
+    )
+    print(f"Added {len(definitions) - 1} partition(s) to '{PARTITIONED_TABLE}'.")
+    return len(definitions) - 1
+
+
+async def get_lock(cur, name, timeout=0):
+    """Takes a MySQL named lock for this connection's session. True if acquired within `timeout` seconds."""
+    await cur.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+    return (await cur.fetchone())[0] == 1
+
+
+async def release_lock(cur, name):
+    await cur.execute("SELECT RELEASE_LOCK(%s)", (name,))
+    await cur.fetchone()
+
+
+@asynccontextmanager
+async def pipeline_lock(timeout=0):
+    """
+    Holds PIPELINE_LOCK_NAME on a dedicated connection for the body of the block and yields whether it was
+    acquired, so a cron run, the API's scheduler and manual maintenance never write at the same time.
+    """
+    pool = await get_db_pool()
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                acquired = await get_lock(cur, PIPELINE_LOCK_NAME, timeout)
+                try:
+                    yield acquired
+                finally:
+                    if acquired:
+                        await release_lock(cur, PIPELINE_LOCK_NAME)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+async def get_schema_version(cur):
+    """The schema version recorded by the last complete setup, or None on a database that predates it."""
+    try:
+        await cur.execute("SELECT version FROM schema_version WHERE id = 1")
+    except aiomysql.ProgrammingError as e:
+        if e.args[0] != ER_NO_SUCH_TABLE:
+            raise
+        return None
+    row = await cur.fetchone()
+    return row[0] if row else None
+
+
+async def _apply_schema(cur):
+    await cur.execute("""
+        CREATE TABLE IF NOT EXISTS federal_documents (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            document_number VARCHAR(255) UNIQUE NOT NULL,
+            title TEXT,
+            publication_date DATE,
+            document_type VARCHAR(255),
+            abstract TEXT,
+            abstract_preview VARCHAR(255),
+            html_url VARCHAR(1024),
+            tool_payload TEXT,
+            content_hash CHAR(64),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """)
+    print("Database table 'federal_documents' ensured to exist.")
+    for table, ddl in AUXILIARY_TABLES:
+        await cur.execute(ddl)
+        print(f"Database table '{table}' ensured to exist.")
+    await apply_column_migrations(cur)
+    await migrate_raw_data(cur)
+    await backfill_tool_payloads(cur)
+    await apply_index_migrations(cur)
+    await migrate_raw_partitioning(cur)
+    await ensure_partitions(cur)
+
+
+async def setup_database(force=False):
+    """
+    Brings the schema up to SCHEMA_VERSION. When the database already records that version this is a
+    single SELECT, so scheduled pipeline runs can call it every time. Workers serialize on a named lock.
+    """
     pool = await get_db_pool()
-    async with pool.acquire() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute("""
-                CREATE TABLE IF NOT EXISTS federal_documents (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    document_number VARCHAR(255) UNIQUE NOT NULL,
-                    title TEXT,
-                    publication_date DATE,
-                    document_type VARCHAR(255),
-                    abstract TEXT,
-                    html_url VARCHAR(1024),
-                    raw_data JSON,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
-            print("Database table 'federal_documents' ensured to exist.")
-    pool.close()
-    await pool.wait_closed()
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                if not force and await get_schema_version(cur) == SCHEMA_VERSION:
+                    return
+                if not await get_lock(cur, SCHEMA_LOCK_NAME, SCHEMA_LOCK_TIMEOUT):
+                    raise RuntimeError("Timed out waiting for another process to finish migrating the schema.")
+                try:
+                    # Another worker may have finished the migration while we waited for the lock
+                    if force or await get_schema_version(cur) != SCHEMA_VERSION:
+                        await _apply_schema(cur)
+                        await cur.execute(SCHEMA_VERSION_TABLE_DDL)
+                        await cur.execute(
+                            "INSERT INTO schema_version (id, version) VALUES (1, %s) "
+                            "ON DUPLICATE KEY UPDATE version = VALUES(version)",
+                            (SCHEMA_VERSION,)
+                        )
+                        print(f"Database schema is at version {SCHEMA_VERSION}.")
+                finally:
+                    await release_lock(cur, SCHEMA_LOCK_NAME)
+    finally:
+        pool.close()
+        await pool.wait_closed()
 
 if __name__ == "__main__":
-    asyncio.run(setup_database())   
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Create or migrate the database schema")
+    parser.add_argument("--force", action="store_true", help="Re-run every migration even if the recorded version is current")
+    args = parser.parse_args()
+    asyncio.run(setup_database(force=args.force))
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import html
+import os
+import re
+import time
+import zlib
+from datetime import date
+from urllib.parse import urlsplit, urlunsplit
+import aiohttp
+from dotenv import load_dotenv
+from data_pipeline.db_setup import get_db_pool, pipeline_lock, setup_database
+from data_pipeline.downloader import (
+    DOWNLOAD_BURST, DOWNLOAD_MAX_IN_FLIGHT, DOWNLOAD_RATE_LIMIT, DOWNLOAD_REQUEST_TIMEOUT, TokenBucket, get_with_retry,
+)
+from observability.metrics import PIPELINE_ROWS, PIPELINE_STAGE_SECONDS
+
+load_dotenv()
+
+# Optional stage: fetch each document's raw_text_url body into document_text_chunks (and the get_document_text tool)
+DOCUMENT_TEXT_ENABLED = os.getenv("DOCUMENT_TEXT_ENABLED", "false").lower() in ("1", "true", "yes")
+# Replaces the scheme and host of raw_text_url, so the stage can be pointed at a local stub server
+FEDERAL_REGISTER_TEXT_BASE_URL = os.getenv("FEDERAL_REGISTER_TEXT_BASE_URL")
+TEXT_CHUNK_CHARS = int(os.getenv("TEXT_CHUNK_CHARS", 2000)) # Upper bound; chunks end at a paragraph break if possible
+TEXT_COMPRESSION_LEVEL = 6
+TEXT_FETCH_BATCH_SIZE = int(os.getenv("TEXT_FETCH_BATCH_SIZE", 100)) # Documents fetched, then stored in one transaction
+TEXT_FETCH_MAX_ATTEMPTS = int(os.getenv("TEXT_FETCH_MAX_ATTEMPTS", 3)) # Runs that may retry a failed body
+TEXT_FETCH_PER_RUN = int(os.getenv("TEXT_FETCH_PER_RUN", 2000)) # Bodies per incremental pipeline run (0: no limit)
+TEXT_FETCH_RATE_LIMIT = float(os.getenv("TEXT_FETCH_RATE_LIMIT", DOWNLOAD_RATE_LIMIT)) # Requests per second
+# Rows of a document in these tables are deleted with it (see data_pipeline/retention.py)
+TEXT_TABLES = ("document_text_chunks", "document_texts")
+
+DELETE_TEXT_CHUNKS_SQL = "DELETE FROM document_text_chunks WHERE document_number IN ({placeholders})"
+INSERT_TEXT_CHUNK_SQL = """
+    INSERT INTO document_text_chunks (document_number, chunk_index, char_offset, char_count, body)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+# attempts is assigned first, so it still sees the previous status: consecutive failures count up, anything else resets it
+UPSERT_TEXT_STATUS_SQL = """
+    INSERT INTO document_texts (document_number, status, content_hash, chunk_count, char_count, attempts)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        attempts = IF(VALUES(status) = 'failed', IF(status = 'failed', attempts + 1, 1), 0),
+        status = VALUES(status),
+        content_hash = VALUES(content_hash),
+        chunk_count = VALUES(chunk_count),
+        char_count = VALUES(char_count)
+"""
+
+
+def text_url(raw_text_url):
+    if not FEDERAL_REGISTER_TEXT_BASE_URL:
+        return raw_text_url
+    base = urlsplit(FEDERAL_REGISTER_TEXT_BASE_URL)
+    return urlunsplit(urlsplit(raw_text_url)._replace(scheme=base.scheme, netloc=base.netloc))
+
+
+def extract_text(body):
+    """The plain text of a raw_text_url response: federalregister.gov wraps it in a <pre> of an HTML page."""
+    match = re.search(r"<pre[^>]*>(.*?)</pre>", body, re.DOTALL | re.IGNORECASE)
+    if match:
+        body = html.unescape(re.sub(r"<[^>]+>", "", match.group(1)))
+    return body.replace("\r\n", "\n").strip()
+
+
+def split_text(text, max_chars=TEXT_CHUNK_CHARS):
+    """
+    (char_offset, chunk) pairs of at most `max_chars` that concatenate back to `text`.
+    A chunk ends after the last paragraph break, line break or space in its second half, else mid-word.
+    """
+    chunks = []
+    offset = 0
+    while offset < len(text):
+        end = offset + max_chars
+        if end < len(text):
+            window = text[offset:end]
+            for separator in ("\n\n", "\n", " "):
+                cut = window.rfind(separator)
+                if cut >= max_chars // 2:
+                    end = offset + cut + len(separator)
+                    break
+        chunks.append((offset, text[offset:end]))
+        offset = end
+    return chunks
+
+
+def compress_chunks(text):
+    """(chunk_index, char_offset, char_count, compressed body) rows of document_text_chunks for `text`."""
+    return [
+        (index, offset, len(chunk), zlib.compress(chunk.encode("utf-8"), TEXT_COMPRESSION_LEVEL))
+        for index, (offset, chunk) in enumerate(split_text(text))
+    ]
+
+
+def decompress_chunk(body):
+    return zlib.decompress(body).decode("utf-8")
+
+
+async def pending_documents(cur, start_date=None, end_date=None, after=None, limit=TEXT_FETCH_BATCH_SIZE):
+    """
+    Newest-first keyset page of documents whose body still has to be fetched: never fetched, fetched for
+    an older version of the document, or failed fewer than TEXT_FETCH_MAX_ATTEMPTS times.
+    Rows are (publication_date, id, document_number, content_hash, raw_text_url); `after` is the last row's first two.
+    """
+    conditions = [
+        "d.publication_date IS NOT NULL", # NULLs cannot be seeked past
+        "(t.document_number IS NULL OR NOT (t.content_hash <=> d.content_hash) "
+        "OR (t.status = 'failed' AND t.attempts < %s))",
+    ]
+    params = [TEXT_FETCH_MAX_ATTEMPTS]
+    if start_date:
+        conditions.append("d.publication_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("d.publication_date <= %s")
+        params.append(end_date)
+    if after:
+        # Expanded form of (publication_date, id) < (%s, %s), which MySQL can turn into an index range
+        conditions.append("(d.publication_date < %s OR (d.publication_date = %s AND d.id < %s))")
+        params.extend([after[0], after[0], after[1]])
+    await cur.execute(
+        f"""
+        SELECT d.publication_date, d.id, d.document_number, d.content_hash,
+               JSON_UNQUOTE(JSON_EXTRACT(r.raw_data, '$.raw_text_url'))
+        FROM federal_documents d
+        JOIN federal_documents_raw r ON r.document_number = d.document_number AND r.publication_date = d.publication_date
+        LEFT JOIN document_texts t ON t.document_number = d.document_number
+        WHERE {' AND '.join(conditions)}
+        ORDER BY d.publication_date DESC, d.id DESC LIMIT {int(limit)}
+        """,
+        params
+    )
+    return await cur.fetchall()
+
+
+async def fetch_document_text(session, document_number, raw_text_url, limiter, semaphore):
+    """('stored', chunk rows), ('missing', []) when there is no body (no URL, 404 or 410) or ('failed', [])."""
+    if not raw_text_url or raw_text_url == "null": # JSON_UNQUOTE turns a JSON null into 'null'
+        return "missing", []
+    status, body = await get_with_retry(
+        session, text_url(raw_text_url), limiter, semaphore, f"text of {document_number}",
+        read=lambda response: response.text(errors="replace"), stage="download_text"
+    )
+    if status in (404, 410):
+        return "missing", []
+    if body is None:
+        return "failed", []
+    # zlib releases the GIL, so large bodies are compressed off the event loop while other fetches proceed
+    loop = asyncio.get_running_loop()
+    return "stored", await loop.run_in_executor(None, compress_chunks, extract_text(body))
+
+
+async def store_texts(cur, results):
+    """
+    Replaces the chunks and status of every document in `results`, a list of
+    (document_number, content_hash, status, chunk rows), in one transaction.
+    """
+    placeholders = ", ".join(["%s"] * len(results))
+    chunk_rows = [(number,) + row for number, _, _, chunks in results for row in chunks]
+    status_rows = [
+        (number, status, content_hash, len(chunks), sum(row[2] for row in chunks), 1 if status == "failed" else 0)
+        for number, content_hash, status, chunks in results
+    ]
+    started = time.perf_counter()
+    await cur.execute("START TRANSACTION")
+    await cur.execute(DELETE_TEXT_CHUNKS_SQL.format(placeholders=placeholders), [row[0] for row in results])
+    if chunk_rows:
+        await cur.executemany(INSERT_TEXT_CHUNK_SQL, chunk_rows)
+    await cur.executemany(UPSERT_TEXT_STATUS_SQL, status_rows)
+    await cur.execute("COMMIT")
+    PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - started, stage="store_text_batch")
+
+
+async def fetch_document_texts(start_date=None, end_date=None, limit=None, max_in_flight=None):
+    """
+    Fetches the bodies of pending documents (see pending_documents) in [start_date, end_date], newest first,
+    at most `limit`. Each batch is fetched concurrently under the TEXT_FETCH_RATE_LIMIT token bucket and at
+    most `max_in_flight` requests, then committed, so an interrupted run resumes with the next pending body.
+    Returns {"stored": n, "missing": n, "failed": n, "chunks": n, "bytes": n}.
+    """
+    max_in_flight = max_in_flight or DOWNLOAD_MAX_IN_FLIGHT
+    limiter = TokenBucket(TEXT_FETCH_RATE_LIMIT, DOWNLOAD_BURST)
+    semaphore = asyncio.Semaphore(max_in_flight)
+    stats = {"stored": 0, "missing": 0, "failed": 0, "chunks": 0, "bytes": 0}
+    started = time.perf_counter()
+    after = None
+    handled = 0
+    pool = await get_db_pool()
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                timeout = aiohttp.ClientTimeout(total=DOWNLOAD_REQUEST_TIMEOUT)
+                async with aiohttp.ClientSession(timeout=timeout) as session:
+                    while limit is None or handled < limit:
+                        size = TEXT_FETCH_BATCH_SIZE if limit is None else min(TEXT_FETCH_BATCH_SIZE, limit - handled)
+                        batch = await pending_documents(cur, start_date, end_date, after, size)
+                        if not batch:
+                            break
+                        after = batch[-1][:2]
+                        fetched = await asyncio.gather(*(
+                            fetch_document_text(session, number, url, limiter, semaphore)
+                            for _, _, number, _, url in batch
+                        ))
+                        results = [
+                            (number, content_hash, status, chunks)
+                            for (_, _, number, content_hash, _), (status, chunks) in zip(batch, fetched)
+                        ]
+                        await store_texts(cur, results)
+                        for _, _, status, chunks in results:
+                            stats[status] += 1
+                            stats["chunks"] += len(chunks)
+                            stats["bytes"] += sum(len(row[3]) for row in chunks)
+                            PIPELINE_ROWS.inc(stage="text", result=status)
+                        handled += len(batch)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+    print(f"Fetched document bodies in {time.perf_counter() - started:.1f}s: {stats['stored']} stored "
+          f"({stats['chunks']} chunks, {stats['bytes'] / 1e6:.1f} MB compressed), {stats['missing']} without a body, "
+          f"{stats['failed']} failed (max in flight={max_in_flight}).")
+    return stats
+
+
+if __name__ == "__main__":
+    async def main(args):
+        await setup_database()
+        async with pipeline_lock() as acquired: # The incremental job runs this stage too
+            if not acquired:
+                print("Another pipeline run holds the pipeline lock; try again when it finishes.")
+                return
+            await fetch_document_texts(args.start, args.end, args.limit, args.max_in_flight)
+
+    parser = argparse.ArgumentParser(description="Fetch, chunk and store the full text of ingested documents")
+    parser.add_argument("--start", type=date.fromisoformat, help="First publication date (default: all)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last publication date (default: all)")
+    parser.add_argument("--limit", type=int, help="Fetch at most this many bodies")
+    parser.add_argument("--max-in-flight", type=int, default=DOWNLOAD_MAX_IN_FLIGHT,
+                        help="Concurrent requests (rate limited by TEXT_FETCH_RATE_LIMIT)")
+    asyncio.run(main(parser.parse_args()))
@@ -1,10 +1,13 @@
 import asyncio
 import aiohttp
-import aiofiles
 import json
 import os
+import random
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
+from data_pipeline.raw_store import RawFileWriter, date_from_raw_filename, list_raw_files
+from observability.metrics import DOWNLOAD_REQUESTS, PIPELINE_ROWS, PIPELINE_STAGE_SECONDS
 
 # Create directories if they don't exist
 Path("data/raw").mkdir(parents=True, exist_ok=True)
@@ -13,11 +16,56 @@ Path("data/processed").mkdir(parents=True, exist_ok=True)
 
 RAW_DATA_DIR = Path("data/raw")
 PROCESSED_DATA_DIR = Path("data/processed") # Not used in this script, but good for organization
-FEDERAL_REGISTER_API_URL = "https://www.federalregister.gov/api/v1/documents.json"
+# Overridable so the pipeline can be pointed at a local stub server
+FEDERAL_REGISTER_API_URL = os.getenv("FEDERAL_REGISTER_API_URL", "https://www.federalregister.gov/api/v1/documents.json")
 
 # Keep raw data files for N days (example, configurable via .env)
 RAW_DATA_RETENTION_DAYS = int(os.getenv("RAW_DATA_RETENTION_DAYS", 7))
 
+# Concurrent downloader settings (see download_date_range_concurrent)
+DOWNLOAD_RATE_LIMIT = float(os.getenv("DOWNLOAD_RATE_LIMIT", 5)) # Requests per second
+DOWNLOAD_BURST = int(os.getenv("DOWNLOAD_BURST", 5)) # Token bucket capacity
+DOWNLOAD_MAX_IN_FLIGHT = int(os.getenv("DOWNLOAD_MAX_IN_FLIGHT", 8))
+DOWNLOAD_MAX_RETRIES = int(os.getenv("DOWNLOAD_MAX_RETRIES", 5))
+DOWNLOAD_BACKOFF_BASE = float(os.getenv("DOWNLOAD_BACKOFF_BASE", 0.5)) # Seconds
+DOWNLOAD_BACKOFF_MAX = float(os.getenv("DOWNLOAD_BACKOFF_MAX", 30))
+DOWNLOAD_REQUEST_TIMEOUT = float(os.getenv("DOWNLOAD_REQUEST_TIMEOUT", 60))
+
+REQUEST_FIELDS = [ # Request specific fields to keep payload smaller
+    "document_number", "title", "publication_date", 
+    "type", "abstract", "html_url", "raw_text_url", # raw_text_url might be useful
+    "agencies", "topics", "cfr_references", # Extracted into the facet join tables (data_pipeline/facets.py)
+]
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter shared by every request of a download run."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock: # Waiters are served in FIFO order
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RetryableStatus(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
 
 async def fetch_documents(session, params):
     try:
@@ -44,20 +92,12 @@ async def download_daily_data(days_ago=1, per_page=200):
     
     print(f"Fetching documents for publication date: {date_str}")
 
-    all_documents = []
+    writer = RawFileWriter(RAW_DATA_DIR, date_str) # Appends page by page instead of buffering the day
     page = 1
     
     async with aiohttp.ClientSession() as session:
         while True:
-            params = {
-                "conditions[publication_date][is]": date_str,
-                "per_page": per_page,
-                "page": page,
-                "fields[]": [ # Request specific fields to keep payload smaller
-                    "document_number", "title", "publication_date", 
-                    "type", "abstract", "html_url", "raw_text_url" # raw_text_url might be useful
-                ]
-            }
+            params = page_params(date_str, page, per_page)
             print(f"Fetching page {page} for {date_str}...")
             documents_page = await fetch_documents(session, params)
             
@@ -65,7 +105,7 @@ async def download_daily_data(days_ago=1, per_page=200):
                 print(f"No more documents found for {date_str} on page {page} or error occurred.")
                 break
             
-            all_documents.extend(documents_page)
+            await writer.write_page(documents_page)
             
             # The API doesn't clearly state total pages, so we fetch until an empty page is returned.
             # Or, if using the `count` and `total_pages` from the response metadata (if reliable).
@@ -76,19 +116,190 @@ async def download_daily_data(days_ago=1, per_page=200):
             page += 1
             await asyncio.sleep(0.5) # Be respectful to the API
 
-    if all_documents:
-        filename = RAW_DATA_DIR / f"federal_register_{date_str}.json"
-        async with aiofiles.open(filename, "w") as f:
-            await f.write(json.dumps(all_documents, indent=2))
-        print(f"Successfully downloaded {len(all_documents)} documents for {date_str} to {filename}")
-        return str(filename)
+    return await commit_raw_file(writer, date_str)
+
+
+def page_params(date_str, page, per_page):
+    return {
+        "conditions[publication_date][is]": date_str,
+        "per_page": per_page,
+        "page": page,
+        "fields[]": REQUEST_FIELDS
+    }
+
+
+async def commit_raw_file(writer, date_str):
+    filename = await writer.commit()
+    if filename:
+        print(f"Successfully downloaded {writer.count} documents for {date_str} to {filename}")
+        return filename
     else:
         print(f"No documents found or downloaded for {date_str}.")
         return None
 
 
-async def download_recent_data(num_days=7):
+def _backoff_delay(attempt, retry_after=None):
+    """Exponential backoff with full jitter; honours a numeric Retry-After header when present."""
+    delay = random.uniform(0, min(DOWNLOAD_BACKOFF_MAX, DOWNLOAD_BACKOFF_BASE * (2 ** attempt)))
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass # HTTP-date form; stick with the computed delay
+    return delay
+
+
+async def get_with_retry(session, url, limiter, semaphore, label, params=None, read=None, stage="download_page"):
+    """
+    GETs `url` through the shared rate limiter and in-flight cap, retrying 429/5xx responses and network errors.
+    Returns (HTTP status, `await read(response)` or None). Other 4xx statuses are returned without a body
+    and without retrying; the status is None when every attempt (or reading the body) failed.
+    `label` names the request in log lines.
+    """
+    for attempt in range(DOWNLOAD_MAX_RETRIES + 1):
+        retry_after = None
+        async with semaphore:
+            await limiter.acquire()
+            started = time.perf_counter()
+            try:
+                async with session.get(url, params=params) as response:
+                    DOWNLOAD_REQUESTS.inc(status=response.status)
+                    PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+                    if response.status == 429 or response.status >= 500:
+                        raise RetryableStatus(response.status, response.headers.get("Retry-After"))
+                    if response.status >= 400:
+                        return response.status, None # Will not get better by retrying
+                    return response.status, await read(response) if read else None
+            except RetryableStatus as e:
+                error, retry_after = e, e.retry_after
+            except aiohttp.ClientResponseError as e: # e.g. a body of an unexpected content type
+                print(f"Error reading {label}: {e}")
+                return None, None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                DOWNLOAD_REQUESTS.inc(status="network_error")
+                error = e
+
+        if attempt == DOWNLOAD_MAX_RETRIES:
+            break
+        delay = _backoff_delay(attempt, retry_after)
+        print(f"Retrying {label} in {delay:.1f}s after error: {error!r}")
+        await asyncio.sleep(delay) # Sleep outside the semaphore so other requests can proceed
+
+    print(f"Giving up on {label} after {DOWNLOAD_MAX_RETRIES + 1} attempts: {error!r}")
+    return None, None
+
+
+async def fetch_page_with_retry(session, params, limiter, semaphore):
+    """
+    Fetches one page of the documents API with get_with_retry.
+    Returns the decoded payload, or None on failure.
+    """
+    label = f"page {params['page']} for {params['conditions[publication_date][is]']}"
+    try:
+        status, payload = await get_with_retry(
+            session, FEDERAL_REGISTER_API_URL, limiter, semaphore, label, params=params,
+            read=lambda response: response.json()
+        )
+    except json.JSONDecodeError as e:
+        print(f"Error decoding JSON with params {params}: {e}")
+        return None
+    if status is not None and status >= 400:
+        print(f"Error fetching data with params {params}: HTTP {status}")
+    return payload
+
+
+async def download_day_concurrent(session, date_str, limiter, semaphore, per_page=200):
+    """
+    Downloads one publication date. Page 1 tells us `total_pages` and `count`,
+    so the remaining pages are scheduled at once instead of probing until a short page.
+    Returns (raw file path or None if the day is empty, whether the day was downloaded completely).
+    """
+    first_page = await fetch_page_with_retry(session, page_params(date_str, 1, per_page), limiter, semaphore)
+    if first_page is None:
+        print(f"Failed to download page 1 for {date_str}.")
+        return None, False
+
+    total_pages = first_page.get("total_pages") or 1
+    expected_count = first_page.get("count")
+
+    # Pages are appended to disk as they arrive (in any order), so memory stays bounded by the pages in flight
+    writer = RawFileWriter(RAW_DATA_DIR, date_str)
+    await writer.write_page(first_page.get("results", []))
+
+    if total_pages > 1:
+        tasks = [
+            asyncio.ensure_future(fetch_page_with_retry(session, page_params(date_str, page, per_page), limiter, semaphore))
+            for page in range(2, total_pages + 1)
+        ]
+        for next_page in asyncio.as_completed(tasks):
+            page = await next_page
+            if page is None:
+                # Don't write a partial day; a rerun will fetch it again
+                for task in tasks:
+                    task.cancel()
+                await writer.discard()
+                print(f"Failed to download all {total_pages} pages for {date_str}. Skipping this date.")
+                return None, False
+            await writer.write_page(page.get("results", []))
+
+    if expected_count is not None and writer.count != expected_count:
+        print(f"Warning: API reported {expected_count} documents for {date_str} but {writer.count} were fetched.")
+    PIPELINE_ROWS.inc(writer.count, stage="download", result="fetched")
+    return await commit_raw_file(writer, date_str), True
+
+
+async def _download_days_concurrent(start_date, end_date, per_page, max_in_flight=None):
+    """Returns {date_str: (raw file path or None, complete)} for every date in [start_date, end_date]."""
+    max_in_flight = max_in_flight or DOWNLOAD_MAX_IN_FLIGHT
+    dates = []
+    current = start_date
+    while current <= end_date:
+        dates.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+
+    print(f"Downloading {len(dates)} day(s) concurrently "
+          f"(rate={DOWNLOAD_RATE_LIMIT}/s, max in flight={max_in_flight})...")
+    limiter = TokenBucket(DOWNLOAD_RATE_LIMIT, DOWNLOAD_BURST)
+    semaphore = asyncio.Semaphore(max_in_flight)
+    started = time.perf_counter()
+
+    timeout = aiohttp.ClientTimeout(total=DOWNLOAD_REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        results = await asyncio.gather(*(
+            download_day_concurrent(session, date_str, limiter, semaphore, per_page) for date_str in dates
+        ))
+
+    downloaded = sum(1 for path, _ in results if path)
+    print(f"Downloaded {downloaded} file(s) for {len(dates)} day(s) in {time.perf_counter() - started:.1f}s.")
+    return dict(zip(dates, results))
+
+
+async def download_date_range_concurrent(start_date, end_date, per_page=200):
+    """
+    Downloads every publication date in [start_date, end_date] concurrently over one shared session.
+    Request rate, in-flight requests and retries are bounded by the DOWNLOAD_* settings.
+    """
+    results = await _download_days_concurrent(start_date, end_date, per_page)
+    return [path for path, _ in results.values() if path]
+
+
+async def download_missing_dates(start_date, end_date, per_page=200, max_in_flight=None):
+    """
+    Incremental variant of download_date_range_concurrent.
+    Returns (downloaded file paths, set of date strings that were downloaded completely, including empty days).
+    """
+    results = await _download_days_concurrent(start_date, end_date, per_page, max_in_flight)
+    downloaded_files = [path for path, _ in results.values() if path]
+    completed_dates = {date_str for date_str, (_, complete) in results.items() if complete}
+    return downloaded_files, completed_dates
+
+
+async def download_recent_data(num_days=7, concurrent=False):
     """Downloads data for the past num_days."""
+    if concurrent:
+        today = datetime.now()
+        return await download_date_range_concurrent(today - timedelta(days=num_days), today - timedelta(days=1))
+
     downloaded_files = []
     for i in range(1, num_days + 1): # Start from 1 day ago up to num_days ago
         print(f"\n--- Downloading data for {i} day(s) ago ---")
@@ -102,10 +313,10 @@ async def download_recent_data(num_days=7):
 def cleanup_old_raw_data():
     """Removes raw data files older than RAW_DATA_RETENTION_DAYS."""
     now = datetime.now()
-    for filename in RAW_DATA_DIR.glob("*.json"):
+    for filename in list_raw_files(RAW_DATA_DIR):
         try:
-            # Assuming filename format like federal_register_YYYY-MM-DD.json
-            date_str = filename.stem.split("_")[-1]
+            # Assuming filename format like federal_register_YYYY-MM-DD.ndjson[.gz|.zst] or legacy .json
+            date_str = date_from_raw_filename(filename)
             file_date = datetime.strptime(date_str, "%Y-%m-%d")
             if (now - file_date).days > RAW_DATA_RETENTION_DAYS:
                 print(f"Cleaning up old raw data file: {filename}")
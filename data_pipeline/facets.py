@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import time
+from data_pipeline.db_setup import get_db_pool, setup_database
+from data_pipeline.payloads import document_facets
+
+# Documents per batch when re-deriving the facet tables from the stored raw JSON
+FACET_REBUILD_BATCH_SIZE = 2000
+
+UPSERT_AGENCY_SQL = "INSERT INTO agencies (slug, name) VALUES (%s, %s) ON DUPLICATE KEY UPDATE name = VALUES(name)"
+UPSERT_TOPIC_SQL = "INSERT INTO topics (slug, name) VALUES (%s, %s) ON DUPLICATE KEY UPDATE name = VALUES(name)"
+INSERT_DOCUMENT_AGENCY_SQL = "INSERT IGNORE INTO document_agencies (document_number, agency_slug) VALUES (%s, %s)"
+INSERT_DOCUMENT_TOPIC_SQL = "INSERT IGNORE INTO document_topics (document_number, topic_slug) VALUES (%s, %s)"
+INSERT_DOCUMENT_CFR_SQL = (
+    "INSERT IGNORE INTO document_cfr_references (document_number, cfr_title, cfr_part) VALUES (%s, %s, %s)"
+)
+# Join tables whose rows of a document are replaced whenever it is written
+FACET_LINK_TABLES = ("document_agencies", "document_topics", "document_cfr_references")
+
+
+async def write_document_facets(cur, documents):
+    """
+    Replaces the agency, topic and CFR reference links of `documents`, a list of
+    (document_number, agencies, topics, cfr_references) tuples (see payloads.document_facets).
+    Runs in the caller's transaction.
+    """
+    if not documents:
+        return
+    placeholders = ", ".join(["%s"] * len(documents))
+    document_numbers = [document[0] for document in documents]
+    for table in FACET_LINK_TABLES:
+        await cur.execute(f"DELETE FROM {table} WHERE document_number IN ({placeholders})", document_numbers)
+
+    agencies = {slug: name for _, entries, _, _ in documents for slug, name in entries}
+    if agencies:
+        await cur.executemany(UPSERT_AGENCY_SQL, sorted(agencies.items()))
+    topics = {slug: name for _, _, entries, _ in documents for slug, name in entries}
+    if topics:
+        await cur.executemany(UPSERT_TOPIC_SQL, sorted(topics.items()))
+
+    agency_links = [(number, slug) for number, entries, _, _ in documents for slug, _ in entries]
+    if agency_links:
+        await cur.executemany(INSERT_DOCUMENT_AGENCY_SQL, agency_links)
+    topic_links = [(number, slug) for number, _, entries, _ in documents for slug, _ in entries]
+    if topic_links:
+        await cur.executemany(INSERT_DOCUMENT_TOPIC_SQL, topic_links)
+    cfr_links = [(number, title, part) for number, _, _, entries in documents for title, part in entries]
+    if cfr_links:
+        await cur.executemany(INSERT_DOCUMENT_CFR_SQL, cfr_links)
+
+
+async def rebuild_document_facets(cur):
+    """Re-derives the facet tables from federal_documents_raw, e.g. for documents ingested before they existed."""
+    last_number = ""
+    written = 0
+    while True:
+        await cur.execute(
+            """
+            SELECT document_number, raw_data FROM federal_documents_raw
+            WHERE document_number > %s ORDER BY document_number LIMIT %s
+            """,
+            (last_number, FACET_REBUILD_BATCH_SIZE)
+        )
+        fetched = await cur.fetchall()
+        if not fetched:
+            break
+        await write_document_facets(cur, [
+            (document_number,) + document_facets(json.loads(raw_data)) for document_number, raw_data in fetched
+        ])
+        written += len(fetched)
+        last_number = fetched[-1][0]
+    print(f"Re-derived the agencies, topics and CFR references of {written} documents.")
+    return written
+
+
+if __name__ == "__main__":
+    async def main():
+        await setup_database()
+        pool = await get_db_pool()
+        try:
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    started = time.perf_counter()
+                    await rebuild_document_facets(cur)
+                    print(f"Done in {time.perf_counter() - started:.1f}s.")
+        finally:
+            pool.close()
+            await pool.wait_closed()
+
+    argparse.ArgumentParser(
+        description="Re-derive the agency, topic and CFR reference tables from the stored raw JSON"
+    ).parse_args()
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+import json
+import re
+
+# Characters of the abstract shown to the LLM in search results
+ABSTRACT_PREVIEW_CHARS = 200
+
+
+def abstract_preview(abstract):
+    if abstract and len(abstract) > ABSTRACT_PREVIEW_CHARS:
+        return abstract[:ABSTRACT_PREVIEW_CHARS] + "..."
+    return abstract
+
+
+def tool_payload(document_number, title, publication_date, document_type, preview, html_url):
+    """
+    The compact JSON object the agent's search tools return for one document.
+    Computed once at ingest and stored in federal_documents.tool_payload, so searches only concatenate it.
+    """
+    return json.dumps({
+        "document_number": document_number,
+        "title": title,
+        "publication_date": str(publication_date) if publication_date is not None else None,
+        "type": document_type,
+        "abstract_preview": preview,
+        "url": html_url,
+    }, separators=(",", ":"))
+
+
+def _slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def agency_entries(agencies):
+    """
+    (slug, name) pairs from the API's `agencies` list, deduplicated and in order.
+    Agencies the API could not resolve only carry a raw_name; their slug is derived from it.
+    """
+    entries = {}
+    for agency in agencies or []:
+        if not isinstance(agency, dict):
+            continue
+        name = agency.get("name") or agency.get("raw_name")
+        slug = agency.get("slug") or (_slugify(name) if name else None)
+        if slug and slug not in entries:
+            entries[slug] = (name or slug)[:255]
+    return tuple(entries.items())
+
+
+def topic_entries(topics):
+    """(slug, name) pairs from the API's `topics` list of names, deduplicated and in order."""
+    entries = {}
+    for topic in topics or []:
+        if not isinstance(topic, str) or not topic.strip():
+            continue
+        name = " ".join(topic.split())
+        entries.setdefault(_slugify(name), name[:255])
+    entries.pop("", None)
+    return tuple(entries.items())
+
+
+def cfr_reference_entries(cfr_references):
+    """(title, part) pairs from the API's `cfr_references`; the part is '' when only a title is cited."""
+    entries = []
+    for reference in cfr_references or []:
+        if not isinstance(reference, dict):
+            continue
+        try:
+            title = int(reference.get("title"))
+        except (TypeError, ValueError):
+            continue
+        entry = (title, str(reference.get("part") or "")[:32])
+        if entry not in entries:
+            entries.append(entry)
+    return tuple(entries)
+
+
+def document_facets(doc):
+    """A raw API document's agencies, topics and CFR references, as stored in the facet join tables."""
+    return (
+        agency_entries(doc.get("agencies")),
+        topic_entries(doc.get("topics")),
+        cfr_reference_entries(doc.get("cfr_references")),
+    )
@@ -1,97 +1,354 @@
 import asyncio
 import aiomysql
-import aiofiles
+import hashlib
 import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
 from pathlib import Path
+from queue import Empty
 from dotenv import load_dotenv
+from data_pipeline.db_setup import UNDATED_PUBLICATION_DATE
+from data_pipeline.facets import write_document_facets
+from data_pipeline.payloads import abstract_preview, document_facets, tool_payload
+from data_pipeline.raw_store import iter_raw_batches, list_raw_files
+from data_pipeline.rollups import refresh_rollups
+from data_pipeline.vector_index import EMBEDDING_MODEL, index_rows, get_vector_index
+from observability.metrics import PIPELINE_ROWS, PIPELINE_STAGE_SECONDS
 
 load_dotenv()
 
 RAW_DATA_DIR = Path("data/raw")
 PROCESSED_DATA_DIR = Path("data/processed") # To move files after processing
 
-async def get_db_pool():
+async def get_db_pool(maxsize=10):
     return await aiomysql.create_pool(
         host=os.getenv("MYSQL_HOST"),
         port=int(os.getenv("MYSQL_PORT", 3306)),
         user=os.getenv("MYSQL_USER"),
         password=os.getenv("MYSQL_PASSWORD"),
         db=os.getenv("MYSQL_DB"),
+        maxsize=maxsize,
         autocommit=False # We'll manage transactions
     )
 
-async def process_file(filepath: Path, pool):
-    print(f"Processing file: {filepath.name}")
+# Rows per multi-row upsert statement (and per transaction)
+PROCESSOR_BATCH_SIZE = int(os.getenv("PROCESSOR_BATCH_SIZE", 500))
+# Parallel mode (more than 1 worker): files are parsed/normalized in a process pool
+# and upserted concurrently over PROCESSOR_DB_CONCURRENCY pooled connections
+PROCESSOR_WORKERS = int(os.getenv("PROCESSOR_WORKERS", 1))
+PROCESSOR_DB_CONCURRENCY = int(os.getenv("PROCESSOR_DB_CONCURRENCY", 4))
+# Parsed batches a worker may hand over ahead of the upserts of its file; bounds the memory of each file in flight
+PROCESSOR_BATCHES_AHEAD = int(os.getenv("PROCESSOR_BATCHES_AHEAD", 4))
+
+# Callbacks invoked with the set of publication dates (YYYY-MM-DD) whose documents were just committed.
+# The agent's search cache registers one to drop results that may now be stale.
+COMMIT_LISTENERS = []
+
+
+def add_commit_listener(callback):
+    COMMIT_LISTENERS.append(callback)
+
+
+def _notify_commit(rows, moved=()):
+    publication_dates = {str(row[2]) if row[2] is not None else None for row in rows}
+    notify_committed_dates(publication_dates | {str(old) if old is not None else None for _, old in moved})
+
+
+def notify_committed_dates(publication_dates):
+    """Tells the commit listeners that documents of `publication_dates` were written or deleted."""
+    if not COMMIT_LISTENERS or not publication_dates:
+        return
+    for callback in COMMIT_LISTENERS:
+        try:
+            callback(publication_dates)
+        except Exception as e:
+            print(f"Commit listener {callback} failed: {e}")
+
+
+# aiomysql's executemany() rewrites this into one multi-row INSERT ... VALUES (...), (...) statement
+UPSERT_DOCUMENT_SQL = """
+    INSERT INTO federal_documents (
+        document_number, title, publication_date, document_type, 
+        abstract, html_url, abstract_preview, tool_payload, content_hash
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        title = VALUES(title),
+        publication_date = VALUES(publication_date),
+        document_type = VALUES(document_type),
+        abstract = VALUES(abstract),
+        html_url = VALUES(html_url),
+        abstract_preview = VALUES(abstract_preview),
+        tool_payload = VALUES(tool_payload),
+        content_hash = VALUES(content_hash),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# The original document goes to a side table so federal_documents rows stay narrow
+UPSERT_RAW_SQL = """
+    INSERT INTO federal_documents_raw (document_number, publication_date, raw_data) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE raw_data = VALUES(raw_data)
+"""
+
+# The raw copy of a document whose publication date changed lives in another partition; drop it
+DELETE_MOVED_RAW_SQL = "DELETE FROM federal_documents_raw WHERE document_number = %s AND publication_date = %s"
+
+# Positions in a normalized row: the first CONTENT_HASH + 1 values are UPSERT_DOCUMENT_SQL's parameters
+CONTENT_HASH = 8
+RAW_JSON = 9
+# The document's facets (see payloads.document_facets): agency and topic (slug, name) pairs, CFR (title, part) pairs
+AGENCIES = 10
+TOPICS = 11
+CFR_REFERENCES = 12
+
+
+def document_values(row):
+    return row[:RAW_JSON]
+
+
+def raw_values(row):
+    return (row[0], row[2] or UNDATED_PUBLICATION_DATE, row[RAW_JSON])
+
+
+def facet_values(row):
+    return (row[0], row[AGENCIES], row[TOPICS], row[CFR_REFERENCES])
+
+
+async def write_derived_rows(cur, rows, moved=()):
+    """
+    Facet links and daily count rollups for freshly upserted rows, in the same transaction.
+    `moved` lists (document_number, previous publication date) of rows whose date changed.
+    """
+    if moved:
+        await cur.executemany(DELETE_MOVED_RAW_SQL, [(number, old or UNDATED_PUBLICATION_DATE) for number, old in moved])
+    await write_document_facets(cur, [facet_values(row) for row in rows])
+    await refresh_rollups(cur, {row[2] for row in rows} | {old for _, old in moved})
+
+
+def normalize_document(doc):
+    """
+    Turns a raw API document into a row: UPSERT_DOCUMENT_SQL values, then the raw JSON for UPSERT_RAW_SQL
+    and the document's facets.
+    """
+    # Ensure abstract is a string, can be None or missing
+    abstract_text = doc.get("abstract")
+    if isinstance(abstract_text, dict) and "abstract" in abstract_text: # Sometimes it's nested
+        abstract_text = abstract_text.get("abstract")
+    elif not isinstance(abstract_text, str) and abstract_text is not None:
+        abstract_text = str(abstract_text) # Fallback if it's some other type
+
+    raw_json = json.dumps(doc, separators=(",", ":"), sort_keys=True) # Store the whole original doc as compact JSON
+    preview = abstract_preview(abstract_text)
+    return (
+        doc.get("document_number"),
+        doc.get("title"),
+        doc.get("publication_date"), # Assumes YYYY-MM-DD format
+        doc.get("type"),
+        abstract_text,
+        doc.get("html_url"),
+        preview,
+        tool_payload(
+            doc.get("document_number"), doc.get("title"), doc.get("publication_date"),
+            doc.get("type"), preview, doc.get("html_url")
+        ),
+        hashlib.sha256(raw_json.encode("utf-8")).hexdigest(), # Stable across runs thanks to sort_keys
+        raw_json,
+        *document_facets(doc),
+    )
+
+
+async def _filter_unchanged(cur, rows):
+    """
+    Drops rows whose stored content_hash matches, i.e. documents that have not changed since the last ingest.
+    Returns (changed rows, [(document_number, previous publication date)] of those whose date changed).
+    """
+    placeholders = ", ".join(["%s"] * len(rows))
+    await cur.execute(
+        f"""
+        SELECT document_number, content_hash, publication_date FROM federal_documents
+        WHERE document_number IN ({placeholders})
+        """,
+        [row[0] for row in rows]
+    )
+    stored = {number: (content_hash, publication_date) for number, content_hash, publication_date in await cur.fetchall()}
+    changed = [row for row in rows if stored.get(row[0], (None, None))[0] != row[CONTENT_HASH]]
+    moved = [
+        (row[0], stored[row[0]][1]) for row in changed
+        if row[0] in stored and str(stored[row[0]][1] or "") != str(row[2] or "")
+    ]
+    return changed, moved
+
+
+async def _upsert_rows_individually(conn, cur, rows, moved=()):
+    """
+    Fallback for a failed batch: each document, with its raw copy and facet links, is written under its own
+    savepoint so a bad document only loses itself; the rollups of the batch's dates are refreshed last.
+    Returns (rows written, number of rows that failed). If the transaction cannot be saved (e.g. the server
+    rolled it back on a deadlock, or the rollups fail) nothing is committed and every row counts as failed.
+    """
+    previous_dates = dict(moved)
+    written_rows = []
+    for row in rows:
+        await cur.execute("SAVEPOINT document_row")
+        try:
+            await cur.execute(UPSERT_DOCUMENT_SQL, document_values(row))
+            await cur.execute(UPSERT_RAW_SQL, raw_values(row))
+            if row[0] in previous_dates:
+                await cur.execute(DELETE_MOVED_RAW_SQL, (row[0], previous_dates[row[0]] or UNDATED_PUBLICATION_DATE))
+            await write_document_facets(cur, [facet_values(row)])
+            written_rows.append(row)
+        except Exception as e:
+            print(f"Error writing document {row[0]}: {e}")
+            try:
+                await cur.execute("ROLLBACK TO SAVEPOINT document_row")
+            except aiomysql.MySQLError:
+                await conn.rollback() # The savepoint went with the whole transaction
+                return [], len(rows)
+    moved = [(row[0], previous_dates[row[0]]) for row in written_rows if row[0] in previous_dates]
     try:
-        async with aiofiles.open(filepath, "r") as f:
-            content = await f.read()
-            documents = json.loads(content)
-    except json.JSONDecodeError:
-        print(f"Error decoding JSON from {filepath.name}. Skipping.")
+        await refresh_rollups(cur, {row[2] for row in written_rows} | {old for _, old in moved})
+        await conn.commit()
+    except aiomysql.MySQLError as e:
+        print(f"Commit error after row-by-row upsert: {e}")
+        await conn.rollback()
+        return [], len(rows)
+    _notify_commit(written_rows, moved)
+    return written_rows, len(rows) - len(written_rows)
+
+
+async def upsert_rows(conn, rows, batch_size=None, skip_unchanged=True, written_rows=None):
+    """
+    Upserts normalized rows in chunks of `batch_size`, one multi-row statement and one commit per chunk.
+    With skip_unchanged, documents whose content hash is already stored are not rewritten.
+    Committed rows are appended to the `written_rows` list if one is given.
+    Returns (rows written, rows skipped as unchanged, rows that could not be written).
+    """
+    batch_size = batch_size or PROCESSOR_BATCH_SIZE
+    written = 0
+    skipped = 0
+    failed = 0
+    async with conn.cursor() as cur:
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            moved = []
+            if skip_unchanged:
+                changed, moved = await _filter_unchanged(cur, chunk)
+                skipped += len(chunk) - len(changed)
+                chunk = changed
+                if not chunk:
+                    continue
+            started = time.perf_counter()
+            try:
+                await cur.executemany(UPSERT_DOCUMENT_SQL, [document_values(row) for row in chunk])
+                await cur.executemany(UPSERT_RAW_SQL, [raw_values(row) for row in chunk])
+                await write_derived_rows(cur, chunk, moved)
+                await conn.commit()
+            except Exception as e:
+                await conn.rollback()
+                print(f"Batch upsert of {len(chunk)} rows failed ({e}). Retrying row by row.")
+                chunk, chunk_failed = await _upsert_rows_individually(conn, cur, chunk, moved)
+                failed += chunk_failed
+            else:
+                _notify_commit(chunk, moved)
+            PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - started, stage="upsert_batch")
+            written += len(chunk)
+            if written_rows is not None:
+                written_rows.extend(chunk)
+    PIPELINE_ROWS.inc(written, stage="upsert", result="written")
+    PIPELINE_ROWS.inc(skipped, stage="upsert", result="skipped")
+    PIPELINE_ROWS.inc(failed, stage="upsert", result="failed")
+    return written, skipped, failed
+
+
+async def embed_written_rows(rows):
+    """Adds new or changed documents to the vector index. Embedding failures do not fail ingestion."""
+    if not EMBEDDING_MODEL or not rows:
         return 0
+    try:
+        with PIPELINE_STAGE_SECONDS.time(stage="embed"):
+            return await index_rows(rows)
     except Exception as e:
-        print(f"Error reading file {filepath.name}: {e}. Skipping.")
+        print(f"Error embedding {len(rows)} documents: {e}. "
+              f"Run `python -m data_pipeline.vector_index --rebuild` to backfill the index.")
         return 0
 
-    if not isinstance(documents, list):
-        print(f"Expected a list of documents in {filepath.name}, got {type(documents)}. Skipping.")
-        return 0
 
+async def save_vector_graph():
+    """Extends the on-disk HNSW graph with the rows embedded in this run (CPU-bound, so off the event loop)."""
+    if not EMBEDDING_MODEL:
+        return
+    loop = asyncio.get_running_loop()
+    added = await loop.run_in_executor(None, get_vector_index().save_graph)
+    if added:
+        print(f"Added {added} vectors to the HNSW graph.")
+
+
+def _next_rows(batches, filename):
+    """Decodes and normalizes the next batch of a raw file; None at the end. CPU-bound, so run it in an executor."""
+    documents = next(batches, None)
+    if documents is None:
+        return None
+    rows = []
+    for doc in documents:
+        if not isinstance(doc, dict) or "document_number" not in doc:
+            print(f"Skipping invalid document structure in {filename}: {str(doc)[:100]}")
+            continue
+        rows.append(normalize_document(doc))
+    return rows
+
+
+async def process_file(filepath: Path, pool, batch_size=None):
+    """
+    Upserts the documents of one raw file. Returns the number of documents written, or None if the file
+    is unreadable or some of its documents could not be written; the file then stays put to be retried.
+    """
+    print(f"Processing file: {filepath.name}")
+    loop = asyncio.get_running_loop()
+    # Read incrementally: only one batch of documents is held in memory at a time
+    batches = iter_raw_batches(filepath, batch_size or PROCESSOR_BATCH_SIZE)
     processed_count = 0
-    async with pool.acquire() as conn:
-        async with conn.cursor() as cur:
-            for doc in documents:
-                if not isinstance(doc, dict) or "document_number" not in doc:
-                    print(f"Skipping invalid document structure in {filepath.name}: {str(doc)[:100]}")
-                    continue
-                
-                # Ensure abstract is a string, can be None or missing
-                abstract_text = doc.get("abstract")
-                if isinstance(abstract_text, dict) and "abstract" in abstract_text: # Sometimes it's nested
-                    abstract_text = abstract_text.get("abstract")
-                elif not isinstance(abstract_text, str) and abstract_text is not None:
-                    abstract_text = str(abstract_text) # Fallback if it's some other type
+    skipped_count = 0
+    failed_count = 0
 
+    started = time.perf_counter()
+    try:
+        async with pool.acquire() as conn:
+            while True:
                 try:
-                    await cur.execute(
-                        """
-                        INSERT INTO federal_documents (
-                            document_number, title, publication_date, document_type, 
-                            abstract, html_url, raw_data
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON DUPLICATE KEY UPDATE
-                            title = VALUES(title),
-                            publication_date = VALUES(publication_date),
-                            document_type = VALUES(document_type),
-                            abstract = VALUES(abstract),
-                            html_url = VALUES(html_url),
-                            raw_data = VALUES(raw_data),
-                            updated_at = CURRENT_TIMESTAMP;
-                        """,
-                        (
-                            doc.get("document_number"),
-                            doc.get("title"),
-                            doc.get("publication_date"), # Assumes YYYY-MM-DD format
-                            doc.get("type"),
-                            abstract_text,
-                            doc.get("html_url"),
-                            json.dumps(doc) # Store the whole original doc as JSON
-                        )
-                    )
-                    processed_count += 1
-                except aiomysql.MySQLError as e:
-                    print(f"DB Error processing document {doc.get('document_number')}: {e}")
+                    # Decoding, hashing and serializing are CPU-bound; keep them off the event loop
+                    # (which may also be serving the API when the scheduler runs the pipeline)
+                    rows = await loop.run_in_executor(None, _next_rows, batches, filepath.name)
+                except ValueError as e: # Includes json.JSONDecodeError
+                    print(f"Error decoding JSON from {filepath.name}: {e}. Skipping the rest of the file.")
+                    return None
                 except Exception as e:
-                    print(f"Generic error processing document {doc.get('document_number')}: {e}")
-            try:
-                await conn.commit()
-                print(f"Committed {processed_count} documents from {filepath.name} to DB.")
-            except aiomysql.MySQLError as e:
-                print(f"Commit error for {filepath.name}: {e}")
-                await conn.rollback()
+                    print(f"Error reading file {filepath.name}: {e}. Skipping.")
+                    return None
+                if rows is None:
+                    break
 
+                written_rows = []
+                written, skipped, failed = await upsert_rows(conn, rows, batch_size, written_rows=written_rows)
+                processed_count += written
+                skipped_count += skipped
+                failed_count += failed
+                await embed_written_rows(written_rows)
+    finally:
+        batches.close()
+    elapsed = time.perf_counter() - started
+    rate = (processed_count + skipped_count) / elapsed if elapsed > 0 else 0.0
+    print(f"Committed {processed_count} documents from {filepath.name} to DB, skipped {skipped_count} unchanged, "
+          f"in {elapsed:.2f}s ({rate:.0f} rows/s).")
+    if failed_count:
+        print(f"{failed_count} documents from {filepath.name} could not be written; keeping the file to retry its date.")
+        return None
+
+    _move_to_processed(filepath)
+    return processed_count
 
+
+def _move_to_processed(filepath):
     # Move processed file (optional, good practice)
     try:
         PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -107,28 +364,195 @@ async def process_file(filepath: Path, pool):
         # If moving fails, we might reprocess. Consider how to handle this.
         # For demo, just print.
 
-    return processed_count
+
+def normalized_batches(path, batch_size, stats):
+    """Decodes and normalizes a raw file batch by batch, counting "documents" and "invalid" ones in `stats`."""
+    for documents in iter_raw_batches(path, batch_size):
+        rows = []
+        for doc in documents:
+            if not isinstance(doc, dict) or "document_number" not in doc:
+                stats["invalid"] += 1
+                continue
+            rows.append(normalize_document(doc))
+        stats["documents"] += len(documents)
+        yield rows
+
+
+def parse_raw_file(path, batch_size, queue):
+    """
+    Process-pool worker: decodes and normalizes one raw file, putting each batch on `queue` as ("rows", rows)
+    (blocking while the consumer is PROCESSOR_BATCHES_AHEAD batches behind), then ("done", parse statistics).
+    """
+    started = time.perf_counter()
+    waited = 0.0
+    stats = {"documents": 0, "invalid": 0, "error": None}
+    try:
+        for rows in normalized_batches(path, batch_size, stats):
+            put_started = time.perf_counter()
+            queue.put(("rows", rows))
+            waited += time.perf_counter() - put_started
+    except Exception as e: # Includes json.JSONDecodeError
+        stats["error"] = f"{type(e).__name__}: {e}"
+    stats["parse_seconds"] = time.perf_counter() - started - waited
+    queue.put(("done", stats))
+
+
+async def _next_parsed(queue, parse_future):
+    """The next message of a parse_raw_file worker. Raises the worker's exception if it died before finishing."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            return await loop.run_in_executor(None, queue.get, True, 1.0)
+        except Empty:
+            if parse_future.done():
+                parse_future.result()
+                raise RuntimeError("parse worker finished without reporting")
+
+
+async def _process_file_parallel(filepath, executor, manager, pool, file_slots, batch_size):
+    """Parses one file in the process pool and upserts its batches on a pooled connection as they arrive."""
+    loop = asyncio.get_running_loop()
+    async with file_slots: # Bounds how many files (each with up to PROCESSOR_BATCHES_AHEAD parsed batches) are in flight
+        queue = manager.Queue(maxsize=PROCESSOR_BATCHES_AHEAD)
+        parse_future = loop.run_in_executor(executor, parse_raw_file, str(filepath), batch_size, queue)
+        written = skipped = failed = 0
+        upsert_seconds = 0.0
+        stats = None
+        try:
+            async with pool.acquire() as conn:
+                while stats is None:
+                    kind, payload = await _next_parsed(queue, parse_future)
+                    if kind == "done":
+                        stats = payload
+                        continue
+                    started = time.perf_counter()
+                    written_rows = []
+                    batch_written, batch_skipped, batch_failed = await upsert_rows(
+                        conn, payload, batch_size, written_rows=written_rows
+                    )
+                    written += batch_written
+                    skipped += batch_skipped
+                    failed += batch_failed
+                    await embed_written_rows(written_rows)
+                    upsert_seconds += time.perf_counter() - started
+        finally:
+            while stats is None and not parse_future.done(): # Upserts failed: don't leave the worker blocked on the queue
+                try:
+                    kind, payload = await _next_parsed(queue, parse_future)
+                except Exception:
+                    break
+                if kind == "done":
+                    stats = payload
+
+        PIPELINE_STAGE_SECONDS.observe(stats["parse_seconds"], stage="parse_file")
+        file_result = {
+            "file": filepath.name, "documents": stats["documents"], "invalid": stats["invalid"],
+            "written": written, "skipped": skipped, "parse_seconds": stats["parse_seconds"],
+            "upsert_seconds": upsert_seconds, "error": stats["error"],
+        }
+        if stats["error"]:
+            # Like process_file: batches before the error are committed, the file stays to be retried
+            print(f"Error reading file {filepath.name}: {stats['error']}. Keeping the file.")
+            file_result["written"] = None
+            return file_result
+        print(f"Committed {written} documents from {filepath.name}, skipped {skipped} unchanged "
+              f"(parse {file_result['parse_seconds']:.2f}s, upsert {file_result['upsert_seconds']:.2f}s).")
+        if failed:
+            print(f"{failed} documents from {filepath.name} could not be written; keeping the file to retry its date.")
+            file_result.update(written=None, error=f"{failed} documents failed")
+            return file_result
+
+    _move_to_processed(filepath)
+    return file_result
 
 
-async def process_all_new_data():
-    pool = await get_db_pool()
+def _print_parallel_summary(file_results, workers, db_concurrency, elapsed):
+    print(f"\n{'file':<44} {'docs':>7} {'written':>8} {'skipped':>8} {'parse s':>8} {'upsert s':>9}")
+    for r in file_results:
+        written = "ERROR" if r["written"] is None else r["written"]
+        print(f"{r['file']:<44} {r['documents']:>7} {written:>8} {r['skipped']:>8} "
+              f"{r['parse_seconds']:>8.2f} {r['upsert_seconds']:>9.2f}")
+
+    documents = sum(r["documents"] for r in file_results)
+    upserted = sum((r["written"] or 0) + r["skipped"] for r in file_results)
+    parse_seconds = sum(r["parse_seconds"] for r in file_results)
+    upsert_seconds = sum(r["upsert_seconds"] for r in file_results)
+    print(f"\nParse stage:  {documents} docs, {parse_seconds:.2f} worker-s, "
+          f"{documents / parse_seconds if parse_seconds else 0:.0f} docs/s per worker ({workers} workers)")
+    print(f"Upsert stage: {upserted} rows, {upsert_seconds:.2f} connection-s, "
+          f"{upserted / upsert_seconds if upsert_seconds else 0:.0f} rows/s per connection ({db_concurrency} connections)")
+    print(f"Overall:      {documents} docs in {elapsed:.2f}s wall, {documents / elapsed if elapsed else 0:.0f} docs/s")
+
+
+async def process_files_parallel(raw_files, workers, db_concurrency=None, batch_size=None):
+    """
+    Parallel mode: parsing/normalization runs in a process pool of `workers`, upserts run
+    concurrently over `db_concurrency` connections. Workers hand batches over through bounded
+    queues, so a file is never held in memory whole. Returns the per-file result dicts.
+    """
+    db_concurrency = db_concurrency or PROCESSOR_DB_CONCURRENCY
+    batch_size = batch_size or PROCESSOR_BATCH_SIZE
+    pool = await get_db_pool(maxsize=db_concurrency)
+    file_slots = asyncio.Semaphore(workers + db_concurrency)
+
+    started = time.perf_counter()
+    try:
+        with Manager() as manager, ProcessPoolExecutor(max_workers=workers) as executor:
+            file_results = await asyncio.gather(*(
+                _process_file_parallel(filepath, executor, manager, pool, file_slots, batch_size)
+                for filepath in raw_files
+            ))
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+    _print_parallel_summary(file_results, workers, db_concurrency, time.perf_counter() - started)
+    return file_results
+
+
+async def process_all_new_data(workers=None, db_concurrency=None):
+    """
+    Processes every raw file, sequentially or (with more than one worker) in parallel
+    over at most `db_concurrency` connections. Returns {file name: documents written, or None if the file was unreadable}.
+    """
+    workers = workers or PROCESSOR_WORKERS
     total_docs_processed = 0
+    results = {}
     
-    raw_files = list(RAW_DATA_DIR.glob("*.json"))
+    raw_files = list_raw_files(RAW_DATA_DIR)
     if not raw_files:
         print("No raw data files found to process.")
+        return results
     else:
         print(f"Found {len(raw_files)} raw files to process.")
 
+    if workers > 1:
+        file_results = await process_files_parallel(raw_files, workers, db_concurrency)
+        await save_vector_graph()
+        return {r["file"]: r["written"] for r in file_results}
+
+    pool = await get_db_pool(maxsize=1) # Files are processed one at a time on one connection
+    started = time.perf_counter()
     for filepath in raw_files:
         count = await process_file(filepath, pool)
-        total_docs_processed += count
+        results[filepath.name] = count
+        total_docs_processed += count or 0
+    elapsed = time.perf_counter() - started
     
     print(f"\nTotal documents processed in this run: {total_docs_processed}")
+    if total_docs_processed and elapsed > 0:
+        print(f"Throughput: {total_docs_processed / elapsed:.0f} rows/s over {elapsed:.2f}s")
     
     pool.close()
     await pool.wait_closed()
+    await save_vector_graph()
+    return results
 
 
 if __name__ == "__main__":
-    asyncio.run(process_all_new_data())
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Process raw Federal Register files into MySQL")
+    parser.add_argument("--workers", type=int, default=PROCESSOR_WORKERS,
+                        help="Parser processes; more than 1 enables the parallel mode")
+    args = parser.parse_args()
+    asyncio.run(process_all_new_data(workers=args.workers))
\ No newline at end of file
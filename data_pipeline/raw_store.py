@@ -0,0 +1,175 @@
+import asyncio
+import gzip
+import io
+import json
+import os
+from pathlib import Path
+
+try:
+    import zstandard # Optional: only needed for RAW_FILE_FORMAT=ndjson.zst
+except ImportError:
+    zstandard = None
+
+# On-disk format for newly downloaded raw files: "ndjson", "ndjson.gz" or "ndjson.zst".
+# Legacy federal_register_YYYY-MM-DD.json files (one JSON array) remain readable.
+RAW_FILE_FORMAT = os.getenv("RAW_FILE_FORMAT", "ndjson")
+RAW_FILE_PREFIX = "federal_register_"
+RAW_FILE_SUFFIXES = (".ndjson.zst", ".ndjson.gz", ".ndjson", ".json")
+READ_CHUNK_SIZE = 1 << 16
+
+
+def raw_filename(date_str, fmt=None):
+    return f"{RAW_FILE_PREFIX}{date_str}.{fmt or RAW_FILE_FORMAT}"
+
+
+def date_from_raw_filename(path):
+    """'federal_register_2025-06-02.ndjson.gz' -> '2025-06-02'. Raises ValueError for other names."""
+    name = Path(path).name
+    for suffix in RAW_FILE_SUFFIXES:
+        if name.startswith(RAW_FILE_PREFIX) and name.endswith(suffix):
+            return name[len(RAW_FILE_PREFIX):-len(suffix)]
+    raise ValueError(f"Not a raw Federal Register file name: {name}")
+
+
+def list_raw_files(directory):
+    """All complete raw files in `directory`, oldest publication date first."""
+    files = []
+    for suffix in RAW_FILE_SUFFIXES:
+        files.extend(Path(directory).glob(f"*{suffix}"))
+    return sorted(set(files), key=lambda path: path.name)
+
+
+def _open_text(path, mode, name=None):
+    """Text stream over a raw file, transparently (de)compressing by the suffix of `name` (default: the path)."""
+    name = str(name or path)
+    if name.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("Reading or writing .zst raw files requires the 'zstandard' package.")
+        if mode == "r":
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class RawFileWriter:
+    """
+    Appends documents to a newline-delimited JSON raw file page by page, so a day is never held in memory.
+    Writes go to a '.part' file that is renamed into place on commit(), so the processor
+    never picks up a half-written day.
+    """
+
+    def __init__(self, directory, date_str, fmt=None):
+        self.path = Path(directory) / raw_filename(date_str, fmt)
+        self.part_path = self.path.with_name(self.path.name + ".part")
+        self.count = 0
+        self._stream = None
+        self._lock = asyncio.Lock() # Pages of one day may complete concurrently
+
+    def _write(self, documents):
+        if self._stream is None:
+            self._stream = _open_text(self.part_path, "w", name=self.path.name)
+        for doc in documents:
+            self._stream.write(json.dumps(doc, separators=(",", ":")))
+            self._stream.write("\n")
+        self.count += len(documents)
+
+    def _close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    async def write_page(self, documents):
+        if not documents:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            await loop.run_in_executor(None, self._write, documents)
+
+    async def commit(self):
+        """Finalizes the file. Returns its path, or None if no documents were written."""
+        async with self._lock:
+            self._close()
+            if self.count == 0:
+                return None
+            os.replace(self.part_path, self.path)
+            return str(self.path)
+
+    async def discard(self):
+        async with self._lock:
+            self._close()
+            if self.part_path.exists():
+                os.remove(self.part_path)
+
+
+def _iter_json_array(stream):
+    """Incrementally decodes the elements of a top-level JSON array (legacy .json raw files)."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        more = stream.read(READ_CHUNK_SIZE)
+        if not more:
+            eof = True
+        buffer = buffer[pos:] + more
+        pos = 0
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skip(" \t\r\n")
+    if pos >= len(buffer) or buffer[pos] != "[":
+        raise ValueError("Expected a JSON array of documents")
+    pos += 1
+
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        if buffer[pos] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill() # Element spans the chunk boundary; read more and retry
+            continue
+        yield value
+        pos = end
+
+
+def iter_raw_documents(path):
+    """Yields documents from a raw file without loading the whole file into memory."""
+    with _open_text(path, "r") as stream:
+        if str(path).endswith(".json"):
+            yield from _iter_json_array(stream)
+            return
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_raw_batches(path, batch_size):
+    """Groups iter_raw_documents into lists of at most `batch_size` documents."""
+    batch = []
+    for doc in iter_raw_documents(path):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
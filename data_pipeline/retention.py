@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from dotenv import load_dotenv
+from data_pipeline.db_setup import (
+    PARTITIONED_TABLE, ensure_partitions, get_db_pool, get_partitions, pipeline_lock, setup_database,
+)
+from data_pipeline.document_text import TEXT_TABLES
+from data_pipeline.facets import FACET_LINK_TABLES
+from data_pipeline.processor import notify_committed_dates
+from data_pipeline.raw_store import RawFileWriter, raw_filename
+
+load_dotenv()
+
+# Documents published more than this many days ago are purged, a whole partition at a time. 0 keeps everything.
+DOCUMENT_RETENTION_DAYS = int(os.getenv("DOCUMENT_RETENTION_DAYS", 0))
+# If set, purged documents are first written here as raw files, one per publication date (reloadable with
+# `python -m data_pipeline.backfill --source <dir>`)
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR")
+RETENTION_ARCHIVE_FORMAT = "ndjson.gz"
+# Documents deleted from federal_documents per transaction
+RETENTION_DELETE_BATCH_SIZE = int(os.getenv("RETENTION_DELETE_BATCH_SIZE", 2000))
+
+
+def expired_partitions(partitions, cutoff):
+    """The partitions (from get_partitions) holding only dates before `cutoff`, oldest first."""
+    return [(name, bound) for name, bound in partitions if bound is not None and bound <= cutoff]
+
+
+async def archive_documents(cur, before, directory):
+    """Writes the raw JSON of documents published before `before` to per-date files. Returns the documents written."""
+    await cur.execute(
+        "SELECT DISTINCT publication_date FROM federal_documents WHERE publication_date < %s ORDER BY publication_date",
+        (before,)
+    )
+    archived = 0
+    for (publication_date,) in await cur.fetchall():
+        date_str = publication_date.isoformat()
+        if (Path(directory) / raw_filename(date_str, RETENTION_ARCHIVE_FORMAT)).exists():
+            continue # Archived by an earlier, interrupted run; its purge may already have started
+        await cur.execute(
+            """
+            SELECT r.raw_data FROM federal_documents d
+            JOIN federal_documents_raw r ON r.document_number = d.document_number AND r.publication_date = d.publication_date
+            WHERE d.publication_date = %s
+            """,
+            (publication_date,)
+        )
+        writer = RawFileWriter(directory, date_str, RETENTION_ARCHIVE_FORMAT)
+        await writer.write_page([json.loads(raw_data) for (raw_data,) in await cur.fetchall()])
+        await writer.commit()
+        archived += writer.count
+    return archived
+
+
+async def purge_documents(cur, before):
+    """
+    Deletes documents published before `before` (and undated ones) from federal_documents, the facet tables
+    and the stored bodies, RETENTION_DELETE_BATCH_SIZE per transaction, walking idx_pubdate_id.
+    Returns the documents deleted.
+    The daily count rollups are kept, so counts still cover the purged history.
+    """
+    deleted = 0
+    while True:
+        await cur.execute(
+            """
+            SELECT id, document_number, publication_date FROM federal_documents
+            WHERE publication_date IS NULL OR publication_date < %s
+            ORDER BY publication_date, id LIMIT %s
+            """,
+            (before, RETENTION_DELETE_BATCH_SIZE)
+        )
+        rows = await cur.fetchall()
+        if not rows:
+            break
+        placeholders = ", ".join(["%s"] * len(rows))
+        await cur.execute("START TRANSACTION")
+        for table in FACET_LINK_TABLES + TEXT_TABLES:
+            await cur.execute(
+                f"DELETE FROM {table} WHERE document_number IN ({placeholders})", [row[1] for row in rows]
+            )
+        await cur.execute(f"DELETE FROM federal_documents WHERE id IN ({placeholders})", [row[0] for row in rows])
+        await cur.execute("COMMIT")
+        deleted += len(rows)
+        notify_committed_dates({str(row[2]) if row[2] is not None else None for row in rows})
+    return deleted
+
+
+async def apply_retention(cur, retention_days=DOCUMENT_RETENTION_DAYS, archive_dir=RETENTION_ARCHIVE_DIR,
+                          dry_run=False):
+    """
+    Drops every partition of federal_documents_raw whose dates all fall outside the retention window,
+    after archiving (optional) and purging the matching federal_documents rows in small batches.
+    Documents therefore live up to one partition interval longer than `retention_days`.
+    """
+    if retention_days <= 0:
+        return 0
+    cutoff = date.today() - timedelta(days=retention_days)
+    partitions = await get_partitions(cur)
+    if not partitions:
+        print(f"'{PARTITIONED_TABLE}' is not partitioned yet; run `python -m data_pipeline.db_setup --force`.")
+        return 0
+    dropped = 0
+    for name, bound in expired_partitions(partitions, cutoff):
+        if dry_run:
+            print(f"Would purge documents published before {bound} and drop partition '{name}'.")
+            continue
+        started = time.perf_counter()
+        archived = await archive_documents(cur, bound, archive_dir) if archive_dir else 0
+        deleted = await purge_documents(cur, bound)
+        await cur.execute(f"ALTER TABLE {PARTITIONED_TABLE} DROP PARTITION {name}")
+        dropped += 1
+        print(f"Dropped partition '{name}' (before {bound}): {deleted} documents purged"
+              f"{f', {archived} archived to {archive_dir}' if archive_dir else ''} "
+              f"in {time.perf_counter() - started:.1f}s.")
+    return dropped
+
+
+async def maintain_partitions(retention_days=DOCUMENT_RETENTION_DAYS, archive_dir=RETENTION_ARCHIVE_DIR):
+    """
+    Pipeline step: adds partitions ahead of new publication dates, then applies the retention policy.
+    Callers hold the pipeline lock (the run_pipeline jobs do).
+    """
+    pool = await get_db_pool()
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await ensure_partitions(cur)
+                return await apply_retention(cur, retention_days, archive_dir)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+if __name__ == "__main__":
+    async def main(args):
+        await setup_database()
+        if args.dry_run:
+            await report(args)
+            return
+        async with pipeline_lock() as acquired:
+            if not acquired:
+                print("Another pipeline run holds the pipeline lock; try again when it finishes.")
+                return
+            await report(args)
+
+    async def report(args):
+        pool = await get_db_pool()
+        try:
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    if not args.dry_run:
+                        await ensure_partitions(cur)
+                    for name, bound in await get_partitions(cur):
+                        print(f"  {name}: {f'before {bound}' if bound else 'MAXVALUE'}")
+                    dropped = await apply_retention(cur, args.retention_days, args.archive_dir, args.dry_run)
+                    if args.retention_days <= 0:
+                        print("Retention is off (DOCUMENT_RETENTION_DAYS=0); nothing purged.")
+                    elif not args.dry_run:
+                        print(f"{dropped} partition(s) dropped.")
+        finally:
+            pool.close()
+            await pool.wait_closed()
+
+    parser = argparse.ArgumentParser(description="Create upcoming partitions and purge documents past retention")
+    parser.add_argument("--retention-days", type=int, default=DOCUMENT_RETENTION_DAYS,
+                        help="Keep documents published within this many days (0: keep everything)")
+    parser.add_argument("--archive-dir", default=RETENTION_ARCHIVE_DIR,
+                        help="Write purged documents here as raw files first")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the partitions that would be dropped")
+    asyncio.run(main(parser.parse_args()))
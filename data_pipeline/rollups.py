@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+from data_pipeline.db_setup import get_db_pool, setup_database
+from data_pipeline.facets import rebuild_document_facets
+
+# Days recomputed per statement by rebuild_rollups
+ROLLUP_REBUILD_DAYS = 92
+
+# Recompute whole days from federal_documents: exact regardless of inserts, updates or re-ingests
+_ROLLUP_STATEMENTS = [
+    "DELETE FROM document_counts_daily WHERE {where}",
+    """
+    INSERT INTO document_counts_daily (publication_date, document_type, document_count)
+    SELECT publication_date, COALESCE(document_type, ''), COUNT(*)
+    FROM federal_documents WHERE {where}
+    GROUP BY publication_date, COALESCE(document_type, '')
+    """,
+    "DELETE FROM agency_document_counts_daily WHERE {where}",
+    """
+    INSERT INTO agency_document_counts_daily (publication_date, agency_slug, document_type, document_count)
+    SELECT d.publication_date, da.agency_slug, COALESCE(d.document_type, ''), COUNT(*)
+    FROM federal_documents d
+    JOIN document_agencies da ON da.document_number = d.document_number
+    WHERE d.{where}
+    GROUP BY d.publication_date, da.agency_slug, COALESCE(d.document_type, '')
+    """,
+]
+
+
+async def refresh_rollups(cur, publication_dates):
+    """Recomputes the daily counts of the given dates (typically those of a just-upserted batch)."""
+    publication_dates = sorted({str(d) for d in publication_dates if d})
+    if not publication_dates:
+        return
+    where = f"publication_date IN ({', '.join(['%s'] * len(publication_dates))})"
+    for statement in _ROLLUP_STATEMENTS:
+        await cur.execute(statement.format(where=where), publication_dates)
+
+
+async def rebuild_rollups(cur, start=None, end=None):
+    """Recomputes the daily counts for [start, end] (default: every stored date), ROLLUP_REBUILD_DAYS per statement."""
+    await cur.execute("SELECT MIN(publication_date), MAX(publication_date) FROM federal_documents")
+    first, last = await cur.fetchone()
+    start = max(start or first, first) if first else None
+    end = min(end or last, last) if last else None
+    if start is None or end is None or start > end:
+        print("No documents to roll up.")
+        return 0
+    days = 0
+    current = start
+    while current <= end:
+        chunk_end = min(current + timedelta(days=ROLLUP_REBUILD_DAYS - 1), end)
+        for statement in _ROLLUP_STATEMENTS:
+            await cur.execute(statement.format(where="publication_date BETWEEN %s AND %s"), (current, chunk_end))
+        days += (chunk_end - current).days + 1
+        current = chunk_end + timedelta(days=1)
+    print(f"Rolled up {days} day(s) from {start} to {end}.")
+    return days
+
+
+if __name__ == "__main__":
+    async def main(args):
+        await setup_database()
+        pool = await get_db_pool()
+        try:
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    started = time.perf_counter()
+                    if args.facets:
+                        await rebuild_document_facets(cur)
+                    await rebuild_rollups(cur, args.start, args.end)
+                    print(f"Done in {time.perf_counter() - started:.1f}s.")
+        finally:
+            pool.close()
+            await pool.wait_closed()
+
+    parser = argparse.ArgumentParser(description="Rebuild the document count rollups from federal_documents")
+    parser.add_argument("--start", type=date.fromisoformat, help="First publication date (default: earliest stored)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last publication date (default: latest stored)")
+    parser.add_argument("--facets", action="store_true",
+                        help="First re-derive the agency, topic and CFR reference tables from the stored raw JSON")
+    asyncio.run(main(parser.parse_args()))
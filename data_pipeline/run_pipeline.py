@@ -1,9 +1,31 @@
+import argparse
 import asyncio
-from data_pipeline.downloader import download_recent_data, cleanup_old_raw_data, download_daily_data
+import os
+from datetime import date
+from data_pipeline.downloader import download_recent_data, cleanup_old_raw_data, download_daily_data, download_missing_dates
 from data_pipeline.processor import process_all_new_data
-from data_pipeline.db_setup import setup_database
+from data_pipeline.db_setup import get_db_pool, pipeline_lock, setup_database
+from data_pipeline.checkpoints import get_checkpoint, set_checkpoint, missing_date_range, advance_checkpoint
+from data_pipeline.raw_store import date_from_raw_filename
+from data_pipeline.retention import maintain_partitions
+from data_pipeline.document_text import DOCUMENT_TEXT_ENABLED, TEXT_FETCH_PER_RUN, fetch_document_texts
+
+# How far back the first incremental run starts when no checkpoint exists yet
+INCREMENTAL_INITIAL_DAYS = int(os.getenv("INCREMENTAL_INITIAL_DAYS", 7))
+LOCK_HELD_MESSAGE = "Another pipeline run (scheduler, cron, backfill or retention) holds the pipeline lock; skipping."
+
 
 async def main_pipeline_job(days_to_fetch=3):
+    """Daily job under the pipeline lock. Returns False without doing anything if another run holds it."""
+    async with pipeline_lock() as acquired:
+        if not acquired:
+            print(LOCK_HELD_MESSAGE)
+            return False
+        await _main_pipeline_run(days_to_fetch)
+    return True
+
+
+async def _main_pipeline_run(days_to_fetch):
     print("Starting data pipeline job...")
 
     # 1. Ensure database schema is up to date
@@ -14,6 +36,8 @@ async def main_pipeline_job(days_to_fetch=3):
     print(f"\nStep 2: Downloading data for the last {days_to_fetch} day(s)...")
     # Option 1: Fetch for a range of past days
     # await download_recent_data(num_days=days_to_fetch) 
+    # For multi-day backfills, fetch days and pages concurrently (rate limited, with retries):
+    # await download_recent_data(num_days=days_to_fetch, concurrent=True)
     # Option 2: Fetch only for yesterday (more common for a daily job)
     await download_daily_data(days_ago=1) 
     # You might want to fetch for today as well, but data might be incomplete
@@ -23,13 +47,99 @@ async def main_pipeline_job(days_to_fetch=3):
     print("\nStep 3: Processing downloaded data...")
     await process_all_new_data()
 
-    # 4. Cleanup old raw files
-    print("\nStep 4: Cleaning up old raw data files...")
+    # 4. Cleanup old raw files, add upcoming partitions and purge documents past DOCUMENT_RETENTION_DAYS
+    print("\nStep 4: Cleaning up old raw data files and partitions...")
     cleanup_old_raw_data() # Synchronous, but quick
+    await maintain_partitions()
 
     print("\nData pipeline job finished.")
 
+
+async def incremental_pipeline_job(initial_days=INCREMENTAL_INITIAL_DAYS, include_today=False,
+                                   workers=None, max_in_flight=None, db_concurrency=None, progress=None):
+    """
+    Incremental job (see _incremental_pipeline_run) under the pipeline lock, so a cron run and the API's
+    scheduler never overlap. Returns False without doing anything if another run holds the lock.
+    """
+    progress = progress if progress is not None else {}
+    progress["stage"] = "lock"
+    async with pipeline_lock() as acquired:
+        if not acquired:
+            print(LOCK_HELD_MESSAGE)
+            return False
+        await _incremental_pipeline_run(initial_days, include_today, workers, max_in_flight, db_concurrency, progress)
+    return True
+
+
+async def _incremental_pipeline_run(initial_days, include_today, workers, max_in_flight, db_concurrency, progress):
+    """
+    Downloads only the publication dates after the stored checkpoint (catching up on missed days),
+    processes them, and advances the checkpoint past every date that was fully ingested.
+    Unchanged documents are skipped by the processor via their content hash.
+    With include_today, today's (possibly still growing) issue is fetched too, without advancing
+    the checkpoint past yesterday, so repeated runs pick up documents soon after publication.
+    workers / max_in_flight / db_concurrency cap the processes, HTTP requests and connections the run uses; `progress["stage"]`
+    is updated as the job moves on (the scheduler reports it).
+    """
+    print("Starting incremental data pipeline job...")
+
+    print("\nStep 1: Setting up database...")
+    progress["stage"] = "setup"
+    await setup_database()
+
+    pool = await get_db_pool()
+    try:
+        checkpoint = await get_checkpoint(pool)
+        date_range = missing_date_range(checkpoint, initial_days)
+        today = date.today()
+        if date_range is None and not include_today:
+            print(f"\nAlready up to date (checkpoint: {checkpoint}). Nothing to do.")
+            return
+        start, end = date_range or (today, today)
+        download_end = today if include_today else end
+        print(f"\nStep 2: Downloading dates {start} to {download_end} (checkpoint: {checkpoint})...")
+        progress["stage"] = "download"
+        _, completed_dates = await download_missing_dates(start, download_end, max_in_flight=max_in_flight)
+
+        print("\nStep 3: Processing downloaded data...")
+        progress["stage"] = "process"
+        results = await process_all_new_data(workers=workers, db_concurrency=db_concurrency)
+        if date_range is not None:
+            # A date only counts as ingested if its file (if any) could be read and upserted
+            failed_dates = {date_from_raw_filename(name) for name, count in results.items() if count is None}
+            new_checkpoint = advance_checkpoint(start, end, completed_dates - failed_dates)
+            if new_checkpoint:
+                await set_checkpoint(pool, new_checkpoint)
+            else:
+                print(f"Could not fully ingest {start}; checkpoint stays at {checkpoint}.")
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+    if DOCUMENT_TEXT_ENABLED:
+        # Not limited to this run's dates: bodies left over by earlier (interrupted or capped) runs come next
+        print(f"\nStep 3b: Fetching document bodies (at most {TEXT_FETCH_PER_RUN or 'all'})...")
+        progress["stage"] = "text"
+        await fetch_document_texts(limit=TEXT_FETCH_PER_RUN or None, max_in_flight=max_in_flight)
+
+    print("\nStep 4: Cleaning up old raw data files and partitions...")
+    progress["stage"] = "cleanup"
+    cleanup_old_raw_data()
+    await maintain_partitions()
+
+    print("\nIncremental data pipeline job finished.")
+
+
 if __name__ == "__main__":
-    # Run the pipeline for the last 1 day (i.e., yesterday's data)
-    # Adjust days_to_fetch as needed for initial population or catch-up
-    asyncio.run(main_pipeline_job(days_to_fetch=1))
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Federal Register data pipeline")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Fetch every date since the last checkpoint and skip unchanged documents")
+    parser.add_argument("--include-today", action="store_true",
+                        help="With --incremental, also fetch today's issue (the checkpoint stays at yesterday)")
+    args = parser.parse_args()
+    if args.incremental:
+        asyncio.run(incremental_pipeline_job(include_today=args.include_today))
+    else:
+        # Run the pipeline for the last 1 day (i.e., yesterday's data)
+        # Adjust days_to_fetch as needed for initial population or catch-up
+        asyncio.run(main_pipeline_job(days_to_fetch=1))
\ No newline at end of file
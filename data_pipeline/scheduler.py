@@ -0,0 +1,185 @@
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from data_pipeline.run_pipeline import incremental_pipeline_job
+from observability.logs import get_logger
+from observability.metrics import PIPELINE_ROWS, PIPELINE_RUNS
+
+load_dotenv()
+
+logger = get_logger("pipeline_scheduler")
+
+# Runs incremental ingestion inside the API process (off by default; cron + run_pipeline.py still works)
+PIPELINE_SCHEDULER_ENABLED = os.getenv("PIPELINE_SCHEDULER_ENABLED", "false").lower() in ("1", "true", "yes")
+PIPELINE_INTERVAL_SECONDS = float(os.getenv("PIPELINE_INTERVAL_SECONDS", 900))
+PIPELINE_JITTER_SECONDS = float(os.getenv("PIPELINE_JITTER_SECONDS", 60)) # Spreads workers/replicas apart
+# Caps what a scheduled run may use next to the chat traffic: concurrent HTTP requests,
+# database connections and parser processes
+PIPELINE_MAX_CONCURRENCY = int(os.getenv("PIPELINE_MAX_CONCURRENCY", 2))
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", 1))
+
+
+def _rows_counters():
+    return {
+        "fetched": PIPELINE_ROWS.value(stage="download", result="fetched"),
+        "written": PIPELINE_ROWS.value(stage="upsert", result="written"),
+        "skipped": PIPELINE_ROWS.value(stage="upsert", result="skipped"),
+        "texts_stored": PIPELINE_ROWS.value(stage="text", result="stored"),
+    }
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class PipelineScheduler:
+    """
+    Runs data_pipeline.run_pipeline.incremental_pipeline_job every `interval` seconds (plus jitter),
+    including today's issue, on the API's event loop. Overlapping runs are prevented in-process by an
+    asyncio lock and across processes by a MySQL named lock; a run that finds the lock taken is skipped.
+    """
+
+    def __init__(self, interval=PIPELINE_INTERVAL_SECONDS, jitter=PIPELINE_JITTER_SECONDS,
+                 max_concurrency=PIPELINE_MAX_CONCURRENCY, workers=PIPELINE_WORKERS):
+        self.interval = interval
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+        self.workers = workers
+        self._task = None
+        self._wake = asyncio.Event()
+        self._run_lock = asyncio.Lock()
+        self._pending_reason = None
+        self._manual_task = None
+        self._run_started = None
+        self._rows_before = None
+        self.progress = {}
+        self.next_run_at = None
+        self.last_run = None
+        self.stats = {"runs": 0, "succeeded": 0, "failed": 0, "skipped_locked": 0}
+
+    @property
+    def running(self):
+        return self._run_lock.locked()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info("pipeline_scheduler_started", interval=self.interval, jitter=self.jitter)
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def trigger(self, reason="manual"):
+        """Starts a run now. False if one is already in progress."""
+        if self.running or self._wake.is_set() or (self._manual_task and not self._manual_task.done()):
+            return False
+        if self._task is not None:
+            self._pending_reason = reason
+            self._wake.set() # The loop runs it and then restarts its interval
+        else:
+            self._manual_task = asyncio.create_task(self.run_once(reason))
+        return True
+
+    async def _loop(self):
+        delay = random.uniform(0, self.jitter) # Workers started together should not all hit the lock at once
+        while True:
+            self.next_run_at = time.time() + delay
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            reason, self._pending_reason = self._pending_reason or "scheduled", None
+            try:
+                await self.run_once(reason)
+            except Exception: # run_once records failures; never let the loop die
+                logger.error("pipeline_scheduler_loop_error", exc_info=True)
+            delay = self.interval + random.uniform(0, self.jitter)
+
+    async def run_once(self, reason="scheduled"):
+        """
+        One incremental run; the job itself takes the pipeline lock (see run_pipeline.incremental_pipeline_job).
+        Returns "succeeded", "failed", "skipped_locked" or "busy".
+        """
+        if self.running:
+            return "busy"
+        async with self._run_lock:
+            started = self._run_started = time.perf_counter()
+            before = self._rows_before = _rows_counters()
+            self.progress = {"stage": "lock", "reason": reason, "started_at": _now()}
+            outcome = "failed"
+            error = None
+            try:
+                ran = await incremental_pipeline_job(
+                    include_today=True,
+                    workers=self.workers,
+                    max_in_flight=self.max_concurrency,
+                    db_concurrency=self.max_concurrency,
+                    progress=self.progress,
+                )
+                if ran:
+                    outcome = "succeeded"
+                else:
+                    outcome = "skipped_locked"
+                    logger.info("pipeline_run_skipped", reason=reason, detail="lock held elsewhere")
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                logger.error("pipeline_run_failed", exc_info=True, reason=reason)
+
+            elapsed, rows = self._run_totals(started, before)
+            if outcome != "skipped_locked":
+                self.stats["runs"] += 1
+            self.stats[outcome] += 1
+            PIPELINE_RUNS.inc(reason=reason, outcome=outcome)
+            self.last_run = {
+                "reason": reason,
+                "outcome": outcome,
+                "error": error,
+                "started_at": self.progress.get("started_at"),
+                "finished_at": _now(),
+                "seconds": round(elapsed, 2),
+                "rows": rows,
+                "written_per_second": round(rows["written"] / elapsed, 1) if elapsed > 0 else 0.0,
+            }
+            self.progress = {}
+            logger.info("pipeline_run_finished", **self.last_run)
+            return outcome
+
+    @staticmethod
+    def _run_totals(started, before):
+        """(seconds so far, rows fetched/written/skipped and bodies stored since `before`) of the current run."""
+        after = _rows_counters()
+        return time.perf_counter() - started, {key: after[key] - before[key] for key in after}
+
+    def get_status(self):
+        status = {
+            "enabled": self._task is not None,
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "next_run_in_seconds": round(max(0.0, self.next_run_at - time.time()), 1) if self.next_run_at else None,
+            "last_run": self.last_run,
+            "stats": dict(self.stats),
+        }
+        if self.running:
+            elapsed, rows = self._run_totals(self._run_started, self._rows_before)
+            status["progress"] = dict(
+                self.progress,
+                seconds=round(elapsed, 1),
+                rows=rows,
+                written_per_second=round(rows["written"] / elapsed, 1) if elapsed > 0 else 0.0,
+            )
+        return status
+
+    def get_stats(self):
+        """Numeric counters for /metrics."""
+        return dict(self.stats, running=int(self.running))
@@ -0,0 +1,426 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+try:
+    import hnswlib # Optional: approximate nearest-neighbour graph; without it search is an exact NumPy scan
+except ImportError:
+    hnswlib = None
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+load_dotenv()
+
+# Embeddings come from the same OpenAI-compatible server as the chat model (e.g. `ollama pull nomic-embed-text`).
+# Leave EMBEDDING_MODEL unset to disable the vector index and the semantic search tool.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
+EMBEDDING_BASE_URL = os.getenv("EMBEDDING_BASE_URL") or os.getenv("OLLAMA_BASE_URL")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", 2))
+VECTOR_INDEX_DIR = Path(os.getenv("VECTOR_INDEX_DIR", "data/vector_index"))
+VECTOR_SCAN_CHUNK_ROWS = int(os.getenv("VECTOR_SCAN_CHUNK_ROWS", 65536))
+# HNSW graph parameters (only used when hnswlib is installed)
+HNSW_M = int(os.getenv("HNSW_M", 16))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", 200))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", 128))
+FILTER_OVERFETCH = 8 # Graph candidates fetched per requested result when filters are applied afterwards
+
+# Per-row attributes kept next to each vector so date and type filters run inside the index
+ATTRS_DTYPE = np.dtype([("days", "<i4"), ("type", "u1")])
+DOCUMENT_TYPE_CODES = {"Rule": 1, "Proposed Rule": 2, "Notice": 3, "Presidential Document": 4}
+EPOCH = date(1970, 1, 1)
+
+_embedding_client = None
+
+
+def _get_embedding_client():
+    global _embedding_client
+    if _embedding_client is None:
+        if not EMBEDDING_MODEL or not EMBEDDING_BASE_URL:
+            raise RuntimeError("EMBEDDING_MODEL and EMBEDDING_BASE_URL (or OLLAMA_BASE_URL) must be set in .env")
+        from openai import AsyncOpenAI
+        _embedding_client = AsyncOpenAI(base_url=EMBEDDING_BASE_URL, api_key="ollama")
+    return _embedding_client
+
+
+async def embed_texts(texts, batch_size=None):
+    """Embeds `texts` in batches (a few batches in flight at once). Returns an (n, dim) float32 array of unit vectors."""
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+    client = _get_embedding_client()
+    semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+
+    async def embed_batch(batch):
+        async with semaphore:
+            response = await client.embeddings.create(model=EMBEDDING_MODEL, input=batch)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    vectors = np.asarray([vector for batch in results for vector in batch], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12) # Unit length: inner product == cosine similarity
+
+
+def embedding_text(title, abstract):
+    return f"{title or ''}\n{abstract or ''}".strip()
+
+
+def date_to_days(value):
+    if not value:
+        return -1
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return (value - EPOCH).days
+
+
+@contextmanager
+def _exclusive_lock(path):
+    """Holds an exclusive lock on `path` (created if missing) across processes for the duration of the block."""
+    with open(path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1) # Retries for about 10 seconds, then raises OSError
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class VectorIndex:
+    """
+    Append-only on-disk embedding index, shared by the pipeline (writer) and the API (readers).
+
+    vectors.f32  float32 rows, memory-mapped for search
+    attrs.bin    publication date (days since epoch) and document type code per row
+    ids.txt      document_number per row; written last, so its line count is the number of complete rows
+    hnsw.bin     optional HNSW graph over the first rows (see save_graph()); newer rows are scanned exactly
+    write.lock   held by the process appending, so writers in several processes never interleave rows
+
+    Re-embedded documents are appended again; only the newest row of a document_number is returned.
+    """
+
+    def __init__(self, directory=VECTOR_INDEX_DIR):
+        self.directory = Path(directory)
+        self.meta_path = self.directory / "meta.json"
+        self.vectors_path = self.directory / "vectors.f32"
+        self.attrs_path = self.directory / "attrs.bin"
+        self.ids_path = self.directory / "ids.txt"
+        self.graph_path = self.directory / "hnsw.bin"
+        self.lock_path = self.directory / "write.lock"
+        self.dim = None
+        self.model = None
+        self.count = 0
+        self.doc_numbers = [] # row -> document_number
+        self.latest_row = {} # document_number -> newest row
+        self._ids_offset = 0
+        self._vectors = None
+        self._attrs = None
+        self._graph = None
+        self._graph_count = 0
+        self._graph_mtime = None
+        self._write_lock = asyncio.Lock()
+        # refresh(), search() and save_graph() run in executor threads: row state and the graph change under this
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._writer_ids_offset = 0 # Complete ids.txt bytes and rows seen by the last append (readers use their own)
+        self._writer_rows = 0
+
+    def _load_meta(self):
+        if self.meta_path.exists():
+            meta = json.loads(self.meta_path.read_text())
+            self.dim, self.model = meta["dim"], meta["model"]
+
+    def refresh(self):
+        """Picks up rows appended (possibly by another process) since the last call. Cheap when nothing changed."""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        if self.dim is None:
+            self._load_meta()
+            if self.dim is None:
+                return 0
+        if not self.ids_path.exists():
+            return 0
+        if self.ids_path.stat().st_size != self._ids_offset:
+            with open(self.ids_path, "rb") as f:
+                f.seek(self._ids_offset)
+                data = f.read()
+            complete = data[:data.rfind(b"\n") + 1] # Ignore a line that is still being written
+            self._ids_offset += len(complete)
+            for doc_number in complete.decode("utf-8").splitlines():
+                self.latest_row[doc_number] = len(self.doc_numbers)
+                self.doc_numbers.append(doc_number)
+        if len(self.doc_numbers) != self.count:
+            self.count = len(self.doc_numbers)
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+            self._attrs = np.memmap(self.attrs_path, dtype=ATTRS_DTYPE, mode="r", shape=(self.count,))
+        self._refresh_graph()
+        return self.count
+
+    def _refresh_graph(self):
+        if hnswlib is None or not self.graph_path.exists():
+            return
+        mtime = self.graph_path.stat().st_mtime
+        if mtime == self._graph_mtime:
+            return
+        graph = hnswlib.Index(space="ip", dim=self.dim)
+        graph.load_index(str(self.graph_path))
+        graph.set_ef(HNSW_EF_SEARCH)
+        self._graph, self._graph_count, self._graph_mtime = graph, graph.get_current_count(), mtime
+
+    async def add(self, doc_numbers, vectors, publication_dates, document_types):
+        """Appends embedded documents. Safe to call from concurrent tasks of one writer process."""
+        if not doc_numbers:
+            return 0
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        attrs = np.empty(len(doc_numbers), dtype=ATTRS_DTYPE)
+        attrs["days"] = [date_to_days(value) for value in publication_dates]
+        attrs["type"] = [DOCUMENT_TYPE_CODES.get(value, 0) for value in document_types]
+        async with self._write_lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load_meta()
+            if self.dim is None:
+                self.dim, self.model = vectors.shape[1], EMBEDDING_MODEL
+                self.meta_path.write_text(json.dumps({"dim": self.dim, "model": self.model}))
+            elif vectors.shape[1] != self.dim or self.model != EMBEDDING_MODEL:
+                raise RuntimeError(
+                    f"Vector index at {self.directory} was built with {self.model} ({self.dim} dims); "
+                    f"delete it and run `python -m data_pipeline.vector_index --rebuild` to switch models."
+                )
+            await asyncio.get_running_loop().run_in_executor(None, self._append, doc_numbers, vectors, attrs)
+        return len(doc_numbers)
+
+    def _append(self, doc_numbers, vectors, attrs):
+        with _exclusive_lock(self.lock_path):
+            self._truncate_incomplete_rows()
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.attrs_path, "ab") as f:
+                f.write(attrs.tobytes())
+            with open(self.ids_path, "ab") as f:
+                f.write("".join(f"{doc_number}\n" for doc_number in doc_numbers).encode("utf-8"))
+
+    def _truncate_incomplete_rows(self):
+        """
+        Cuts the files back to the rows that are complete in ids.txt. A writer that died mid-append leaves
+        vectors or attributes without an id, and every row appended after them would be misaligned.
+        Only called with the write lock held, so nothing beyond the complete rows is still being written.
+        """
+        size = self.ids_path.stat().st_size if self.ids_path.exists() else 0
+        if size < self._writer_ids_offset: # Deleted and rebuilt since the last append
+            self._writer_ids_offset = self._writer_rows = 0
+        if size > self._writer_ids_offset:
+            with open(self.ids_path, "rb") as f:
+                f.seek(self._writer_ids_offset)
+                data = f.read()
+            complete = data[:data.rfind(b"\n") + 1]
+            self._writer_ids_offset += len(complete)
+            self._writer_rows += complete.count(b"\n")
+        for path, complete_size in (
+            (self.ids_path, self._writer_ids_offset),
+            (self.vectors_path, self._writer_rows * self.dim * np.dtype(np.float32).itemsize),
+            (self.attrs_path, self._writer_rows * ATTRS_DTYPE.itemsize),
+        ):
+            if path.exists() and path.stat().st_size > complete_size:
+                print(f"Vector index: truncating {path.name} to its {self._writer_rows} complete rows.")
+                os.truncate(path, complete_size)
+
+    def save_graph(self):
+        """Adds rows appended since the last save to the HNSW graph and writes it out. No-op without hnswlib."""
+        if hnswlib is None:
+            return 0
+        with self._save_lock:
+            with self._lock: # Growing the graph must not overlap a knn_query
+                self._refresh()
+                if self.count == self._graph_count:
+                    return 0
+                if self._graph is None:
+                    self._graph = hnswlib.Index(space="ip", dim=self.dim)
+                    self._graph.init_index(max_elements=self.count, ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+                else:
+                    self._graph.resize_index(self.count)
+                new_rows = np.arange(self._graph_count, self.count)
+                self._graph.add_items(np.asarray(self._vectors[self._graph_count:self.count]), new_rows)
+                added = self.count - self._graph_count
+                self._graph_count = self.count
+                self._graph.set_ef(HNSW_EF_SEARCH)
+                graph = self._graph
+            # Writing only reads the graph, so searches may run meanwhile
+            part_path = self.graph_path.with_name(self.graph_path.name + ".part")
+            graph.save_index(str(part_path))
+            os.replace(part_path, self.graph_path) # Readers never load a half-written graph
+            with self._lock:
+                self._graph_mtime = self.graph_path.stat().st_mtime
+        return added
+
+    def _filter_mask(self, attrs, start_days, end_days, type_code):
+        mask = np.ones(len(attrs), dtype=bool)
+        if start_days is not None:
+            mask &= attrs["days"] >= start_days
+        if end_days is not None:
+            mask &= attrs["days"] <= end_days
+        if type_code is not None:
+            mask &= attrs["type"] == type_code
+        return mask
+
+    def _scan(self, query, start_row, end_row, k, start_days, end_days, type_code):
+        """Exact top-k over rows [start_row, end_row) in chunks, so memory stays bounded on large indexes."""
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for chunk_start in range(start_row, end_row, VECTOR_SCAN_CHUNK_ROWS):
+            chunk_end = min(chunk_start + VECTOR_SCAN_CHUNK_ROWS, end_row)
+            scores = self._vectors[chunk_start:chunk_end] @ query
+            mask = self._filter_mask(self._attrs[chunk_start:chunk_end], start_days, end_days, type_code)
+            scores = np.where(mask, scores, -np.inf)
+            top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+            top = top[np.isfinite(scores[top])]
+            best_rows = np.concatenate([best_rows, top + chunk_start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+        return best_rows, best_scores
+
+    def _graph_candidates(self, query, k, start_days, end_days, type_code):
+        filtered = start_days is not None or end_days is not None or type_code is not None
+        fetch = min(self._graph_count, k * (FILTER_OVERFETCH if filtered else 2)) # 2x: room for superseded rows
+        labels, distances = self._graph.knn_query(query, k=fetch)
+        rows = labels[0].astype(np.int64)
+        scores = (1.0 - distances[0]).astype(np.float32) # "ip" space returns 1 - inner product
+        keep = self._filter_mask(self._attrs[rows], start_days, end_days, type_code)
+        return rows[keep], scores[keep]
+
+    def search(self, query_vector, k=10, start_date=None, end_date=None, document_type=None):
+        """Returns up to k (document_number, cosine similarity) pairs, best first."""
+        with self._lock:
+            return self._search(query_vector, k, start_date, end_date, document_type)
+
+    def _search(self, query_vector, k, start_date, end_date, document_type):
+        self._refresh()
+        if self.count == 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+        start_days = date_to_days(start_date) if start_date else None
+        end_days = date_to_days(end_date) if end_date else None
+        type_code = DOCUMENT_TYPE_CODES.get(document_type, 0) if document_type else None
+
+        if self._graph is not None and self._graph_count:
+            rows, scores = self._graph_candidates(query, k, start_days, end_days, type_code)
+            if len(rows) < k and (start_days is not None or end_days is not None or type_code is not None):
+                # Selective filter: the graph neighbourhood had too few matches, scan exactly instead
+                rows, scores = self._scan(query, 0, self._graph_count, k * 2, start_days, end_days, type_code)
+            tail_rows, tail_scores = self._scan(query, self._graph_count, self.count, k * 2, start_days, end_days, type_code)
+            rows, scores = np.concatenate([rows, tail_rows]), np.concatenate([scores, tail_scores])
+        else:
+            rows, scores = self._scan(query, 0, self.count, k * 2, start_days, end_days, type_code)
+
+        results = []
+        for index in np.argsort(-scores):
+            row = int(rows[index])
+            doc_number = self.doc_numbers[row]
+            if self.latest_row.get(doc_number) != row:
+                continue # Superseded by a newer embedding of the same document
+            results.append((doc_number, float(scores[index])))
+            if len(results) >= k:
+                break
+        return results
+
+    def get_stats(self):
+        with self._lock:
+            self._refresh()
+            return {
+                "rows": self.count, "documents": len(self.latest_row), "dim": self.dim, "model": self.model,
+                "graph_rows": self._graph_count, "hnsw": hnswlib is not None,
+            }
+
+
+_index = None
+
+
+def get_vector_index():
+    """Process-wide index instance (lazily opened)."""
+    global _index
+    if _index is None:
+        _index = VectorIndex()
+    return _index
+
+
+async def index_rows(rows):
+    """
+    Embeds normalized processor rows (see processor.normalize_document) and appends them to the index.
+    Called by process_file for the rows it just wrote, so only new or changed documents are embedded.
+    """
+    rows = [row for row in rows if embedding_text(row[1], row[4])]
+    if not rows:
+        return 0
+    started = time.perf_counter()
+    vectors = await embed_texts([embedding_text(row[1], row[4]) for row in rows])
+    added = await get_vector_index().add(
+        [row[0] for row in rows], vectors, [row[2] for row in rows], [row[3] for row in rows]
+    )
+    print(f"Embedded {added} documents in {time.perf_counter() - started:.2f}s.")
+    return added
+
+
+async def rebuild_from_database(pool, batch_size=None):
+    """Embeds every document already in MySQL (e.g. ingested before the index existed), oldest first."""
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE * 8
+    last_id = 0
+    total = 0
+    while True:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    SELECT id, document_number, title, publication_date, document_type, abstract
+                    FROM federal_documents WHERE id > %s ORDER BY id LIMIT %s
+                    """,
+                    (last_id, batch_size)
+                )
+                fetched = await cur.fetchall()
+        if not fetched:
+            break
+        last_id = fetched[-1][0]
+        total += await index_rows([(row[1], row[2], row[3], row[4], row[5]) for row in fetched])
+    get_vector_index().save_graph()
+    print(f"Vector index rebuilt: {total} documents embedded.")
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+    import shutil
+    from data_pipeline.db_setup import get_db_pool
+
+    parser = argparse.ArgumentParser(description="Build or inspect the local document embedding index")
+    parser.add_argument("--rebuild", action="store_true", help="Delete the index and embed every document in MySQL")
+    args = parser.parse_args()
+
+    async def main():
+        if args.rebuild:
+            shutil.rmtree(VECTOR_INDEX_DIR, ignore_errors=True)
+            pool = await get_db_pool()
+            try:
+                await rebuild_from_database(pool)
+            finally:
+                pool.close()
+                await pool.wait_closed()
+        print(get_vector_index().get_stats())
+
+    asyncio.run(main())
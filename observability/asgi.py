@@ -0,0 +1,42 @@
+import time
+
+from observability.metrics import HTTP_REQUEST_SECONDS
+from observability.tracing import span
+
+
+class ObservabilityMiddleware:
+    """
+    Pure ASGI middleware (so streamed bodies are included): opens the root span of each
+    request's trace, returns its id in X-Trace-Id and records http_request_duration_seconds.
+    Paths are labelled by route template to keep label cardinality bounded.
+    """
+
+    def __init__(self, app, skip_paths=("/metrics", "/traces")):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+        with span("http_request", method=scope["method"], path=scope["path"]) as request_span:
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    status["code"] = message["status"]
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-trace-id", request_span.trace_id.encode()))
+                    message = dict(message, headers=headers)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                route = scope.get("route")
+                path = getattr(route, "path", None) or ("static" if scope["path"].startswith("/static") else "unmatched")
+                request_span.set(status=status["code"], route=path)
+                HTTP_REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, method=scope["method"], path=path, status=status["code"]
+                )
@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+import random
+import sys
+
+from observability.tracing import add_trace_listener, current_trace_id
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json") # "json" (one object per line) or "text"
+# Fraction of high-volume DEBUG records (SQL text, history dumps, tool output snippets) that are emitted
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.1))
+ROOT_LOGGER = "federal_rag"
+
+_configured = False
+
+
+class StructuredFormatter(logging.Formatter):
+    def format(self, record):
+        fields = getattr(record, "fields", {})
+        if LOG_FORMAT == "text":
+            extra = " ".join(f"{key}={value}" for key, value in fields.items())
+            return f"{self.formatTime(record)} {record.levelname:<7} {record.name}: {record.getMessage()} {extra}".rstrip()
+        entry = {
+            "ts": round(record.created, 3), "level": record.levelname, "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _configure():
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(StructuredFormatter())
+    root = logging.getLogger(ROOT_LOGGER)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+    _configured = True
+
+
+class StructuredLogger:
+    """
+    Thin wrapper over a stdlib logger: logger.info("tool call finished", tool=name, ms=12.5).
+    Keyword fields become JSON keys; the current trace id is attached automatically.
+    """
+
+    def __init__(self, name):
+        _configure()
+        self._logger = logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+    def enabled(self, level):
+        return self._logger.isEnabledFor(level)
+
+    def sampled(self, level=logging.DEBUG, rate=None):
+        """True if a high-volume record at `level` should be built and emitted this time."""
+        rate = LOG_SAMPLE_RATE if rate is None else rate
+        return self._logger.isEnabledFor(level) and random.random() < rate
+
+    def log(self, level, msg, exc_info=None, **fields):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, msg, exc_info=exc_info, extra={"fields": fields, "trace_id": current_trace_id()})
+
+    def debug(self, msg, **fields):
+        self.log(logging.DEBUG, msg, **fields)
+
+    def info(self, msg, **fields):
+        self.log(logging.INFO, msg, **fields)
+
+    def warning(self, msg, **fields):
+        self.log(logging.WARNING, msg, **fields)
+
+    def error(self, msg, exc_info=None, **fields):
+        self.log(logging.ERROR, msg, exc_info=exc_info, **fields)
+
+
+def get_logger(name):
+    return StructuredLogger(name)
+
+
+_trace_logger = get_logger("trace")
+add_trace_listener(lambda trace: _trace_logger.info("trace", **trace))
@@ -0,0 +1,173 @@
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a cached search (~ms) up to a slow local LLM answer (~minute)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (1, 5, 10, 20, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_registry = [] # Metrics in registration order
+_collectors = [] # (prefix, callable returning a dict of numbers) rendered as gauges
+_lock = threading.Lock() # The pipeline observes from executor threads too
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self):
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._values = {} # label key -> [per-bucket counts, sum, count]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the block, also when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels):
+        """(count, sum) for one label set; handy for tests and summaries."""
+        entry = self._values.get(_label_key(self.labelnames, labels))
+        return (entry[2], entry[1]) if entry else (0, 0.0)
+
+    def render(self):
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+def add_collector(prefix, collect):
+    """Exposes an existing stats dict (e.g. get_pool_metrics) as gauges named {prefix}_{key}."""
+    _collectors.append((prefix, collect))
+
+
+def _flatten(prefix, stats):
+    for key, value in stats.items():
+        name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{key}") # Keys can be model names like "qwen2:0.5b"
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    with _lock:
+        for metric in _registry:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+    for prefix, collect in _collectors:
+        try:
+            stats = collect()
+        except Exception as e:
+            lines.append(f"# collector {prefix} failed: {e}")
+            continue
+        for name, value in _flatten(prefix, stats):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Metrics shared across the API, agent and pipeline ---
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency, including streamed bodies", ["method", "path", "status"]
+)
+CHAT_SECONDS = Histogram("chat_duration_seconds", "End-to-end agent turn latency", ["endpoint", "outcome"])
+CHAT_FIRST_TOKEN_SECONDS = Histogram("chat_first_token_seconds", "Time to the first streamed answer token")
+LLM_REQUEST_SECONDS = Histogram("llm_request_duration_seconds", "Latency of one LLM completion call", ["model", "mode", "outcome"])
+LLM_PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens", "Estimated prompt tokens per LLM call", buckets=(250, 500, 1000, 2000, 3000, 4000, 8000, 16000, 32000)
+)
+LLM_QUEUE_DEPTH = Gauge("llm_queue_depth", "LLM requests waiting for a concurrency slot", ["model"])
+LLM_QUEUE_WAIT_SECONDS = Histogram("llm_queue_wait_seconds", "Time LLM requests waited for a concurrency slot", ["model"])
+TOOL_CALL_SECONDS = Histogram("tool_call_duration_seconds", "Latency of one tool call", ["tool", "outcome"])
+SQL_QUERY_SECONDS = Histogram("sql_query_duration_seconds", "Latency of agent SQL queries", ["query"])
+SQL_ROWS_RETURNED = Histogram("sql_rows_returned", "Rows returned by agent SQL queries", ["query"], buckets=SIZE_BUCKETS)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pipeline_stage_duration_seconds", "Duration of one unit of pipeline work", ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+)
+PIPELINE_ROWS = Counter("pipeline_rows_total", "Documents handled by pipeline stages", ["stage", "result"])
+DOWNLOAD_REQUESTS = Counter("download_requests_total", "Federal Register API requests", ["status"])
+PIPELINE_RUNS = Counter("pipeline_runs_total", "Scheduled or triggered pipeline runs", ["reason", "outcome"])
@@ -0,0 +1,101 @@
+import contextvars
+import os
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from observability.metrics import Histogram
+
+# Fraction of traces kept for /traces and logged; traces slower than TRACE_SLOW_SECONDS are always kept
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.1))
+TRACE_SLOW_SECONDS = float(os.getenv("TRACE_SLOW_SECONDS", 10))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", 100))
+TRACE_MAX_SPANS = 200 # Per trace, so a runaway loop cannot grow one without bound
+
+SPAN_SECONDS = Histogram("span_duration_seconds", "Duration of traced operations", ["name"])
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+recent_traces = deque(maxlen=TRACE_BUFFER_SIZE)
+_trace_listeners = []
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "started", "duration", "attrs", "trace")
+
+    def __init__(self, name, parent, attrs):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.started = time.perf_counter()
+        self.duration = None
+        self.attrs = attrs
+        self.trace = parent.trace if parent else [] # Finished spans of the whole trace, shared with children
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self, root_started):
+        return {
+            "name": self.name, "span_id": self.span_id, "parent_id": self.parent_id,
+            "start_ms": round((self.started - root_started) * 1000, 2),
+            "duration_ms": round((self.duration or 0) * 1000, 2), "attrs": self.attrs,
+        }
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_trace_id():
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+def add_trace_listener(callback):
+    """Called with each kept trace (a dict), e.g. to log it."""
+    _trace_listeners.append(callback)
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times a block as a span of the current trace (a new trace if there is none).
+    The duration also feeds span_duration_seconds{name}. Exceptions are recorded and re-raised.
+    """
+    parent = _current_span.get()
+    current = Span(name, parent, attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.started
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            pass # Closed from another context (e.g. an abandoned streaming generator)
+        SPAN_SECONDS.observe(current.duration, name=name)
+        if len(current.trace) < TRACE_MAX_SPANS:
+            current.trace.append(current)
+        if parent is None:
+            _finish_trace(current)
+
+
+def _finish_trace(root):
+    if root.duration < TRACE_SLOW_SECONDS and random.random() >= TRACE_SAMPLE_RATE:
+        return
+    trace = {
+        "trace_id": root.trace_id, "name": root.name, "duration_ms": round(root.duration * 1000, 2),
+        "spans": [s.to_dict(root.started) for s in sorted(root.trace, key=lambda s: s.started)],
+    }
+    recent_traces.append(trace)
+    for callback in _trace_listeners:
+        try:
+            callback(trace)
+        except Exception:
+            pass # Tracing must never break the request it observes
@@ -0,0 +1,34 @@
+import asyncio
+from datetime import date
+
+from data_pipeline import backfill
+
+
+class StagingCursor:
+    """Serves keyset pages of (seq, document_number, title, publication_date, document_type, abstract)."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def execute(self, sql, params):
+        assert sql == backfill.SELECT_STAGED_FOR_EMBEDDING_SQL
+        last_seq, limit = params
+        self.page = [row for row in self.rows if row[0] > last_seq][:limit]
+
+    async def fetchall(self):
+        return self.page
+
+
+def test_merged_documents_are_embedded_page_by_page(monkeypatch):
+    embedded = []
+
+    async def embed_written_rows(rows):
+        embedded.append(rows)
+        return len(rows)
+
+    monkeypatch.setattr(backfill, "embed_written_rows", embed_written_rows)
+    rows = [(seq, f"2024-{seq:05d}", f"Title {seq}", date(2024, 1, 2), "Rule", None) for seq in (3, 4, 8, 9, 12)]
+    assert asyncio.run(backfill.embed_staged_documents(StagingCursor(rows), batch_size=2)) == 5
+    assert embedded == [
+        [row[1:] for row in rows[:2]], [row[1:] for row in rows[2:4]], [row[1:] for row in rows[4:]],
+    ]
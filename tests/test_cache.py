@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from agent import cache
+from agent.cache import TTLCache
+from agent.tools import search_cache
+from data_pipeline.processor import notify_committed_dates
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_misses_share_one_load():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        ttl_cache = TTLCache(maxsize=10, ttl=60)
+        results = await asyncio.gather(*(ttl_cache.get_or_load("key", load) for _ in range(5)))
+        return results, await ttl_cache.get_or_load("key", load), ttl_cache.stats
+
+    results, cached, stats = asyncio.run(run())
+    assert results == ["value"] * 5 and cached == "value"
+    assert len(calls) == 1
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 4, 1)
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_load():
+    async def load():
+        await asyncio.sleep(0.02)
+        return "value"
+
+    async def run():
+        ttl_cache = TTLCache(maxsize=10, ttl=60)
+        first = asyncio.ensure_future(ttl_cache.get_or_load("key", load))
+        second = asyncio.ensure_future(ttl_cache.get_or_load("key", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, ttl_cache.get("key")
+
+    assert asyncio.run(run()) == ("value", (True, "value"))
+
+
+def test_failed_loads_are_not_cached():
+    attempts = []
+
+    async def load():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("database down")
+        return "value"
+
+    async def run():
+        ttl_cache = TTLCache(maxsize=10, ttl=60)
+        with pytest.raises(RuntimeError):
+            await ttl_cache.get_or_load("key", load)
+        return await ttl_cache.get_or_load("key", load)
+
+    assert asyncio.run(run()) == "value"
+    assert len(attempts) == 2
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    ttl_cache = TTLCache(maxsize=10, ttl=60)
+    ttl_cache.set("key", "value")
+    clock.now += 59
+    assert ttl_cache.get("key") == (True, "value")
+    clock.now += 2
+    assert ttl_cache.get("key") == (False, None)
+    assert ttl_cache.stats["expirations"] == 1 and len(ttl_cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    ttl_cache = TTLCache(maxsize=2, ttl=60)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+    assert [ttl_cache.get(key)[0] for key in "abc"] == [True, False, True]
+    assert ttl_cache.stats["evictions"] == 1
+
+
+def test_commit_listener_drops_only_results_covering_the_committed_dates():
+    search_cache.clear()
+    search_cache.set("january", "r1", meta=("2024-01-01", "2024-01-31"))
+    search_cache.set("february", "r2", meta=("2024-02-01", "2024-02-29"))
+    search_cache.set("since march", "r3", meta=("2024-03-01", None))
+    search_cache.set("undated", "r4") # No date range: not tied to ingested dates
+    notify_committed_dates({"2024-01-15", "2024-04-02"})
+    assert [search_cache.get(key)[0] for key in ("january", "february", "since march", "undated")] == [
+        False, True, False, True
+    ]
+    notify_committed_dates({None}) # Unknown publication date: every dated result may be stale
+    assert [search_cache.get(key)[0] for key in ("february", "undated")] == [False, True]
+    search_cache.clear()
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    async def run():
+        search_cache.clear()
+        started = asyncio.Event()
+
+        async def load():
+            started.set()
+            await asyncio.sleep(0.01)
+            return "stale"
+
+        task = asyncio.ensure_future(search_cache.get_or_load("key", load, meta=("2024-01-01", "2024-01-31")))
+        await started.wait()
+        notify_committed_dates({"2024-01-10"})
+        return await task, search_cache.get("key")
+
+    assert asyncio.run(run()) == ("stale", (False, None))
+    search_cache.clear()
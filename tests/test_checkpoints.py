@@ -0,0 +1,40 @@
+from datetime import date
+
+from data_pipeline.checkpoints import advance_checkpoint, missing_date_range
+
+TODAY = date(2024, 3, 11)
+
+
+def _dates(*days):
+    return {f"2024-03-{day:02d}" for day in days}
+
+
+def test_range_catches_up_on_missed_days():
+    assert missing_date_range(date(2024, 3, 6), 30, today=TODAY) == (date(2024, 3, 7), date(2024, 3, 10))
+
+
+def test_range_stops_before_today():
+    assert missing_date_range(date(2024, 3, 9), 30, today=TODAY) == (date(2024, 3, 10), date(2024, 3, 10))
+    assert missing_date_range(date(2024, 3, 10), 30, today=TODAY) is None
+
+
+def test_first_run_starts_initial_days_back():
+    assert missing_date_range(None, 5, today=TODAY) == (date(2024, 3, 6), date(2024, 3, 10))
+
+
+def test_checkpoint_advances_over_completed_dates():
+    assert advance_checkpoint(date(2024, 3, 7), date(2024, 3, 10), _dates(7, 8, 9, 10)) == date(2024, 3, 10)
+
+
+def test_checkpoint_stops_before_a_failed_date():
+    # The 8th failed: later dates completed, but the checkpoint must not skip past the gap
+    assert advance_checkpoint(date(2024, 3, 7), date(2024, 3, 10), _dates(7, 9, 10)) == date(2024, 3, 7)
+
+
+def test_checkpoint_stays_when_the_first_date_failed():
+    assert advance_checkpoint(date(2024, 3, 7), date(2024, 3, 10), _dates(8, 9, 10)) is None
+
+
+def test_checkpoint_ignores_dates_past_the_range():
+    # A fetched-but-unchecked issue (today's) never moves the checkpoint
+    assert advance_checkpoint(date(2024, 3, 9), date(2024, 3, 10), _dates(9, 10, 11)) == date(2024, 3, 10)
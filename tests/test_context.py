@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from agent import context
+from agent.context import COMPACTED_PREFIX, fit_history, token_counter
+
+
+@pytest.fixture(autouse=True)
+def chars_per_token(monkeypatch):
+    monkeypatch.setattr(context, "_encoding", None) # Deterministic counts: 4 characters per token
+
+
+def _tool_round(call_id, documents):
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": "search", "arguments": '{"search_term": "x"}'}}
+        ]},
+        {"tool_call_id": call_id, "role": "tool", "name": "search", "content": json.dumps([
+            {"title": f"Document {i} " + "about air quality " * 10, "publication_date": "2024-01-02"}
+            for i in range(documents)
+        ])},
+    ]
+
+
+def _history(turns):
+    messages = [{"role": "system", "content": "You are a helpful assistant."}]
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"Question {turn} " + "words " * 20})
+        messages.extend(_tool_round(f"call_{turn}", 5))
+        messages.append({"role": "assistant", "content": f"Answer {turn} " + "words " * 40})
+    messages.append({"role": "user", "content": "Latest question"})
+    return messages
+
+
+def _tokens(messages):
+    return sum(token_counter.count(message) for message in messages)
+
+
+def _assert_tool_rounds_intact(messages):
+    for index, message in enumerate(messages):
+        if message["role"] == "tool":
+            requested = messages[index - 1].get("tool_calls") or []
+            assert message["tool_call_id"] in [call["id"] for call in requested]
+
+
+def test_history_within_budget_is_unchanged():
+    messages = _history(2)
+    fitted, tokens = fit_history(messages, budget=10_000)
+    assert fitted is messages and tokens == _tokens(messages)
+
+
+def test_old_tool_outputs_are_compacted_before_turns_are_dropped():
+    messages = _history(3)
+    budget = _tokens(messages) - 100
+    fitted, tokens = fit_history(messages, budget)
+    assert len(fitted) == len(messages) and tokens <= budget
+    assert fitted[3]["content"].startswith(COMPACTED_PREFIX) # Only the oldest tool output was needed
+    assert messages[3]["content"].startswith("[{") # The caller's history is not modified
+
+
+def test_oldest_turns_are_dropped_to_meet_the_budget():
+    messages = _history(6)
+    fitted, tokens = fit_history(messages, budget=400)
+    assert tokens <= 400 and tokens == _tokens(fitted)
+    assert fitted[0] == messages[0] and fitted[-1] == messages[-1]
+    assert fitted[1]["role"] == "user" # Whole turns are dropped
+    assert fitted[-2]["content"].startswith("Answer 5") # Newest turns survive
+    _assert_tool_rounds_intact(fitted)
+
+
+def test_system_prompt_and_current_turn_are_kept_over_budget():
+    messages = _history(2)[:-1] + [{"role": "user", "content": "Latest question " + "words " * 100}]
+    messages += _tool_round("call_now", 20) # The current turn's tool round, still awaiting the answer
+    fitted, tokens = fit_history(messages, budget=50)
+    assert fitted == [messages[0]] + messages[-3:]
+    assert not fitted[-1]["content"].startswith(COMPACTED_PREFIX) # The result the model is about to read
+    assert tokens > 50
+    _assert_tool_rounds_intact(fitted)
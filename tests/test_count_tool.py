@@ -0,0 +1,109 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from agent.tools import AGENCY_CANDIDATES_LIMIT, _facet_condition, build_count_query, resolve_agency
+
+AGENCIES = [
+    ("agriculture-department", "Agriculture Department"),
+    ("agricultural-marketing-service", "Agricultural Marketing Service"),
+    ("environmental-protection-agency", "Environmental Protection Agency"),
+    ("epa-region-9", "Environmental Protection Agency Region 9"),
+]
+
+
+class SQLiteCursor:
+    """The slice of an aiomysql DictCursor that _timed_query uses, over an in-memory SQLite database."""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def execute(self, sql, params=()):
+        # MySQL's LIKE escapes with a backslash by default; SQLite needs it spelled out
+        sql = sql.replace("LIKE %s", "LIKE ? ESCAPE '\\'").replace("%s", "?")
+        cursor = self.db.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        self.rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    async def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture
+def cur():
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE agencies (slug TEXT PRIMARY KEY, name TEXT NOT NULL)")
+    db.executemany("INSERT INTO agencies VALUES (?, ?)", AGENCIES)
+    db.execute("CREATE TABLE agency_document_counts_daily "
+               "(publication_date TEXT, agency_slug TEXT, document_type TEXT, document_count INTEGER)")
+    db.executemany("INSERT INTO agency_document_counts_daily VALUES (?, ?, ?, ?)", [
+        ("2024-01-02", "agriculture-department", "Rule", 3),
+        ("2024-01-02", "agricultural-marketing-service", "Rule", 2), # Partly the same documents
+        ("2024-01-03", "agriculture-department", "Notice", 4),
+    ])
+    return SQLiteCursor(db)
+
+
+def _resolve(cur, agency):
+    return asyncio.run(resolve_agency(cur, agency))
+
+
+def test_unique_part_of_a_name_resolves_to_that_agency(cur):
+    assert _resolve(cur, "Marketing") == (
+        {"slug": "agricultural-marketing-service", "name": "Agricultural Marketing Service"}, None
+    )
+
+
+def test_exact_slug_or_name_wins_over_longer_names(cur):
+    epa = {"slug": "environmental-protection-agency", "name": "Environmental Protection Agency"}
+    assert _resolve(cur, "Environmental Protection Agency") == (epa, None)
+    assert _resolve(cur, "environmental-protection-agency") == (epa, None)
+
+
+def test_ambiguous_agency_lists_the_candidates(cur):
+    agency, error = _resolve(cur, "Agricultur")
+    assert agency is None
+    assert error.startswith("Error: 'Agricultur' matches several agencies:")
+    assert "Agricultural Marketing Service; Agriculture Department" in error
+
+
+def test_unknown_agency_is_an_error(cur):
+    assert _resolve(cur, "Space Agency") == (None, "Error: no agency matches 'Space Agency'.")
+
+
+def test_wildcards_in_the_agency_match_literally(cur):
+    assert _resolve(cur, "Agricultur_") == (None, "Error: no agency matches 'Agricultur_'.")
+    assert _resolve(cur, "%") == (None, "Error: no agency matches '%'.")
+    cur.db.execute("INSERT INTO agencies VALUES ('office-100', 'Office 100% \\ Agency_Name')")
+    assert _resolve(cur, "100% \\ Agency_")[0]["slug"] == "office-100"
+
+
+def test_facet_values_match_literally():
+    sql, params = _facet_condition("topic", "air_quality 100%")
+    assert "n.slug = %s OR n.name LIKE %s" in sql
+    assert params == ["air_quality 100%", "%air\\_quality 100\\%%"]
+
+
+def test_candidate_list_is_capped(cur):
+    cur.db.executemany("INSERT INTO agencies VALUES (?, ?)", [
+        (f"office-{i}", f"Office {i:02d}") for i in range(AGENCY_CANDIDATES_LIMIT + 5)
+    ])
+    _, error = _resolve(cur, "Office")
+    assert error.count(";") == AGENCY_CANDIDATES_LIMIT - 1 and "(and more)" in error
+
+
+def test_agency_filter_counts_one_agency(cur):
+    sql, params = build_count_query("total", None, "agriculture-department", "2024-01-01", None, 10)
+    assert "c.agency_slug = %s" in sql and "JOIN" not in sql and "LIKE" not in sql
+    assert params == ["2024-01-01", "agriculture-department"]
+    asyncio.run(cur.execute(sql, params))
+    assert cur.rows == [{"count": 7}]
+
+
+def test_count_queries_pick_their_rollup_table():
+    assert "FROM document_counts_daily c" in build_count_query("month", "Rule", None, None, None, 10)[0]
+    sql, params = build_count_query("agency", None, None, "2024-01-01", "2024-01-31", 5)
+    assert "JOIN agencies a ON a.slug = c.agency_slug" in sql
+    assert sql.endswith("GROUP BY period ORDER BY count DESC, period LIMIT 5")
+    assert params == ["2024-01-01", "2024-01-31"]
@@ -0,0 +1,126 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from agent.tools import rank_chunks
+from benchmarks.stub_federal_register import STATS, TEXT_PATH_PREFIX, create_app, text_for_document
+from data_pipeline import document_text, downloader
+from data_pipeline.document_text import (
+    compress_chunks, decompress_chunk, extract_text, fetch_document_text, split_text,
+)
+
+RAW_TEXT_URL = "https://www.federalregister.gov" + TEXT_PATH_PREFIX + "2024/01/02/{}.txt"
+
+
+def test_split_text_rejoins_and_respects_the_limit():
+    text = "\n\n".join(f"Paragraph {i} " + "word " * 40 for i in range(20))
+    chunks = split_text(text, 500)
+    assert "".join(chunk for _, chunk in chunks) == text
+    assert all(len(chunk) <= 500 for _, chunk in chunks)
+    assert [offset for offset, _ in chunks] == [sum(len(c) for _, c in chunks[:i]) for i in range(len(chunks))]
+    assert all(chunk.endswith("\n\n") for _, chunk in chunks[:-1]) # Cut after paragraph breaks
+
+
+def test_split_text_cuts_mid_word_without_a_separator():
+    assert split_text("x" * 25, 10) == [(0, "x" * 10), (10, "x" * 10), (20, "x" * 5)]
+    assert split_text("", 10) == []
+
+
+def test_extract_text_unwraps_the_pre_element():
+    body = "<html><body><p>nav</p><pre>Line &amp; one\r\n<a href='#'>Line</a> two\n</pre></body></html>"
+    assert extract_text(body) == "Line & one\nLine two"
+    assert extract_text("  plain text\r\n") == "plain text"
+
+
+def test_compressed_chunks_round_trip():
+    text = "\n\n".join(f"Section {i}. " + "The agency amends the rule. " * 30 for i in range(40))
+    rows = compress_chunks(text)
+    assert [row[0] for row in rows] == list(range(len(rows)))
+    assert "".join(decompress_chunk(row[3]) for row in rows) == text
+    for index, offset, char_count, body in rows:
+        assert text[offset:offset + char_count] == decompress_chunk(body)
+    assert sum(len(row[3]) for row in rows) < len(text.encode("utf-8"))
+
+
+def test_rank_chunks_prefers_rare_terms_and_keeps_document_order():
+    texts = [
+        "emissions emissions standards",
+        "general provisions",
+        "standards for vehicles",
+        "emissions of methane from wells",
+        "standards standards standards",
+    ]
+    assert rank_chunks(texts, "methane standards", 2) == [3, 4]
+    assert rank_chunks(texts, "methane", 5) == [3]
+    assert rank_chunks(texts, "aviation", 5) == []
+
+
+async def _fetch(app, monkeypatch, raw_text_urls, max_retries=2):
+    """fetch_document_text results for `raw_text_urls`, served by `app` with the text base URL pointed at it."""
+    monkeypatch.setattr(downloader, "DOWNLOAD_MAX_RETRIES", max_retries)
+    monkeypatch.setattr(downloader, "_backoff_delay", lambda attempt, retry_after=None: 0)
+    async with TestServer(app) as server:
+        monkeypatch.setattr(document_text, "FEDERAL_REGISTER_TEXT_BASE_URL", str(server.make_url("/")))
+        limiter = downloader.TokenBucket(1000, 100)
+        semaphore = asyncio.Semaphore(4)
+        async with aiohttp.ClientSession() as session:
+            return await asyncio.gather(*(
+                fetch_document_text(session, f"2024-{i:05d}", url, limiter, semaphore)
+                for i, url in enumerate(raw_text_urls)
+            ))
+
+
+def test_fetch_document_text_stores_the_body(monkeypatch):
+    app = create_app(text_paragraphs=10)
+    [(status, rows)] = asyncio.run(_fetch(app, monkeypatch, [RAW_TEXT_URL.format("2024-00001")]))
+    assert status == "stored"
+    assert "".join(decompress_chunk(row[3]) for row in rows) == text_for_document("2024-00001", 10).strip()
+    assert app[STATS]["texts"] == 1
+
+
+async def _gone(request):
+    return web.Response(status=410)
+
+
+def test_fetch_document_text_missing_body(monkeypatch):
+    app = create_app()
+    app.router.add_get("/gone/{document_number}.txt", _gone)
+    results = asyncio.run(_fetch(app, monkeypatch, [
+        None,
+        "null", # A JSON null after JSON_UNQUOTE
+        "https://www.federalregister.gov/nowhere/x.txt", # 404
+        "https://www.federalregister.gov/gone/x.txt",
+    ]))
+    assert results == [("missing", [])] * 4
+    assert app[STATS]["requests"] == 0 # 404 and 410 are not retried
+
+
+def test_fetch_document_text_retries_errors(monkeypatch):
+    app = create_app(error_rate=0.5, text_paragraphs=4)
+    urls = [RAW_TEXT_URL.format(f"2024-{i:05d}") for i in range(10)]
+    results = asyncio.run(_fetch(app, monkeypatch, urls, max_retries=20))
+    assert all(status == "stored" and rows for status, rows in results)
+    assert app[STATS]["errors_injected"] > 0
+    assert app[STATS]["requests"] == app[STATS]["errors_injected"] + len(urls)
+
+
+def test_fetch_document_text_fails_after_the_last_retry(monkeypatch):
+    app = create_app(error_rate=1.0)
+    results = asyncio.run(_fetch(app, monkeypatch, [RAW_TEXT_URL.format("2024-00001")], max_retries=2))
+    assert results == [("failed", [])]
+    assert app[STATS]["requests"] == 3
+
+
+def test_get_with_retry_returns_client_errors_without_retrying(monkeypatch):
+    async def run():
+        async with TestServer(create_app()) as server:
+            async with aiohttp.ClientSession() as session:
+                return await downloader.get_with_retry(
+                    session, str(server.make_url("/api/v1/documents.json")), downloader.TokenBucket(1000, 100),
+                    asyncio.Semaphore(1), "documents without a date", read=lambda response: response.json()
+                )
+
+    monkeypatch.setattr(downloader, "_backoff_delay", lambda attempt, retry_after=None: 0)
+    assert asyncio.run(run()) == (400, None)
@@ -0,0 +1,67 @@
+import base64
+import sqlite3
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from agent.tools import build_list_query
+from api.main import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    key = (date(2024, 1, 2), 123456)
+    cursor = encode_cursor(key)
+    assert "=" not in cursor and "|" not in cursor
+    assert decode_cursor(cursor) == key
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    base64.urlsafe_b64encode(b"2024-01-02").decode(), # No row id
+    base64.urlsafe_b64encode(b"2024-01-02|12|3").decode(),
+    base64.urlsafe_b64encode(b"2024-13-02|12").decode(),
+    base64.urlsafe_b64encode(b"2024-01-02|twelve").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),
+    encode_cursor((date(2024, 1, 2), 12))[:-3], # Truncated
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor)
+    assert excinfo.value.status_code == 400
+
+
+def test_keyset_condition_and_order():
+    sql, params = build_list_query(document_type="Rule", after=(date(2024, 1, 2), 77), limit=3, mode="like")
+    assert "(publication_date < %s OR (publication_date = %s AND id < %s))" in sql
+    assert sql.endswith("ORDER BY publication_date DESC, id DESC LIMIT 3")
+    assert params == ["Rule", date(2024, 1, 2), date(2024, 1, 2), 77]
+
+
+def test_pages_cover_rows_sharing_a_publication_date_exactly_once():
+    db = sqlite3.connect(":memory:")
+    db.execute(
+        "CREATE TABLE federal_documents (id INTEGER PRIMARY KEY, document_number TEXT, title TEXT, "
+        "publication_date TEXT, document_type TEXT, abstract_preview TEXT, html_url TEXT)"
+    )
+    dates = ["2024-01-03"] * 2 + ["2024-01-02"] * 5 + ["2024-01-01"] * 3 + [None]
+    db.executemany(
+        "INSERT INTO federal_documents (id, document_number, publication_date) VALUES (?, ?, ?)",
+        [(row_id, f"D{row_id}", publication_date) for row_id, publication_date in enumerate(dates, start=1)]
+    )
+
+    seen = []
+    cursor = None
+    while True:
+        after = decode_cursor(cursor) if cursor else None
+        if after:
+            after = (after[0].isoformat(), after[1])
+        sql, params = build_list_query(after=after, limit=3 + 1, mode="like")
+        rows = db.execute(sql.replace("%s", "?"), params).fetchall()
+        seen.extend(row[0] for row in rows[:3])
+        if len(rows) <= 3:
+            break
+        cursor = encode_cursor((date.fromisoformat(rows[2][3]), rows[2][0]))
+
+    # Newest date first, ties broken by id descending; undated rows cannot be paged and are left out
+    assert seen == [2, 1, 7, 6, 5, 4, 3, 10, 9, 8]
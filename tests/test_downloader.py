@@ -0,0 +1,76 @@
+import asyncio
+from datetime import date
+
+from aiohttp.test_utils import TestServer
+
+from benchmarks.stub_federal_register import DOCUMENTS_PATH, STATS, create_app, documents_for_date
+from data_pipeline import downloader
+from data_pipeline.raw_store import date_from_raw_filename, iter_raw_documents
+
+# Friday to Monday: two weekdays with documents and an empty weekend
+START, END = date(2024, 1, 5), date(2024, 1, 8)
+
+
+def _download(app, monkeypatch, tmp_path, max_retries=2, per_page=100):
+    """Runs download_date_range_concurrent(START, END) against `app`; returns the paths and the backoff attempts."""
+    backoffs = []
+
+    def backoff_delay(attempt, retry_after=None):
+        backoffs.append(attempt)
+        return 0
+
+    async def run():
+        async with TestServer(app) as server:
+            monkeypatch.setattr(downloader, "FEDERAL_REGISTER_API_URL", str(server.make_url(DOCUMENTS_PATH)))
+            return await downloader.download_date_range_concurrent(START, END, per_page=per_page)
+
+    monkeypatch.setattr(downloader, "RAW_DATA_DIR", tmp_path)
+    monkeypatch.setattr(downloader, "DOWNLOAD_RATE_LIMIT", 1000)
+    monkeypatch.setattr(downloader, "DOWNLOAD_BURST", 100)
+    monkeypatch.setattr(downloader, "DOWNLOAD_MAX_RETRIES", max_retries)
+    monkeypatch.setattr(downloader, "_backoff_delay", backoff_delay)
+    return asyncio.run(run()), backoffs
+
+
+def _assert_complete_days(paths):
+    assert sorted(date_from_raw_filename(path) for path in paths) == ["2024-01-05", "2024-01-08"]
+    for path in paths:
+        expected = documents_for_date(date_from_raw_filename(path), 450)
+        documents = list(iter_raw_documents(path))
+        assert sorted(doc["document_number"] for doc in documents) == sorted(doc["document_number"] for doc in expected)
+        assert set(documents[0]) <= set(downloader.REQUEST_FIELDS)
+
+
+def test_download_schedules_pages_from_total_pages(monkeypatch, tmp_path):
+    app = create_app(docs_per_day=450)
+    paths, backoffs = _download(app, monkeypatch, tmp_path)
+    _assert_complete_days(paths)
+    # Page 1 of each day, the 4 more pages its total_pages announced, and nothing past the last page
+    assert app[STATS]["requests"] == 5 + 1 + 1 + 5
+    assert backoffs == []
+
+
+def test_download_retries_throttled_and_failed_requests(monkeypatch, tmp_path):
+    app = create_app(docs_per_day=450, error_rate=0.3)
+    paths, backoffs = _download(app, monkeypatch, tmp_path, max_retries=20)
+    _assert_complete_days(paths)
+    assert app[STATS]["errors_injected"] > 0
+    assert len(backoffs) == app[STATS]["errors_injected"]
+    assert app[STATS]["requests"] == 12 + app[STATS]["errors_injected"]
+
+
+def test_download_writes_nothing_when_retries_run_out(monkeypatch, tmp_path):
+    app = create_app(docs_per_day=450, error_rate=1.0)
+    paths, backoffs = _download(app, monkeypatch, tmp_path, max_retries=1)
+    assert paths == []
+    assert list(tmp_path.iterdir()) == []
+    assert backoffs == [0] * 4 # One retry of page 1 per day
+
+
+def test_backoff_grows_exponentially_and_honours_retry_after(monkeypatch):
+    monkeypatch.setattr(downloader.random, "uniform", lambda low, high: high) # The top of the jitter range
+    monkeypatch.setattr(downloader, "DOWNLOAD_BACKOFF_BASE", 0.5)
+    monkeypatch.setattr(downloader, "DOWNLOAD_BACKOFF_MAX", 3)
+    assert [downloader._backoff_delay(attempt) for attempt in range(4)] == [0.5, 1, 2, 3]
+    assert downloader._backoff_delay(0, retry_after="10") == 10
+    assert downloader._backoff_delay(1, retry_after="Wed, 21 Oct 2015 07:28:00 GMT") == 1
@@ -0,0 +1,78 @@
+import asyncio
+
+from data_pipeline.facets import (
+    INSERT_DOCUMENT_AGENCY_SQL, INSERT_DOCUMENT_CFR_SQL, INSERT_DOCUMENT_TOPIC_SQL, UPSERT_AGENCY_SQL, UPSERT_TOPIC_SQL,
+    write_document_facets,
+)
+from data_pipeline.processor import facet_values, normalize_document
+
+
+class FakeCursor:
+    """Records the statements a write issues, as (sql, params) pairs."""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+
+    async def executemany(self, sql, rows):
+        self.statements.append((sql, list(rows)))
+
+    def rows_of(self, sql):
+        return [params for statement, params in self.statements if statement == sql]
+
+
+DOCUMENTS = [
+    {
+        "document_number": "2024-00001",
+        "title": "Air Quality Standards",
+        "publication_date": "2024-01-02",
+        "type": "Rule",
+        "agencies": [
+            {"name": "Environmental Protection Agency", "slug": "environmental-protection-agency"},
+            {"raw_name": "Office of Air and Radiation"}, # Not resolved by the API: slug derived from the name
+            {"name": "Environmental Protection Agency", "slug": "environmental-protection-agency"},
+        ],
+        "topics": ["Air pollution control", "  Air   pollution control ", "Ozone"],
+        "cfr_references": [{"title": 40, "part": 52}, {"title": "40", "part": "52"}, {"title": 40}],
+    },
+    {
+        "document_number": "2024-00002",
+        "title": "Meeting notice",
+        "publication_date": "2024-01-02",
+        "type": "Notice",
+        "agencies": [{"name": "Environmental Protection Agency", "slug": "environmental-protection-agency"}],
+        "topics": None,
+        "cfr_references": [{"title": "not a number", "part": 1}],
+    },
+]
+
+
+def test_normalized_documents_write_their_facet_links():
+    cur = FakeCursor()
+    asyncio.run(write_document_facets(cur, [facet_values(normalize_document(doc)) for doc in DOCUMENTS]))
+
+    deletes = [params for sql, params in cur.statements if sql.startswith("DELETE")]
+    assert deletes == [["2024-00001", "2024-00002"]] * 3 # Links of a rewritten document are replaced
+    assert cur.rows_of(UPSERT_AGENCY_SQL) == [[
+        ("environmental-protection-agency", "Environmental Protection Agency"),
+        ("office-of-air-and-radiation", "Office of Air and Radiation"),
+    ]]
+    assert cur.rows_of(UPSERT_TOPIC_SQL) == [[("air-pollution-control", "Air pollution control"), ("ozone", "Ozone")]]
+    assert cur.rows_of(INSERT_DOCUMENT_AGENCY_SQL) == [[
+        ("2024-00001", "environmental-protection-agency"),
+        ("2024-00001", "office-of-air-and-radiation"),
+        ("2024-00002", "environmental-protection-agency"),
+    ]]
+    assert cur.rows_of(INSERT_DOCUMENT_TOPIC_SQL) == [[("2024-00001", "air-pollution-control"), ("2024-00001", "ozone")]]
+    assert cur.rows_of(INSERT_DOCUMENT_CFR_SQL) == [[("2024-00001", 40, "52"), ("2024-00001", 40, "")]]
+
+
+def test_documents_without_facets_only_clear_their_links():
+    cur = FakeCursor()
+    doc = {"document_number": "2024-00003", "title": "Untagged", "publication_date": "2024-01-03", "type": "Notice"}
+    asyncio.run(write_document_facets(cur, [facet_values(normalize_document(doc))]))
+    assert [sql.split()[0] for sql, _ in cur.statements] == ["DELETE"] * 3
+    asyncio.run(write_document_facets(cur, []))
+    assert len(cur.statements) == 3
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from data_pipeline import db_setup
+from data_pipeline.retention import expired_partitions
+
+
+class FixedDate(date):
+    @classmethod
+    def today(cls):
+        return cls(2024, 11, 20)
+
+
+class PartitionCursor:
+    """Answers get_partitions' information_schema query and records the ALTER TABLE statements."""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    async def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    async def fetchall(self):
+        return self.partitions
+
+
+@pytest.fixture(autouse=True)
+def today(monkeypatch):
+    monkeypatch.setattr(db_setup, "date", FixedDate)
+    monkeypatch.setattr(db_setup, "PARTITIONS_AHEAD", 2)
+
+
+def test_yearly_partitions_run_past_today(monkeypatch):
+    monkeypatch.setattr(db_setup, "PARTITION_INTERVAL", "year")
+    assert db_setup._partition_definitions(date(2023, 1, 1)) == [
+        "PARTITION p2023 VALUES LESS THAN ('2024-01-01')",
+        "PARTITION p2024 VALUES LESS THAN ('2025-01-01')",
+        "PARTITION p2025 VALUES LESS THAN ('2026-01-01')",
+        "PARTITION p2026 VALUES LESS THAN ('2027-01-01')",
+        "PARTITION p_future VALUES LESS THAN (MAXVALUE)",
+    ]
+
+
+def test_monthly_partitions_cross_the_year(monkeypatch):
+    monkeypatch.setattr(db_setup, "PARTITION_INTERVAL", "month")
+    assert db_setup._partition_definitions(date(2024, 10, 1)) == [
+        "PARTITION p202410 VALUES LESS THAN ('2024-11-01')",
+        "PARTITION p202411 VALUES LESS THAN ('2024-12-01')",
+        "PARTITION p202412 VALUES LESS THAN ('2025-01-01')",
+        "PARTITION p202501 VALUES LESS THAN ('2025-02-01')",
+        "PARTITION p_future VALUES LESS THAN (MAXVALUE)",
+    ]
+
+
+def test_ensure_partitions_splits_p_future_only_when_needed(monkeypatch):
+    monkeypatch.setattr(db_setup, "PARTITION_INTERVAL", "year")
+    cur = PartitionCursor([("p2024", "'2025-01-01'"), ("p_future", "MAXVALUE")])
+    assert asyncio.run(db_setup.ensure_partitions(cur)) == 2
+    assert cur.statements[-1] == (
+        "ALTER TABLE federal_documents_raw REORGANIZE PARTITION p_future INTO ("
+        "PARTITION p2025 VALUES LESS THAN ('2026-01-01'), PARTITION p2026 VALUES LESS THAN ('2027-01-01'), "
+        "PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+    )
+
+    cur = PartitionCursor([("p2026", "'2027-01-01'"), ("p_future", "MAXVALUE")])
+    assert asyncio.run(db_setup.ensure_partitions(cur)) == 0
+    assert len(cur.statements) == 1 # Just the information_schema query
+
+
+def test_expired_partitions_hold_only_dates_before_the_cutoff():
+    partitions = [
+        ("p_before", date(1994, 1, 1)),
+        ("p2022", date(2023, 1, 1)),
+        ("p2023", date(2024, 1, 1)),
+        ("p2024", date(2025, 1, 1)),
+        ("p_future", None),
+    ]
+    assert expired_partitions(partitions, date(2024, 1, 1)) == partitions[:3]
+    assert expired_partitions(partitions, date(2023, 12, 31)) == partitions[:2]
+    assert expired_partitions(partitions, date(1990, 1, 1)) == []
@@ -0,0 +1,70 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from data_pipeline import raw_store
+from data_pipeline.raw_store import RawFileWriter, iter_raw_batches, iter_raw_documents, list_raw_files
+
+DOCUMENTS = [
+    {"document_number": f"2024-{i:05d}", "title": f"Notice {i} § [brackets], {{braces}}", "agencies": [{"id": i}]}
+    for i in range(25)
+]
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(raw_store, "READ_CHUNK_SIZE", 7) # Every document spans several reads
+
+
+def test_json_array_streams_across_chunks(small_chunks):
+    text = "\n [\n" + ",\n  ".join(json.dumps(doc) for doc in DOCUMENTS) + "\n]\n"
+    assert list(raw_store._iter_json_array(io.StringIO(text))) == DOCUMENTS
+
+
+def test_empty_json_array(small_chunks):
+    assert list(raw_store._iter_json_array(io.StringIO("  [ ]  "))) == []
+
+
+@pytest.mark.parametrize("text", ['{"document_number": "1"}', "", '[{"a": 1}, {"b"', '[{"a": 1},'])
+def test_malformed_json_array_is_an_error(small_chunks, text):
+    with pytest.raises(ValueError):
+        list(raw_store._iter_json_array(io.StringIO(text)))
+
+
+def test_legacy_json_file(tmp_path, small_chunks):
+    path = tmp_path / "federal_register_2024-01-02.json"
+    path.write_text(json.dumps(DOCUMENTS, indent=2), encoding="utf-8")
+    assert list(iter_raw_documents(path)) == DOCUMENTS
+
+
+@pytest.mark.parametrize("fmt", [
+    "ndjson",
+    "ndjson.gz",
+    pytest.param("ndjson.zst", marks=pytest.mark.skipif(raw_store.zstandard is None, reason="zstandard not installed")),
+])
+def test_written_files_read_back(tmp_path, fmt):
+    async def write():
+        writer = RawFileWriter(tmp_path, "2024-01-02", fmt)
+        await writer.write_page(DOCUMENTS[:10])
+        await writer.write_page(DOCUMENTS[10:])
+        assert list_raw_files(tmp_path) == [] # Still a .part file
+        return await writer.commit()
+
+    path = asyncio.run(write())
+    assert path.endswith(f"federal_register_2024-01-02.{fmt}")
+    assert list_raw_files(tmp_path) == [tmp_path / f"federal_register_2024-01-02.{fmt}"]
+    assert list(iter_raw_documents(path)) == DOCUMENTS
+    assert [len(batch) for batch in iter_raw_batches(path, 10)] == [10, 10, 5]
+
+
+def test_discarded_and_empty_writers_leave_nothing(tmp_path):
+    async def write():
+        discarded = RawFileWriter(tmp_path, "2024-01-02", "ndjson.gz")
+        await discarded.write_page(DOCUMENTS)
+        await discarded.discard()
+        return await RawFileWriter(tmp_path, "2024-01-03", "ndjson.gz").commit()
+
+    assert asyncio.run(write()) is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,28 @@
+import asyncio
+
+from agent.session_store import MemorySessionStore
+
+
+def test_loaded_history_is_a_copy():
+    async def run():
+        store = MemorySessionStore()
+        await store.save("s", [{"role": "system", "content": "x"}])
+        history = await store.load("s")
+        history.append({"role": "user", "content": "y" * 1000})
+        return await store.load("s"), store.get_stats()["bytes"]
+
+    history, size = asyncio.run(run())
+    assert history == [{"role": "system", "content": "x"}]
+    assert size < 100
+
+
+def test_byte_cap_evicts_least_recently_used_sessions():
+    async def run():
+        store = MemorySessionStore(max_bytes=300)
+        for session_id in ("a", "b", "c"):
+            await store.save(session_id, [{"role": "user", "content": session_id * 60}])
+        await store.load("a") # Now b is the least recently used; three sessions fit, four do not
+        await store.save("d", [{"role": "user", "content": "d" * 60}])
+        return [session_id for session_id in "abcd" if await store.load(session_id) is not None]
+
+    assert asyncio.run(run()) == ["a", "c", "d"]
@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from data_pipeline import vector_index
+from data_pipeline.vector_index import VectorIndex
+
+DIM = 8
+
+
+def _unit(i):
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[i] = 1.0
+    return vector
+
+
+def _add(index, doc_numbers, axes, publication_date="2024-01-02", document_type="Rule"):
+    vectors = np.stack([_unit(axis) for axis in axes])
+    count = len(doc_numbers)
+    return asyncio.run(index.add(doc_numbers, vectors, [publication_date] * count, [document_type] * count))
+
+
+def test_appended_rows_are_found_by_another_instance(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_index, "EMBEDDING_MODEL", "test-model")
+    writer, reader = VectorIndex(tmp_path), VectorIndex(tmp_path)
+    _add(writer, ["A", "B"], [0, 1])
+    assert reader.search(_unit(1), k=1) == [("B", 1.0)]
+    _add(writer, ["C"], [2], publication_date="2024-02-01", document_type="Notice")
+    assert reader.refresh() == 3
+    assert reader.search(_unit(2), k=1) == [("C", 1.0)]
+    assert [number for number, _ in reader.search(_unit(2), k=3, document_type="Rule")] == ["A", "B"]
+    assert [number for number, _ in reader.search(_unit(0), k=3, start_date="2024-01-15")] == ["C"]
+
+
+def test_reembedded_document_supersedes_its_old_row(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_index, "EMBEDDING_MODEL", "test-model")
+    index = VectorIndex(tmp_path)
+    _add(index, ["A", "B"], [0, 1])
+    _add(index, ["A"], [3]) # A's new embedding
+    assert dict(index.search(_unit(0), k=3)) == {"A": 0.0, "B": 0.0} # The old row of A (score 1.0) is skipped
+    assert index.search(_unit(3), k=1) == [("A", 1.0)]
+    assert index.get_stats()["rows"] == 3 and index.get_stats()["documents"] == 2
+
+
+def test_partial_id_line_is_ignored_until_complete(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_index, "EMBEDDING_MODEL", "test-model")
+    index = VectorIndex(tmp_path)
+    _add(index, ["A"], [0])
+    with open(index.vectors_path, "ab") as f: # A writer mid-append: vector written, id line not finished
+        f.write(_unit(1).tobytes())
+    with open(index.attrs_path, "ab") as f:
+        f.write(np.zeros(1, dtype=vector_index.ATTRS_DTYPE).tobytes())
+    with open(index.ids_path, "ab") as f:
+        f.write(b"B")
+    reader = VectorIndex(tmp_path)
+    assert reader.refresh() == 1
+    with open(index.ids_path, "ab") as f:
+        f.write(b"\n")
+    assert reader.refresh() == 2
+    assert reader.search(_unit(1), k=1) == [("B", 1.0)]
+
+
+def test_interrupted_append_is_cut_off_by_the_next_writer(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_index, "EMBEDDING_MODEL", "test-model")
+    _add(VectorIndex(tmp_path), ["A"], [0])
+    index = VectorIndex(tmp_path)
+    with open(index.vectors_path, "ab") as f: # Died after part of a vector
+        f.write(_unit(5).tobytes()[:10])
+    _add(VectorIndex(tmp_path), ["B"], [1])
+    assert index.vectors_path.stat().st_size == 2 * DIM * 4
+    assert index.search(_unit(1), k=1) == [("B", 1.0)]
+
+
+def test_concurrent_refreshes_count_each_row_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_index, "EMBEDDING_MODEL", "test-model")
+    _add(VectorIndex(tmp_path), [f"D{i}" for i in range(200)], [i % DIM for i in range(200)])
+    index = VectorIndex(tmp_path)
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: index.search(_unit(0), k=5), range(32)))
+    assert index.count == 200 and len(index.doc_numbers) == 200
+    assert all(len(result) == 5 for result in results)